@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the game modules import each other by name (as when run with "python yahtzee"),
+# so make the package directory importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "yahtzee"))
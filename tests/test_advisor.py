@@ -0,0 +1,119 @@
+import unittest
+
+import itertools
+
+import numpy as np
+
+from advisor import HoldAdvisor
+from headless import OptimalPolicy
+from model import Scorecard, TurnView
+from solver import StrategySolver
+
+
+class test_HoldAdvisor(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @classmethod
+  def setUpClass(cls):
+    
+    # solve the states with one or two free rows, which is all these tests use
+    solver = StrategySolver(5, 6, 3)
+    values = np.zeros((2 ** solver.numberOfRows, solver.numberOfUpperTotals, 2))
+    for numberOfFreeRows in (1, 2):
+      layerMasks = solver.getLayerMasks(numberOfFreeRows)
+      values[layerMasks] = solver._solveStates(layerMasks, values)
+    solver.values = values
+    
+    cls.solver  = solver
+    cls.advisor = HoldAdvisor(solver)
+  
+  def _singleRowScorecard(self, rowName, *otherRowNames):
+    """ Scorecard with only <rowName> (and <otherRowNames>) left to score """
+    scorecard = Scorecard(6)
+    for freeRow in scorecard.getFreeRows():
+      if freeRow != rowName and freeRow not in otherRowNames:
+        scorecard.updateScore(freeRow, 0)
+    return scorecard
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_distinctHolds(self):
+    
+    # identical dice give one hold per count, not one per mask
+    self.assertEqual(32, len(HoldAdvisor.getDistinctHolds([1, 2, 3, 4, 5])))
+    self.assertEqual(18, len(HoldAdvisor.getDistinctHolds([3, 1, 1, 2, 2])))
+    self.assertEqual(10, len(HoldAdvisor.getDistinctHolds([6] * 9)))
+    self.assertIn((1, 2, 2), HoldAdvisor.getDistinctHolds([2, 1, 3, 2, 1]))
+    
+    self.assertEqual([False, True, False, True, False], HoldAdvisor.getHoldMask([2, 6, 3, 6, 6], (6, 6)))
+    with self.assertRaises(ValueError):
+      HoldAdvisor.getHoldMask([2, 6, 3, 6, 6], (2, 2))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_chance(self):
+    
+    scorecard = self._singleRowScorecard(Scorecard.ROW_NAME.CHANCE.value)
+    
+    # with two rolls left, a die is worth keeping if it beats 4.25
+    holds = self.advisor.getRankedHolds([6, 1, 6, 3, 2], 2, scorecard)
+    self.assertEqual(32 - 8, len(holds))
+    self.assertEqual((6, 6), holds[0][0])
+    self.assertAlmostEqual(12 + 3 * 4.25, holds[0][1])
+    self.assertEqual(sorted(holds, key=lambda x: -x[1]), holds)
+    
+    # best holds after the first roll add up to the value of the state
+    stateValue = 0.0
+    for outcome in itertools.product(range(1, 7), repeat=5):
+      stateValue += self.advisor.getBestHold(list(outcome), 2, scorecard)[1]
+    stateValue /= 6 ** 5
+    self.assertAlmostEqual(self.solver.getStateValue(*self.solver.getStateKey(scorecard)), stateValue)
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_yahtzee(self):
+    
+    scorecard = self._singleRowScorecard(Scorecard.ROW_NAME.YAHTZEE.value)
+    holds = dict(self.advisor.getRankedHolds([2, 5, 2, 6, 2], 1, scorecard))
+    
+    # compare against every ordered reroll
+    for heldDice in [(2, 2, 2), (2, 2), (5,), ()]:
+      numRolled = 5 - len(heldDice)
+      expected  = sum(50 for roll in itertools.product(range(1, 7), repeat=numRolled)
+                      if len(set(heldDice + roll)) == 1) / 6 ** numRolled
+      self.assertAlmostEqual(expected, holds[heldDice])
+    
+    # no rolls left to use
+    with self.assertRaises(ValueError):
+      self.advisor.getRankedHolds([2, 5, 2, 6, 2], 0, scorecard)
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_rankedRows(self):
+    
+    yahtzee = Scorecard.ROW_NAME.YAHTZEE.value
+    chance  = Scorecard.ROW_NAME.CHANCE.value
+    scorecard = self._singleRowScorecard(yahtzee, chance)
+    solver = self.solver
+    chanceOnly  = 1 << solver.rowNames.index(chance)
+    yahtzeeOnly = 1 << solver.rowNames.index(yahtzee)
+    
+    # a yahtzee in the Yahtzee row makes the joker rules apply to the last turn
+    rows = self.advisor.getRankedRows([4] * 5, scorecard)
+    self.assertEqual([yahtzee, chance], [rowName for rowName, _ in rows])
+    self.assertAlmostEqual(50 + solver.getStateValue(chanceOnly, 0, 1), rows[0][1])
+    self.assertAlmostEqual(20 + solver.getStateValue(yahtzeeOnly, 0, 0), rows[1][1])
+    
+    # a poor hand is better scratched in Yahtzee, keeping a whole turn for chance
+    rowName, rowValue = self.advisor.getBestRow([1, 2, 3, 4, 6], scorecard)
+    self.assertEqual(yahtzee, rowName)
+    self.assertAlmostEqual(solver.getStateValue(chanceOnly, 0, 0), rowValue)
+    self.assertGreater(rowValue, 16 + solver.getStateValue(yahtzeeOnly, 0, 0))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_optimalPolicy(self):
+    
+    # the policy holds and scores as advised
+    scorecard = self._singleRowScorecard(Scorecard.ROW_NAME.CHANCE.value)
+    policy = OptimalPolicy(advisor=self.advisor)
+    turnView = TurnView("a", (6, 1, 6, 3, 2), (), 2, 3, 6, scorecard, {})
+    self.assertEqual([0, 2], policy.decideHeldDice(turnView))
+    self.assertEqual(Scorecard.ROW_NAME.CHANCE.value, policy.decideRow(turnView))
@@ -0,0 +1,85 @@
+import unittest
+
+import numpy as np
+
+from batchsim import BatchSimulator
+from model import ArrayScorecard, Scorecard
+
+
+class test_BatchSimulator(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  def _playMirrored(self, sim, scorecardClass, rng):
+    """ Play <sim>'s games, scoring each one on a scorecard as well, and check they agree every turn """
+
+    sim.newGames()
+    scorecards = [scorecardClass(sim.numberOfDiceFaces) for _ in range(sim.numberOfGames)]
+    while not sim.isFinished():
+
+      sim.roll()
+      for _ in range(sim.numberOfRolls - 1):
+        sim.setHolds(BatchSimulator.holdMostCommon(sim))
+        sim.roll()
+
+      # make yahtzees, and so jokers, common
+      sim.dice[::3] = sim.dice[::3, :1]
+      sim._clearDiceInfo()
+
+      possibleScores = sim.getPossibleScores()
+      scorableRows   = sim.getScorableRows()
+
+      # score in a random row that can be scored in
+      rows = np.array([rng.choice(np.flatnonzero(isScorable)) for isScorable in scorableRows])
+
+      for iGame, scorecard in enumerate(scorecards):
+        diceValues = sim.dice[iGame].tolist()
+        for iRow, rowName in enumerate(sim.rowNames):
+          self.assertEqual(scorecard.canScoreRow(rowName, diceValues), scorableRows[iGame, iRow])
+
+        # score the row as Game.score does
+        rowName = sim.rowNames[rows[iGame]]
+        scores = Scorecard.PointsCalculator(scorecard).calculate([rowName], diceValues)
+        self.assertEqual(scores[rowName], possibleScores[iGame, rows[iGame]])
+        for scoreName, scoreValue in scores.items():
+          scorecard.updateScore(scoreName, scoreValue)
+
+      sim.score(rows)
+
+    totalScores = sim.getTotalScores()
+    self.assertEqual([scorecard.getTotalScore() for scorecard in scorecards], totalScores.tolist())
+    return totalScores
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_matchesScorecard(self):
+
+    rng = np.random.default_rng(0)
+    for numberOfDice, numberOfDiceFaces, scorecardClass in ((5, 6, ArrayScorecard), (6, 8, Scorecard)):
+      sim = BatchSimulator(60, numberOfDice=numberOfDice, numberOfDiceFaces=numberOfDiceFaces, rng=rng)
+      totalScores = self._playMirrored(sim, scorecardClass, rng)
+
+      # some games got yahtzee bonuses
+      self.assertTrue(np.any(sim.yahtzeeBonus > 0))
+      self.assertTrue(np.all(totalScores > 0))
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_playGames(self):
+
+    # the same seed plays the same games
+    totalScores  = BatchSimulator(1000, rng=np.random.default_rng(5)).playGames()
+    totalScores2 = BatchSimulator(1000, rng=np.random.default_rng(5)).playGames()
+    self.assertTrue(np.array_equal(totalScores, totalScores2))
+
+    # greedy play averages a bit over 160
+    self.assertTrue(150 < totalScores.mean() < 175)
+
+    # can't roll after the last roll, or score in a used row
+    sim = BatchSimulator(10, numberOfRolls=1, rng=np.random.default_rng(0))
+    sim.roll()
+    with self.assertRaises(SystemError):
+      sim.roll()
+    sim.score(np.zeros(10, dtype=int))
+    sim.roll()
+    with self.assertRaises(ValueError):
+      sim.score(np.zeros(10, dtype=int))
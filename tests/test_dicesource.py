@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from dicesource import BufferedDice, RandomDice, ScriptedDice
+from model import Game
+
+
+class test_DiceSource(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_bufferedDice(self):
+
+    # rolls are served in order across refills, and the same seed gives the same dice
+    dice  = BufferedDice(8, np.random.default_rng(3), bufferSize=7)
+    dice2 = BufferedDice(8, np.random.default_rng(3), bufferSize=7)
+    rolls = [dice.roll(numberOfDice) for numberOfDice in [5, 3, 0, 7, 2, 6] * 20]
+    self.assertEqual(rolls, [dice2.roll(numberOfDice) for numberOfDice in [5, 3, 0, 7, 2, 6] * 20])
+    self.assertEqual([5, 3, 0, 7, 2, 6] * 20, [len(roll) for roll in rolls])
+
+    allValues = np.concatenate(rolls)
+    self.assertEqual(set(range(1, 9)), set(allValues.tolist()))
+
+    # roughly uniform
+    values = np.array(BufferedDice(6, np.random.default_rng(0)).roll(60000))
+    self.assertTrue(np.all(np.abs(np.bincount(values)[1:] - 10000) < 500))
+
+    self.assertEqual(4, len(RandomDice(6).roll(4)))
+    with self.assertRaises(ValueError):
+      BufferedDice(6, bufferSize=0)
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_scriptedDice(self):
+
+    # a game rolls the scripted dice, the held dice keep their values
+    game = Game(["a"], diceSource=ScriptedDice([6, 6, 1, 2, 3, 6, 4, 5]))
+    game.setStatus(Game.STATUS.RUNNING)
+    game.rollDice()
+    self.assertEqual([6, 6, 1, 2, 3], game.getDiceValues())
+    game.setDiceHold(0, True)
+    game.setDiceHold(1, True)
+    game.rollDice()
+    self.assertEqual([6, 6, 6, 4, 5], game.getDiceValues())
+
+    # running out of dice is an error
+    with self.assertRaises(SystemError):
+      game.rollDice()
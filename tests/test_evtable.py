@@ -0,0 +1,71 @@
+import unittest
+
+import os
+import tempfile
+
+import numpy as np
+
+from evtable import EVTable
+
+
+class test_EVTable(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  def setUp(self):
+    self.tempDir = tempfile.TemporaryDirectory()
+    self.tableLoc = os.path.join(self.tempDir.name, "table.evt")
+    self.values = np.random.default_rng(0).random((16, 8, 2)) * 100
+    EVTable.write(self.tableLoc, self.values, 5, 6, 3)
+  
+  def tearDown(self):
+    self.tempDir.cleanup()
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_roundTrip(self):
+    
+    table = EVTable.open(self.tableLoc, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3, verify=True)
+    self.assertIsInstance(table.values, np.memmap)
+    self.assertEqual((5, 6, 3), (table.numberOfDice, table.numberOfDiceFaces, table.numberOfRolls))
+    
+    # values are kept at full precision by default, so near-tied EVs keep their order
+    self.assertEqual(np.float64, table.values.dtype)
+    self.assertTrue(np.array_equal(self.values, table.values))
+    nearTies = 250 + np.arange(4) * 1e-6
+    EVTable.write(self.tableLoc, nearTies, 5, 6, 3)
+    self.assertEqual([3, 2, 1, 0], np.argsort(-EVTable.open(self.tableLoc).values).tolist())
+    
+    # single precision can be asked for, at ~1e-5 resolution near 250
+    EVTable.write(self.tableLoc, self.values, 5, 6, 3, dtype=np.float32)
+    self.assertTrue(np.allclose(self.values, EVTable.open(self.tableLoc).values, atol=1e-4))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_rejected(self):
+    
+    # different config
+    with self.assertRaises(ValueError):
+      EVTable.open(self.tableLoc, numberOfDice=6)
+    
+    # different rules
+    rulesVersion = EVTable.RULES_VERSION
+    try:
+      EVTable.RULES_VERSION += 1
+      with self.assertRaises(ValueError):
+        EVTable.open(self.tableLoc)
+    finally:
+      EVTable.RULES_VERSION = rulesVersion
+    
+    # corrupted data
+    with open(self.tableLoc, "r+b") as f:
+      f.seek(EVTable.DATA_OFFSET + 10)
+      f.write(b"\xff\xff")
+    EVTable.open(self.tableLoc)
+    with self.assertRaises(ValueError):
+      EVTable.open(self.tableLoc, verify=True)
+    
+    # truncated data
+    with open(self.tableLoc, "r+b") as f:
+      f.truncate(EVTable.DATA_OFFSET + 16)
+    with self.assertRaises(ValueError):
+      EVTable.open(self.tableLoc)
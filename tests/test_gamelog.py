@@ -0,0 +1,170 @@
+import unittest
+
+import os
+import tempfile
+
+from basegui import NullGUI
+from controller import Controller
+from gamelog import GameLog
+from headless import GreedyPolicy, HeadlessRunner, RandomPolicy
+from model import Game
+
+
+class test_GameLog(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  def setUp(self):
+    self.tempDir = tempfile.TemporaryDirectory()
+    self.logLoc  = os.path.join(self.tempDir.name, "games.ygl")
+
+  def tearDown(self):
+    self.tempDir.cleanup()
+
+  def _playLoggedGames(self, writer, runner, seeds):
+    """ Play a game for each seed, recorded by <writer>; returns the games """
+    games = []
+    for seed in seeds:
+      game = runner.newGame(seed=seed)
+      writer.attach(game)
+      runner.playGame(game)
+      games.append(game)
+    return games
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_writeRead(self):
+
+    runner = HeadlessRunner({"greedy": GreedyPolicy(), "rändom": RandomPolicy()}, numberOfDice=6)
+    with GameLog.create(self.logLoc, numberOfDice=6, gamesPerBlock=4) as writer:
+      games = self._playLoggedGames(writer, runner, range(10))
+
+      # blocks are written as they fill up
+      self.assertEqual(8, GameLog.open(self.logLoc).countGames())
+
+      # games with another config can't be recorded
+      with self.assertRaises(ValueError):
+        writer.attach(Game(["a"]))
+
+    # the log has every event of every game, and replays them
+    reader = GameLog.open(self.logLoc)
+    self.assertEqual((6, 6, 3), reader.gameConfig)
+    loggedGames = list(reader)
+    self.assertEqual(list(range(10)), [loggedGame.gameNumber for loggedGame in loggedGames])
+    for game, loggedGame in zip(games, loggedGames):
+      self.assertEqual(["greedy", "rändom"], loggedGame.playerNames)
+      self.assertEqual(len(game.getActions()), len(loggedGame.events))
+      self.assertEqual(game.getTotalScores(), loggedGame.replay().getTotalScores())
+
+    self.assertEqual(loggedGames[7].events, reader.getGame(7).events)
+    with self.assertRaises(IndexError):
+      reader.getGame(10)
+
+    # more games carry on the numbering, and a torn block at the end is skipped
+    with GameLog.create(self.logLoc, numberOfDice=6) as writer:
+      self._playLoggedGames(writer, runner, range(10, 13))
+    with open(self.logLoc, "ab") as f:
+      f.write(GameLog.RECORD.pack(GameLog.EVENT.BLOCK.value, 0, 0, b"", 5) + GameLog.INDEX_ENTRY.pack(13, 10**6))
+
+    reader = GameLog.open(self.logLoc)
+    self.assertEqual(13, reader.countGames())
+    self.assertEqual(12, reader.getGame(12).gameNumber)
+
+    with self.assertRaises(ValueError):
+      GameLog.create(self.logLoc)
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_events(self):
+
+    game = Game(["a", "b"], seed=3)
+    with GameLog.create(self.logLoc, gamesPerBlock=1) as writer:
+      writer.attach(game)
+      game.setStatus(Game.STATUS.RUNNING)
+      game.rollDice()
+      game.setDiceHold(2, True)
+      game.rollDice()
+      rolledDice = game.getDiceValues()
+      game.score("Chance")
+      game.advanceTurn()
+
+      # an unfinished game isn't written
+      writer.detach(game)
+      game.rollDice()
+
+    self.assertEqual(0, GameLog.open(self.logLoc).countGames())
+
+    # records have the dice, holds and scores
+    game = Game(["a"], seed=3)
+    with GameLog.create(self.logLoc) as writer:
+      writer.attach(game)
+      HeadlessRunner({"a": GreedyPolicy()}).playGame(game)
+
+    loggedGame = GameLog.open(self.logLoc).getGame(0)
+    firstEvent, playerIndex, rollsLeft, diceValues, rolledMask = loggedGame.events[0]
+    self.assertEqual((GameLog.EVENT.ROLL, 0, 2, 0b11111), (firstEvent, playerIndex, rollsLeft, rolledMask))
+    self.assertEqual(5, len(diceValues))
+    self.assertEqual(GameLog.EVENT.ADVANCE, loggedGame.events[-1][0])
+    self.assertEqual(13, sum(1 for event in loggedGame.events if event[0] == GameLog.EVENT.SCORE))
+    self.assertTrue(all(len(diceValues) == 5 for diceValues in loggedGame.getRolls()))
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_tornTail(self):
+
+    # a crash part way through writing a block, then more games
+    runner = HeadlessRunner({"a": GreedyPolicy()})
+    with GameLog.create(self.logLoc, gamesPerBlock=1) as writer:
+      games = self._playLoggedGames(writer, runner, range(2))
+    os.truncate(self.logLoc, os.path.getsize(self.logLoc) - 100)
+    with GameLog.create(self.logLoc, gamesPerBlock=2) as writer:
+      games = games[:1] + self._playLoggedGames(writer, runner, range(2, 5))
+
+    # the torn game is lost, the rest follow on from the last whole block
+    reader = GameLog.open(self.logLoc)
+    self.assertEqual(4, reader.countGames())
+    loggedGames = list(reader)
+    self.assertEqual([0, 1, 2, 3], [loggedGame.gameNumber for loggedGame in loggedGames])
+    for game, loggedGame in zip(games, loggedGames):
+      self.assertEqual(game.getTotalScores(), loggedGame.replay().getTotalScores())
+    self.assertEqual(os.path.getsize(self.logLoc), reader.getBlocksEnd())
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_otherHooks(self):
+
+    # a hook added after the writer's sees every action, including the last
+    game = Game(["a", "b"], seed=4)
+    seenActions = []
+    with GameLog.create(self.logLoc) as writer:
+      writer.attach(game)
+      game.addEventHook(lambda game, action: seenActions.append(action))
+      HeadlessRunner({"a": GreedyPolicy(), "b": RandomPolicy()}).playGame(game)
+
+    self.assertEqual(game.getActions(), seenActions)
+    self.assertEqual((Game.ACTION.ADVANCE,), seenActions[-1])
+    self.assertEqual(1, GameLog.open(self.logLoc).countGames())
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_controller(self):
+
+    # the controller archives finished games when it has a log directory
+    configLoc  = os.path.join(self.tempDir.name, "config.yaml")
+    gameLogDir = os.path.join(self.tempDir.name, "logs")
+    Controller.createNewConfigFile(configLoc)
+    Controller._updateConfigFile(configLoc, {"gameLogDir": gameLogDir})
+    controller = Controller(configLoc, guiClass=NullGUI)
+
+    policy = GreedyPolicy()
+    game = controller.game
+    while game.getGameStatus() != Game.STATUS.FINISHED:
+      controller.rollDice()
+      controller.score(policy.chooseRow(game.getTurnView()))
+
+    # an abandoned game isn't
+    controller.newGame()
+    controller.rollDice()
+    controller.newGame(forceNewGame=True)
+    for gameLog in controller.gameLogs.values():
+      gameLog.close()
+
+    loggedGames = list(GameLog.open(os.path.join(gameLogDir, "games-5d6-3r.ygl")))
+    self.assertEqual(1, len(loggedGames))
+    self.assertEqual(game.getTotalScores(), loggedGames[0].replay().getTotalScores())
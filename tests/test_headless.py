@@ -0,0 +1,114 @@
+import unittest
+
+import os
+import random
+import tempfile
+
+from basegui import NullGUI
+from controller import Controller
+from dicesource import ScriptedDice
+from headless import GreedyPolicy, HeadlessRunner, OptimalPolicy, RandomPolicy
+from model import Game, Scorecard
+
+
+class test_HeadlessRunner(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_playGame(self):
+
+    runner = HeadlessRunner({"greedy": GreedyPolicy(), "random": RandomPolicy(random.Random(0))})
+    game = runner.newGame()
+    totalScores = runner.playGame(game)
+
+    # every scorable row was filled in by both players
+    self.assertEqual(Game.STATUS.FINISHED, game.getGameStatus())
+    self.assertEqual(["greedy", "random"], list(totalScores))
+    for player in game.getAllPlayers():
+      self.assertEqual([], player.getScorecard().getFreeRows())
+      self.assertEqual(totalScores[player.getName()], player.getScorecard().getTotalScore())
+
+    # the same rules hold with the original scorecard, and other configs
+    runner = HeadlessRunner({"greedy": GreedyPolicy()}, numberOfDice=7, numberOfDiceFaces=10, numberOfRolls=2,
+                            scorecardClass=Scorecard)
+    results = runner.playGames(3)
+    self.assertEqual(3, len(results))
+    self.assertTrue(all(result["greedy"] > 0 for result in results))
+
+    with self.assertRaises(ValueError):
+      HeadlessRunner({})
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_strategy(self):
+
+    game = Game(["a", "b"], diceSource=ScriptedDice([3, 5, 3, 1, 3]))
+    game.setStatus(Game.STATUS.RUNNING)
+    game.rollDice()
+    game.setDiceHold(1, True)
+
+    # the view shows the current player's turn, and can't change the game
+    turnView = game.getTurnView()
+    self.assertEqual(("a", (3, 5, 3, 1, 3), (1,), 2), turnView[:4])
+    self.assertIs(game.getPlayer("a").getScorecardView(), turnView.scorecard)
+    self.assertEqual(["b"], list(turnView.opponentScorecards))
+    self.assertIs(turnView.opponentScorecards, game.getTurnView().opponentScorecards)
+    with self.assertRaises(AttributeError):
+      turnView.remainingRolls = 0
+
+    # nor can its scorecards
+    threesRow = Scorecard.numToWord(3)
+    self.assertIn(threesRow, turnView.scorecard.getScorableRows([3, 3, 3, 3, 3]))
+    for scorecardView in [turnView.scorecard, turnView.opponentScorecards["b"]]:
+      with self.assertRaises(AttributeError):
+        scorecardView.updateScore(threesRow, 9)
+      with self.assertRaises(AttributeError):
+        scorecardView._scorecard = Scorecard()
+    with self.assertRaises(TypeError):
+      turnView.opponentScorecards["b"] = Scorecard()
+    self.assertIsNone(game.getPlayer("a").getScorecard().getRowScore(threesRow))
+    self.assertIsNone(game.getPlayer("b").getScorecard().getRowScore(threesRow))
+
+    # decisions are timed
+    policy = GreedyPolicy()
+    game.getPlayer("a").setStrategy(policy)
+    self.assertEqual([0, 2, 4], game.getCurrentPlayer().getStrategy().decideHeldDice(turnView))
+    self.assertEqual(Scorecard.ROW_NAME.THREE_OF_A_KIND.value, policy.decideRow(turnView))
+    policy.decideRow(turnView)
+    latencyStats = policy.getLatencyStats()
+    self.assertEqual((1, 2), (latencyStats["hold"]["count"], latencyStats["row"]["count"]))
+    self.assertGreater(latencyStats["row"]["maxSeconds"], 0)
+
+    # the optimal policy needs a table
+    OptimalPolicy._advisors.clear()
+    with tempfile.TemporaryDirectory() as tempDir:
+      OptimalPolicy.TABLE_DIR = tempDir
+      try:
+        with self.assertRaises(FileNotFoundError):
+          OptimalPolicy().decideRow(turnView)
+      finally:
+        OptimalPolicy.TABLE_DIR = "."
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_controller(self):
+
+    # the controller runs a whole game without PyQt
+    with tempfile.TemporaryDirectory() as tempDir:
+      controller = Controller(os.path.join(tempDir, "config.yaml"), guiClass=NullGUI)
+      self.assertIsInstance(controller.gui, NullGUI)
+
+      game = controller.game
+      while game.getGameStatus() != Game.STATUS.FINISHED:
+        controller.rollDice()
+        controller.toggleDiceHeldStatus(0)
+        self.assertEqual([0], game.getHeldDice())
+        controller.rollDice()
+        controller.score(GreedyPolicy().chooseRow(game.getTurnView()))
+
+      self.assertGreater(game.getTotalScores()[controller.configData["playerName"]], 0)
+
+      # new games are accepted without asking
+      controller.newGame()
+      self.assertIsNot(game, controller.game)
+      self.assertIs(controller.game, controller.gui.game)
@@ -0,0 +1,84 @@
+import unittest
+
+import os
+import sqlite3
+import tempfile
+
+from basegui import NullGUI
+from controller import Controller
+from headless import GreedyPolicy, HeadlessRunner, RandomPolicy
+from history import GameHistory
+from model import Game
+
+
+class test_GameHistory(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  def setUp(self):
+    self.tempDir = tempfile.TemporaryDirectory()
+    self.dbLoc   = os.path.join(self.tempDir.name, "history.db")
+
+  def tearDown(self):
+    self.tempDir.cleanup()
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_history(self):
+
+    history = GameHistory(self.dbLoc)
+    runner = HeadlessRunner({"greedy": GreedyPolicy(), "random": RandomPolicy()})
+    games = []
+    for seed in range(20):
+      game = runner.newGame(seed=seed)
+      runner.playGame(game)
+      history.submitGame(game)
+      games.append(game)
+    history.flush()
+
+    # high scores, best first
+    allScores = sorted((score for game in games for score in game.getTotalScores().values()), reverse=True)
+    highScores = history.getHighScores(limit=5)
+    self.assertEqual(allScores[:5], [totalScore for _, totalScore, _, _ in highScores])
+    self.assertEqual([], history.getHighScores(diceConfig=(6, 6, 3)))
+    self.assertEqual(5, len(history.getHighScores(limit=5, diceConfig=(5, 6, 3))))
+
+    # per player
+    greedyScores = [game.getTotalScores()["greedy"] for game in games]
+    stats = history.getPlayerStats("greedy")
+    self.assertEqual((20, max(greedyScores), min(greedyScores)), (stats["games"], stats["bestScore"], stats["worstScore"]))
+    self.assertAlmostEqual(sum(greedyScores) / 20, stats["meanScore"])
+    self.assertEqual(20, stats["wins"] + history.getPlayerStats("random")["wins"])
+    self.assertEqual(0, history.getPlayerStats("nobody")["games"])
+
+    # the whole scorecard is kept
+    _, bestGameId = history.getPlayerGames("greedy", limit=1)[0][1:]
+    scorecard = games[bestGameId - 1].getPlayer("greedy").getScorecard()
+    self.assertEqual({rowName: score for rowName, score in scorecard.iterateOverScorecard() if score is not None},
+                     history.getRowScores(bestGameId, 0))
+
+    # games submitted before closing are written, and the database is in WAL mode
+    history.submitGame(games[0])
+    history.close()
+    connection = sqlite3.connect(self.dbLoc)
+    self.assertEqual(21, connection.execute("SELECT COUNT(*) FROM games").fetchone()[0])
+    self.assertEqual("wal", connection.execute("PRAGMA journal_mode").fetchone()[0])
+    connection.close()
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_controller(self):
+
+    # the controller keeps finished games in the database next to its config
+    controller = Controller(os.path.join(self.tempDir.name, "config.yaml"), guiClass=NullGUI)
+    policy = GreedyPolicy()
+    game = controller.game
+    while game.getGameStatus() != Game.STATUS.FINISHED:
+      controller.rollDice()
+      controller.score(policy.chooseRow(game.getTurnView()))
+    controller.history.close()
+
+    history = GameHistory(os.path.join(self.tempDir.name, controller.configData["databaseFile"]))
+    playerName = controller.configData["playerName"]
+    self.assertEqual([(playerName, game.getTotalScores()[playerName])],
+                     [highScore[:2] for highScore in history.getHighScores()])
+    history.close()
@@ -0,0 +1,256 @@
+import unittest
+
+import itertools
+import random
+
+import numpy as np
+
+from hand import Hand
+from model import ArrayScorecard, Game, Scorecard
+from scoretable import ScoreTable
+
+
+class test_PointsCalculator(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @staticmethod
+  def _expectedBatchRow(results, rowName):
+    """ Value calculateBatch should give, based on the results of calculate """
+    score = results.get(rowName, None)
+    return Scorecard.PointsCalculator.NO_SCORE if score is None else score
+  
+  def _compareBatch(self, scorecard, numberOfDice, rowNameList):
+    """
+    # Check calculateBatch matches calculate for every possible hand
+    #  -calculate adds the yahtzee bonus by itself, so also ask the batch for it
+    """
+    
+    hands = list(itertools.combinations_with_replacement(range(1, scorecard.numberOfDiceFaces+1), numberOfDice))
+    batchRowNames = rowNameList + [Scorecard.ROW_NAME.YAHTZEE_BONUS.value]
+    
+    pointsCalc = Scorecard.PointsCalculator(scorecard)
+    batchScores = pointsCalc.calculateBatch(batchRowNames, np.array(hands))
+    
+    for iHand, hand in enumerate(hands):
+      results = pointsCalc.calculate(rowNameList, list(hand))
+      expected = [self._expectedBatchRow(results, rowName) for rowName in batchRowNames]
+      self.assertEqual(expected, batchScores[iHand].tolist(), msg="hand: {}".format(hand))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_calculateBatch(self):
+    
+    for numberOfDice, numberOfDiceFaces in [(5, 6), (6, 8), (9, 6)]:
+      scorecard = Scorecard(numberOfDiceFaces)
+      self._compareBatch(scorecard, numberOfDice, scorecard.getFreeRows())
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_calculateBatchJoker(self):
+    
+    scorecard = Scorecard(6)
+    scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.POINTS.YAHTZEE.value)
+    
+    # all free rows, then with the upper sections filled in
+    self._compareBatch(scorecard, 5, scorecard.getFreeRows())
+    for num in range(1, 7):
+      scorecard.updateScore(Scorecard.numToWord(num), 0)
+    self._compareBatch(scorecard, 5, scorecard.getFreeRows())
+    
+    # single upper rows, as scored by the game
+    scorecard = Scorecard(6)
+    scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.POINTS.YAHTZEE.value)
+    for rowName in scorecard.getFreeRows():
+      self._compareBatch(scorecard, 5, [rowName])
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_scoreTableLookup(self):
+    """ Scores looked up in the ScoreTable match those worked out from the dice """
+
+    # scorecards with and without the joker rule, and with a bonus already scored
+    scorecards = []
+    for numberOfDice, numberOfDiceFaces in [(5, 6), (6, 8)]:
+      scorecards.append((Scorecard(numberOfDiceFaces), numberOfDice))
+      scorecard = Scorecard(numberOfDiceFaces)
+      scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.POINTS.YAHTZEE.value)
+      scorecards.append((scorecard, numberOfDice))
+      scorecard = Scorecard(numberOfDiceFaces)
+      scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.POINTS.YAHTZEE.value)
+      scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE_BONUS.value, Scorecard.POINTS.YAHTZEE_BONUS.value)
+      for num in range(1, 4):
+        scorecard.updateScore(Scorecard.numToWord(num), 0)
+      scorecards.append((scorecard, numberOfDice))
+
+    for scorecard, numberOfDice in scorecards:
+      hands = list(itertools.combinations_with_replacement(range(1, scorecard.numberOfDiceFaces+1), numberOfDice))
+      rowNameLists = [scorecard.getFreeRows()] + [[rowName] for rowName in scorecard.getFreeRows()]
+
+      lookupCalc = Scorecard.PointsCalculator(scorecard)
+      lookupResults = [[lookupCalc.calculate(rowNameList, list(hand)) for rowNameList in rowNameLists]
+                       for hand in hands]
+      lookupBatch = lookupCalc.calculateBatch(scorecard.getFreeRows(), np.array(hands))
+      self.assertIs(ScoreTable.getTable(numberOfDice, scorecard.numberOfDiceFaces), lookupCalc.scoreTable)
+
+      # without a table, scores are worked out from the dice
+      maxLookupHands = ScoreTable.MAX_LOOKUP_HANDS
+      ScoreTable.MAX_LOOKUP_HANDS = 0
+      try:
+        diceCalc = Scorecard.PointsCalculator(scorecard)
+        diceResults = [[diceCalc.calculate(rowNameList, list(hand)) for rowNameList in rowNameLists]
+                       for hand in hands]
+        diceBatch = diceCalc.calculateBatch(scorecard.getFreeRows(), np.array(hands))
+        self.assertIsNone(diceCalc.scoreTable)
+      finally:
+        ScoreTable.MAX_LOOKUP_HANDS = maxLookupHands
+
+      self.assertEqual(diceResults, lookupResults)
+      self.assertEqual(diceBatch.tolist(), lookupBatch.tolist())
+
+
+class test_Hand(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_counts(self):
+    
+    hand = Hand([4, 2, None, 4, 6])
+    self.assertEqual(2, hand.getCount(4))
+    self.assertEqual(0, hand.getCount(5))
+    self.assertEqual((2, 4, 6), hand.uniqueFaces)
+    self.assertEqual(16, hand.total)
+    self.assertEqual(4, hand.numberOfDice)
+    self.assertEqual((1 << 2) | (1 << 4) | (1 << 6), hand.faceMask)
+    self.assertEqual([2, 4, 4, 6], hand.getDiceValues())
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_straights(self):
+    
+    self.assertTrue(Hand([3, 5, 4, 1, 2]).hasStraight(5))
+    self.assertTrue(Hand([3, 5, 4, 1, 1]).hasStraight(3))
+    self.assertFalse(Hand([3, 5, 4, 1, 1]).hasStraight(4))
+    self.assertTrue(Hand([19, 20, 18, 17, 17]).hasStraight(4))
+
+
+
+class test_ArrayScorecard(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  def _assertSameScorecard(self, scorecard, arrayScorecard):
+    """ Check both scorecards hold the same scores """
+    self.assertEqual(list(scorecard.iterateOverScorecard()), list(arrayScorecard.iterateOverScorecard()))
+    self.assertEqual(scorecard.getFreeRows(), arrayScorecard.getFreeRows())
+    self.assertEqual(scorecard.getTotalScore(), arrayScorecard.getTotalScore())
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_matchesScorecard(self):
+    """ Play the same random games on both scorecards """
+    
+    rng = random.Random(1234)
+    
+    for numberOfDiceFaces in [6, 6, 6, 10, 20]:
+      scorecard      = Scorecard(numberOfDiceFaces)
+      arrayScorecard = ArrayScorecard(numberOfDiceFaces)
+      self.assertEqual(scorecard.getRowNames(), arrayScorecard.getRowNames())
+      self._assertSameScorecard(scorecard, arrayScorecard)
+      
+      while scorecard.getFreeRows():
+        
+        # roll plenty of yahtzees, so the joker rules come into play
+        if rng.random() < 0.3:
+          diceValues = [rng.randint(1, numberOfDiceFaces)] * 5
+        else:
+          diceValues = [rng.randint(1, numberOfDiceFaces) for _ in range(5)]
+        
+        # possible scores match
+        self.assertEqual(list(scorecard.getPossibleScorecard(diceValues).iterateOverScorecard()),
+                         list(arrayScorecard.getPossibleScorecard(diceValues).iterateOverScorecard()))
+        
+        # score in a random row the game would allow
+        rowNames = [x for x in scorecard.getFreeRows() if scorecard.canScoreRow(x, diceValues)]
+        self.assertEqual(rowNames, [x for x in arrayScorecard.getFreeRows()
+                                     if arrayScorecard.canScoreRow(x, diceValues)])
+        rowName = rng.choice(rowNames)
+        
+        for card in (scorecard, arrayScorecard):
+          scores = Scorecard.PointsCalculator(card).calculate([rowName], diceValues)
+          for scoreName, scoreValue in scores.items():
+            card.updateScore(scoreName, scoreValue)
+        
+        self._assertSameScorecard(scorecard, arrayScorecard)
+
+
+class test_PossibleScorecard(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_getPossibleScorecard(self):
+    
+    for scorecardClass in (Scorecard, ArrayScorecard):
+      scorecard = scorecardClass(6)
+      scorecard.updateScore("Sixes", 18)
+      
+      possible = scorecard.getPossibleScorecard([6, 6, 6, 2, 2])
+      self.assertEqual(scorecard.getRowNames(), [rowName for rowName, _ in possible.iterateOverScorecard()])
+      
+      # filled rows, totals and bonuses are None
+      self.assertIsNone(possible.getRowScore("Sixes"))
+      self.assertIsNone(possible.getRowScore(Scorecard.ROW_NAME.UPPER_TOTAL.value))
+      self.assertIsNone(possible.getRowScore(Scorecard.ROW_NAME.LOWER_TOTAL.value))
+      self.assertEqual(25, possible.getRowScore(Scorecard.ROW_NAME.FULL_HOUSE.value))
+      
+      # the same view is refilled on the next call
+      self.assertIs(possible, scorecard.getPossibleScorecard([1, 2, 3, 4, 5], rowNameList=["Ones"]))
+      self.assertEqual(1, possible.getRowScore("Ones"))
+      self.assertIsNone(possible.getRowScore(Scorecard.ROW_NAME.FULL_HOUSE.value))
+
+
+
+class test_Game(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  def _playRandomGame(self, game, rng):
+    """ Play <game> to the end, making random choices from <rng> """
+    game.setStatus(Game.STATUS.RUNNING)
+    while game.getGameStatus() != Game.STATUS.FINISHED:
+      game.rollDice()
+      while game.getRemainingRolls() > 0:
+        for iDice in range(game.getNumberOfDice()):
+          game.setDiceHold(iDice, rng.random() < 0.5)
+        game.rollDice()
+      freeRows = game.getCurrentPlayer().getScorecard().getFreeRows()
+      game.score(rng.choice(freeRows))
+      game.advanceTurn()
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_replay(self):
+    
+    game = Game(["a", "b"], numberOfDice=6, scorecardClass=ArrayScorecard, seed=12)
+    self._playRandomGame(game, random.Random(0))
+    
+    # the seed and actions replay the same game
+    replayed = Game.replay(["a", "b"], game.getSeedSequence(), game.getActions(), numberOfDice=6,
+                           scorecardClass=ArrayScorecard)
+    self.assertEqual(Game.STATUS.FINISHED, replayed.getGameStatus())
+    self.assertEqual(game.getActions(), replayed.getActions())
+    for player, replayedPlayer in zip(game.getAllPlayers(), replayed.getAllPlayers()):
+      self.assertEqual(list(player.getScorecard().iterateOverScorecard()),
+                       list(replayedPlayer.getScorecard().iterateOverScorecard()))
+    
+    # the same seed rolls the same dice, and spawned seeds roll different dice
+    rolls = []
+    for seed in [5, 5] + np.random.SeedSequence(5).spawn(2):
+      game = Game(["a"], seed=seed)
+      game.rollDice()
+      game.advanceTurn()
+      game.rollDice()
+      rolls.append(game.getDiceValues())
+    self.assertEqual(rolls[0], rolls[1])
+    self.assertNotEqual(rolls[2], rolls[3])
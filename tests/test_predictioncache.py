@@ -0,0 +1,90 @@
+import unittest
+
+import os
+import tempfile
+
+import numpy as np
+
+from predictioncache import PredictionCache
+from predictor import ProbabilityPredictor
+
+
+class test_PredictionCache(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  def setUp(self):
+    self.tempDir = tempfile.TemporaryDirectory()
+    self.cacheLoc = os.path.join(self.tempDir.name, "predictor-cache")
+
+  def tearDown(self):
+    self.tempDir.cleanup()
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_eviction(self):
+
+    cache = PredictionCache(maxSize=2)
+    self.assertEqual(1, cache.getOrCalculate("a", lambda: 1))
+    self.assertEqual(2, cache.getOrCalculate("b", lambda: 2))
+
+    # using "a" makes "b" the least recently used, so it goes first
+    self.assertEqual(1, cache.getOrCalculate("a", lambda: -1))
+    cache.put("c", 3)
+    self.assertNotIn("b", cache)
+    self.assertIn("a", cache)
+
+    stats = cache.getStats()
+    self.assertEqual((1, 2, 1, 2), (stats["hits"], stats["misses"], stats["evictions"], stats["size"]))
+    cache.resetStats()
+    self.assertEqual(0, cache.getStats()["hits"])
+
+    with self.assertRaises(ValueError):
+      PredictionCache(maxSize=0)
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_disk(self):
+
+    cache = PredictionCache(maxSize=1, diskLoc=self.cacheLoc)
+    cache.put(("config", (1, 2)), np.arange(3))
+    cache.put("other", 1)
+    cache.close()
+
+    # entries come back from disk after a restart, and after being evicted
+    cache = PredictionCache(maxSize=1, diskLoc=self.cacheLoc)
+    self.assertTrue(np.array_equal(np.arange(3), cache.get(("config", (1, 2)))))
+    self.assertEqual(1, cache.getOrCalculate("other", lambda: -1))
+    self.assertEqual(2, cache.getStats()["diskHits"])
+    self.assertEqual(0, cache.getStats()["misses"])
+    cache.close()
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_predictor(self):
+
+    oldCache = ProbabilityPredictor.cache
+    try:
+      ProbabilityPredictor.setCache(PredictionCache(maxSize=64))
+
+      diceValues = [2, 2, 5, 6, 1]
+      probs = ProbabilityPredictor.getAtLeastProbabilities(diceValues, 2)
+
+      # same hand in a different order is a hit, and callers get their own copy
+      probs[:] = 0
+      probs2 = ProbabilityPredictor.getAtLeastProbabilities(diceValues[::-1], 2)
+      self.assertTrue(np.all(probs2 > 0))
+      stats = ProbabilityPredictor.getCacheStats()
+      self.assertEqual((1, 1), (stats["hits"], stats["misses"]))
+
+      # held results only depend on the held dice
+      ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, [0, 1], 2)
+      ProbabilityPredictor.getHeldAtLeastProbabilities([2, 2, 3, 3, 3], [0, 1], 2)
+      self.assertEqual(2, ProbabilityPredictor.getCacheStats()["hits"])
+
+      # warming up fills the cache, up to its size
+      numCalculated = ProbabilityPredictor.warmUp(5, 6, 3)
+      self.assertGreater(numCalculated, 64)
+      self.assertEqual(64, len(ProbabilityPredictor.cache))
+      self.assertGreater(ProbabilityPredictor.getCacheStats()["evictions"], 0)
+
+    finally:
+      ProbabilityPredictor.setCache(oldCache)
@@ -1,10 +1,14 @@
 import unittest
 
+import itertools
 import random
 
+from fractions import Fraction
+
 import numpy as np
 
-from yahtzee.predictor import ProbabilityPredictor
+from predictor import ProbabilityPredictor
+from model import Game, Scorecard
 
 
 class test_ProbabilityPredictor(unittest.TestCase):
@@ -14,25 +18,23 @@ class test_ProbabilityPredictor(unittest.TestCase):
 
   @unittest.skipIf(not TEST_ALL, " not part of individual test")
   def test_Operations(self):
-    res = ProbabilityPredictor.probExactlyXDice(1,3,6)
-    print(res)
-    print(float(res))
     
-    print("at least 1")
+    res = ProbabilityPredictor.probExactlyXDice(1,3,6)
+    self.assertAlmostEqual(3 * (1/6) * (5/6)**2, float(res))
     
     res2 = ProbabilityPredictor.probAtLeastXDice(2,3,6)
-    print(res2)
-    print(float(res2))
+    self.assertAlmostEqual(3 * (1/6)**2 * (5/6) + (1/6)**3, float(res2))
 
-    print("of a kind")
+    # one roll of dice that haven't been rolled yet
     diceValues = [None]*5
-    res3 = ProbabilityPredictor.ofAKind(1, diceValues, numDieFaces=6, numTurns=1, canHold=True)
-    print(res3)
+    res3 = ProbabilityPredictor.ofAKind(1, diceValues, 1, numDieFaces=6, canHold=True)
+    for numOccurrences in range(1, 6):
+      self.assertAlmostEqual(float(ProbabilityPredictor.probAtLeastXDice(numOccurrences, 5, 6)), res3[numOccurrences])
     
   @unittest.skipIf(not TEST_ALL, " not part of individual test")
   def test_ofAKind(self):
     
-    kind           = 3
+    kind           = 2
     diceValues     = [1, 2, 2, 3, 4]
     turnsRemaining = 1
     numDieFaces    = 6
@@ -40,6 +42,159 @@ class test_ProbabilityPredictor(unittest.TestCase):
     res = ProbabilityPredictor.ofAKind(kind, diceValues, turnsRemaining,
                                        numDieFaces=numDieFaces, canHold=canHold)
     
-    print(res)
-    #print(["{}: {}".format(k, v.numerator/v.denominator) for k,v in res.items()])
-    
\ No newline at end of file
+    # already have two, so hold them and roll the rest
+    self.assertEqual(1.0, res[1])
+    self.assertEqual(1.0, res[2])
+    self.assertAlmostEqual(1 - (5/6)**3, res[3])
+    self.assertAlmostEqual((1/6)**3, res[5])
+    
+    # nothing left to roll
+    res = ProbabilityPredictor.ofAKind(kind, diceValues, 0)
+    self.assertEqual({1: 1.0, 2: 1.0, 3: 0.0, 4: 0.0, 5: 0.0}, res)
+    
+    # without holding, all the dice are rolled each time
+    res = ProbabilityPredictor.ofAKind(kind, [None]*5, 3, canHold=False)
+    self.assertAlmostEqual(1 - (1 - (1/6)**5)**3, res[5])
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_categories(self):
+    
+    # one roll: compare against every ordered roll
+    res = ProbabilityPredictor.getCategoryProbabilities([None]*5, 1)
+    pointsCalc = Scorecard.PointsCalculator(Scorecard(6))
+    counts = dict.fromkeys(res, 0)
+    for roll in itertools.product(range(1, 7), repeat=5):
+      scores = pointsCalc.calculate(list(res)[:6], list(roll))
+      for rowName, score in scores.items():
+        counts[rowName] += score > 0
+      for face in range(1, 7):
+        counts[Scorecard.numToWord(face)] += roll.count(face) >= 3
+    for rowName, count in counts.items():
+      self.assertAlmostEqual(count / 6**5, res[rowName], msg=rowName)
+    
+    # three rolls, going for each category
+    res = ProbabilityPredictor.getCategoryProbabilities([None]*5, 3)
+    self.assertAlmostEqual(0.04602864, res[Scorecard.ROW_NAME.YAHTZEE.value], places=7)
+    
+    # more rolls never hurts
+    for diceValues in ([None]*5, [random.randint(1, 6) for _ in range(5)]):
+      probs = [list(ProbabilityPredictor.getCategoryProbabilities(diceValues, x).values()) for x in range(3)]
+      self.assertTrue(np.all(np.diff(probs, axis=0) >= -1e-12))
+    
+    # grid of at least k of each face
+    grid = ProbabilityPredictor.getAtLeastProbabilities([6, 6, 6, 1, 2], 2)
+    self.assertEqual((6, 5), grid.shape)
+    self.assertTrue(np.all(grid[5, :3] == 1.0))
+    self.assertAlmostEqual(1 - (25/36)**2, grid[5, 3])
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_backends(self):
+    
+    EXACT = ProbabilityPredictor.BACKEND.EXACT
+    FLOAT = ProbabilityPredictor.BACKEND.FLOAT
+    
+    # the float backend agrees with the exact one for every supported config
+    for numDice in range(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE + 1):
+      numInstances = np.arange(numDice + 1)
+      for numDieFaces in range(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES + 1):
+        
+        exactProbs = [ProbabilityPredictor.probExactlyXDice(k, numDice, numDieFaces, EXACT) for k in numInstances]
+        floatProbs = ProbabilityPredictor.probExactlyXDice(numInstances, numDice, numDieFaces, FLOAT)
+        self.assertTrue(np.allclose(np.array(exactProbs, dtype=float), floatProbs, rtol=1e-12, atol=0))
+        
+        exactProbs = [ProbabilityPredictor.probAtLeastXDice(k, numDice, numDieFaces, EXACT) for k in numInstances]
+        floatProbs = ProbabilityPredictor.probAtLeastXDice(numInstances, numDice, numDieFaces, FLOAT)
+        self.assertTrue(np.allclose(np.array(exactProbs, dtype=float), floatProbs, rtol=1e-12, atol=0))
+        
+        for rollsRemaining in (1, Game.MAX_NUM_ROLLS):
+          for canHold in (True, False):
+            exactProbs = ProbabilityPredictor.probAtLeastByEnd(numInstances, numDice, numDieFaces, rollsRemaining,
+                                                               canHold, EXACT)
+            floatProbs = ProbabilityPredictor.probAtLeastByEnd(numInstances, numDice, numDieFaces, rollsRemaining,
+                                                               canHold, FLOAT)
+            self.assertTrue(np.allclose(exactProbs.astype(float), floatProbs, rtol=1e-12, atol=1e-15))
+    
+    # the default backend can be switched
+    try:
+      ProbabilityPredictor.setBackend(EXACT)
+      self.assertIsInstance(ProbabilityPredictor.probAtLeastXDice(2, 5, 6), Fraction)
+    finally:
+      ProbabilityPredictor.setBackend(FLOAT)
+    self.assertIsInstance(ProbabilityPredictor.probAtLeastXDice(2, 5, 6), float)
+    
+    # holding all of a face is the best way to get at least k of it, so this
+    # matches the full hand chain
+    chain = ProbabilityPredictor.getHandChain(5, 6)
+    for _ in range(20):
+      diceValues = [random.randint(1, 6) for _ in range(5)]
+      for canHold in (True, False):
+        handProbs = chain.getProbabilities("atLeast", chain.getAtLeastTargets(), diceValues, 2, canHold)
+        gridProbs = ProbabilityPredictor.getAtLeastProbabilities(diceValues, 2, canHold=canHold)
+        self.assertTrue(np.allclose(handProbs.reshape(6, 5), gridProbs))
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_monteCarlo(self):
+    
+    estimator = ProbabilityPredictor.MonteCarloEstimator(5, 6, rng=np.random.default_rng(2))
+    
+    # estimates are within their (99.9%) intervals of the exact probabilities,
+    # where the hold policies are the optimal ones
+    diceValues = [2, 2, 5, 6, 1]
+    estimates  = estimator.estimate(diceValues, 2, precision=0.003, timeBudget=30, confidence=0.999)
+    exactProbs = ProbabilityPredictor.getAtLeastProbabilities(diceValues, 2)
+    for face in range(1, 7):
+      for k in range(1, 6):
+        est = estimates[(face, k)]
+        self.assertLessEqual(est.upper - est.lower, 2 * 0.003)
+        self.assertTrue(est.lower <= exactProbs[face-1, k-1] <= est.upper, (face, k, est))
+    
+    exactProbs = ProbabilityPredictor.getCategoryProbabilities(diceValues, 2)
+    for rowName in (Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.numToWord(2)):
+      est = estimates[rowName]
+      self.assertTrue(est.lower <= exactProbs[rowName] <= est.upper, (rowName, est))
+    
+    # stops on the trial limit, and runs at least one batch on no time at all
+    estimates = estimator.estimate([None]*5, 3, precision=0, timeBudget=60, maxTrials=1000)
+    self.assertEqual(1000, estimates[Scorecard.ROW_NAME.YAHTZEE.value].numTrials)
+    estimates = estimator.estimate([None]*5, 3, precision=0, timeBudget=0, maxTrials=1000)
+    self.assertEqual(1000, estimates[Scorecard.ROW_NAME.YAHTZEE.value].numTrials)
+    
+    # nothing left to roll
+    estimates = estimator.estimate([3, 3, 3, 3, 3], 0, maxTrials=100)
+    self.assertEqual(1.0, estimates[Scorecard.ROW_NAME.YAHTZEE.value].probability)
+    self.assertEqual(0.0, estimates[Scorecard.ROW_NAME.FULL_HOUSE.value].probability)
+    
+    # straight from a game
+    game = Game(["p1"])
+    game.rollDice()
+    estimates = ProbabilityPredictor.estimateGameProbabilities(game, maxTrials=1000)
+    self.assertEqual(len(estimates), len(estimator.estimate(game.getDiceValues(), 2, maxTrials=1)))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_heldAtLeast(self):
+    
+    diceValues = [2, 2, 5, 6, 1]
+    bestProbs  = ProbabilityPredictor.getAtLeastProbabilities(diceValues, 2)
+    
+    # holding every die showing a face is the best hold for that face
+    for face in range(1, 7):
+      heldDice = [iDice for iDice, value in enumerate(diceValues) if value == face]
+      heldProbs = ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, heldDice, 2)
+      self.assertTrue(np.allclose(bestProbs[face-1], heldProbs[face-1]))
+      self.assertTrue(np.all(heldProbs <= bestProbs + 1e-12))
+    
+    # holding a face's dice on the last roll
+    heldProbs = ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, [0, 1], 1)
+    self.assertAlmostEqual(1.0, heldProbs[1, 1])
+    self.assertAlmostEqual(float(ProbabilityPredictor.probAtLeastXDice(1, 3, 6)), heldProbs[1, 2])
+    self.assertAlmostEqual(float(ProbabilityPredictor.probAtLeastXDice(1, 3, 6)), heldProbs[0, 0])
+    
+    # the backends agree
+    EXACT = ProbabilityPredictor.BACKEND.EXACT
+    exactProbs = ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, [2, 3], 2, backend=EXACT)
+    self.assertTrue(np.allclose(exactProbs.astype(float),
+                                ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, [2, 3], 2)))
+    
+    # nothing to hold before the first roll
+    self.assertTrue(np.allclose(ProbabilityPredictor.getAtLeastProbabilities([None]*5, 3),
+                                ProbabilityPredictor.getHeldAtLeastProbabilities([None]*5, [], 3)))
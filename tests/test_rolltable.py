@@ -0,0 +1,92 @@
+import unittest
+
+import itertools
+import os
+import tempfile
+
+from concurrent import futures
+
+import numpy as np
+
+from rolltable import RollTable
+
+
+class test_RollTable(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_outcomes(self):
+    
+    # compare against every ordered roll
+    for numberOfRolled, numberOfDiceFaces in [(0, 6), (1, 6), (3, 6), (4, 8)]:
+      outcomes, outcomeProbs = RollTable.getOutcomes(numberOfRolled, numberOfDiceFaces)
+      self.assertAlmostEqual(1.0, outcomeProbs.sum())
+      
+      counts = {}
+      for roll in itertools.product(range(1, numberOfDiceFaces + 1), repeat=numberOfRolled):
+        counts[tuple(sorted(roll))] = counts.get(tuple(sorted(roll)), 0) + 1
+      self.assertEqual(len(counts), len(outcomes))
+      for outcome, outcomeProb in zip(outcomes.tolist(), outcomeProbs):
+        self.assertAlmostEqual(counts[tuple(outcome)] / numberOfDiceFaces ** numberOfRolled, outcomeProb)
+    
+    # threads asking at once all get the one cached entry
+    RollTable._outcomeCache.pop((5, 11), None)
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(executor.map(lambda _: RollTable.getOutcomes(5, 11), range(8)))
+    self.assertTrue(all(result is results[0] for result in results))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_transitions(self):
+    
+    rollTable = RollTable.getTable(5, 6)
+    scoreTable = rollTable.scoreTable
+    
+    # kept dice plus rolled dice give the merged hand
+    heldDice = (6, 2)
+    nextHands, outcomeProbs = rollTable.getKeepOutcomes(rollTable.getKeepIndex(heldDice))
+    outcomes, _ = RollTable.getOutcomes(3, 6)
+    for nextHand, outcome in zip(nextHands, outcomes.tolist()):
+      self.assertEqual(scoreTable.rankHand(list(heldDice) + outcome), nextHand)
+    
+    # each hand's keeps are its distinct sub-multisets
+    for diceValues, numKeeps in [([1, 2, 3, 4, 5], 32), ([1, 1, 2, 2, 3], 18), ([4, 4, 4, 4, 4], 6)]:
+      keeps = np.unique(rollTable.handKeeps[scoreTable.rankHand(diceValues)])
+      self.assertEqual(numKeeps, len(keeps))
+      self.assertIn(rollTable.getKeepIndex(diceValues[:2]), keeps)
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_diskCache(self):
+    
+    builtTable = RollTable(4, 7)
+    self.assertFalse(builtTable.isMapped())
+    
+    # built into the cache, then loaded from it, memory-mapped both times
+    with tempfile.TemporaryDirectory() as cacheDir:
+      try:
+        RollTable.setCacheDir(cacheDir)
+        cachedTables = [RollTable(4, 7), RollTable(4, 7)]
+      finally:
+        RollTable.setCacheDir(None)
+      
+      for cachedTable in cachedTables:
+        self.assertTrue(cachedTable.isMapped())
+        self.assertIsInstance(cachedTable.handKeeps, np.memmap)
+        self.assertEqual(builtTable.getArrayBytes(), cachedTable.getArrayBytes())
+        self.assertTrue(np.array_equal(builtTable.handKeeps, cachedTable.handKeeps))
+        for builtTransition, cachedTransition in zip(builtTable.transitions, cachedTable.transitions):
+          for builtArray, cachedArray in zip(builtTransition, cachedTransition):
+            self.assertIsInstance(cachedArray, np.memmap)
+            self.assertTrue(np.array_equal(builtArray, cachedArray))
+      self.assertEqual(["rolltable-4d7-v{}".format(RollTable.CACHE_VERSION)], os.listdir(cacheDir))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_maxKeeps(self):
+    
+    # the hand with the most distinct keeps is the one the table is sized by
+    for numberOfDice, numberOfDiceFaces in [(5, 6), (7, 6), (4, 7), (9, 6), (6, 10)]:
+      rollTable = RollTable.getTable(numberOfDice, numberOfDiceFaces)
+      numKeeps = [len(set(row)) for row in rollTable.handKeeps.tolist()]
+      self.assertEqual(max(numKeeps), RollTable.countMaxKeeps(numberOfDice, numberOfDiceFaces))
+      self.assertEqual(max(numKeeps), rollTable.handKeeps.shape[1])
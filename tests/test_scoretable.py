@@ -0,0 +1,36 @@
+import unittest
+
+import itertools
+
+import numpy as np
+
+from model import Scorecard
+from scoretable import ScoreTable
+
+
+class test_ScoreTable(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_rank(self):
+    
+    for numberOfDice, numberOfDiceFaces in [(5, 6), (7, 10), (9, 6)]:
+      table = ScoreTable.getTable(numberOfDice, numberOfDiceFaces)
+      self.assertEqual(ScoreTable.countHands(numberOfDice, numberOfDiceFaces), table.numberOfHands)
+      
+      # ranks are a one-to-one mapping onto the stored hands
+      self.assertTrue((table.rankHands(table.hands) == np.arange(table.numberOfHands)).all())
+      
+      hand = list(table.getHand(table.numberOfHands // 2))
+      self.assertEqual(table.numberOfHands // 2, table.rankHand(reversed(hand)))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_scores(self):
+    
+    table = ScoreTable.getTable(5, 6)
+    pointsCalc = Scorecard.PointsCalculator(Scorecard(6))
+    
+    for hand in itertools.combinations_with_replacement(range(1, 7), 5):
+      self.assertEqual(pointsCalc.calculate(table.rowNames, list(hand)), table.getRowScores(hand))
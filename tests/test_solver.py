@@ -0,0 +1,234 @@
+import unittest
+
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import solver as solverModule
+
+from layerstore import LayerStore
+from model import ArrayScorecard, Scorecard
+from rolltable import RollTable
+from solver import StrategySolver
+
+
+class test_StrategySolver(unittest.TestCase):
+  
+  # perform all tests in this class
+  TEST_ALL = True
+  
+  @classmethod
+  def setUpClass(cls):
+    cls.solver = StrategySolver(5, 6, 3)
+  
+  def _solveSingleRow(self, rowName):
+    """ Value of a scorecard with only <rowName> left to score """
+    solver = self.solver
+    values = np.zeros((2 ** solver.numberOfRows, solver.numberOfUpperTotals, 2))
+    freeRowMask = 1 << solver.rowNames.index(rowName)
+    return solver._solveStates(np.array([freeRowMask]), values)[0]
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_transitions(self):
+    
+    rollTable = self.solver.rollTable
+    
+    # every keep leads somewhere
+    self.assertTrue(np.allclose(rollTable.getTransitionMatrix().sum(axis=1), 1.0))
+    for nextHands, outcomeProbs in rollTable.transitions:
+      self.assertAlmostEqual(1.0, outcomeProbs.sum())
+    
+    # hands with all different dice have a keep for every subset, whilst a
+    # yahtzee has one for every number of dice
+    table = rollTable.scoreTable
+    self.assertEqual(32, len(np.unique(rollTable.handKeeps[table.rankHand([1, 2, 3, 4, 5])])))
+    self.assertEqual(6,  len(np.unique(rollTable.handKeeps[table.rankHand([4, 4, 4, 4, 4])])))
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_singleRow(self):
+    
+    # chance: each die is rerolled unless it beats the expected reroll
+    self.assertAlmostEqual(5 * 14 / 3, self._solveSingleRow(Scorecard.ROW_NAME.CHANCE.value)[0, 0])
+    
+    # yahtzee: 50 x probability of a yahtzee in three rolls
+    self.assertAlmostEqual(50 * 0.04602864, self._solveSingleRow(Scorecard.ROW_NAME.YAHTZEE.value)[0, 0], places=5)
+    
+    # upper section: bonus is earned when the threshold is reached
+    sixes = self._solveSingleRow("Sixes")
+    self.assertGreater(sixes[63 - 6, 0] - sixes[63 - 30, 0], Scorecard.POINTS.UPPER_BONUS.value * 0.5)
+    self.assertAlmostEqual(sixes[63, 0], sixes[0, 0])
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_stateKey(self):
+    
+    solver = self.solver
+    for scorecardClass in (Scorecard, ArrayScorecard):
+      scorecard = scorecardClass(6)
+      self.assertEqual((2 ** 13 - 1, 0, 0), solver.getStateKey(scorecard))
+      
+      scorecard.updateScore("Fives", 20)
+      scorecard.updateScore("Sixes", 30)
+      scorecard.updateScore("Fours", 16)
+      scorecard.updateScore(Scorecard.ROW_NAME.YAHTZEE.value, Scorecard.POINTS.YAHTZEE.value)
+      freeRowMask, upperTotal, yahtzeeScored = solver.getStateKey(scorecard)
+      self.assertEqual(2 ** 13 - 1 - (1 << 3) - (1 << 4) - (1 << 5) - (1 << 12), freeRowMask)
+      self.assertEqual(63, upperTotal)
+      self.assertEqual(1, yahtzeeScored)
+
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_workers(self):
+    
+    solver = self.solver
+    valuesShape = (2 ** solver.numberOfRows, solver.numberOfUpperTotals, 2)
+    
+    # solve the first layers in this process
+    values = np.zeros(valuesShape)
+    for numberOfFreeRows in (1, 2):
+      solver._solveLayer(numberOfFreeRows, values)
+    
+    # and in worker processes sharing their values
+    memory = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+      sharedValues = np.ndarray(valuesShape, dtype=np.float64, buffer=memory.buf)
+      sharedValues[:] = 0.0
+      with ProcessPoolExecutor(2, initializer=solverModule._initWorker,
+                               initargs=((5, 6, 3), memory.name, valuesShape)) as executor:
+        for numberOfFreeRows in (1, 2):
+          solver._solveLayer(numberOfFreeRows, sharedValues, executor, numberOfWorkers=2)
+      self.assertTrue(np.allclose(values, sharedValues))
+      self.assertGreater(sharedValues[solver.getLayerMasks(2)].min(), 0.0)
+    finally:
+      del sharedValues
+      memory.close()
+      memory.unlink()
+
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_checkpoints(self):
+    
+    solver = self.solver
+    valuesShape = (2 ** solver.numberOfRows, solver.numberOfUpperTotals, 2)
+    
+    values = np.zeros(valuesShape)
+    with tempfile.TemporaryDirectory() as checkpointDir:
+      for numberOfFreeRows in (1, 2):
+        solver._solveLayer(numberOfFreeRows, values)
+        solver._saveCheckpoint(checkpointDir, numberOfFreeRows, values)
+      
+      # resume from the last complete layer
+      resumedValues = np.zeros(valuesShape)
+      self.assertEqual(2, solver._loadCheckpoints(checkpointDir, resumedValues))
+      self.assertTrue(np.array_equal(values, resumedValues))
+      
+      # checkpoints from another config are rejected
+      otherSolver = StrategySolver(5, 6, 2)
+      with self.assertRaises(ValueError):
+        otherSolver._loadCheckpoints(checkpointDir, np.zeros(valuesShape))
+      
+      # a solve that doesn't say to resume or restart leaves the checkpoints alone
+      self.assertTrue(solver.hasCheckpoints(checkpointDir))
+      with self.assertRaises(FileExistsError):
+        solver.solve(checkpointDir=checkpointDir)
+      with self.assertRaises(ValueError):
+        solver.solve(checkpointDir=checkpointDir, resume=True, restart=True)
+      self.assertEqual(2, solver._loadCheckpoints(checkpointDir, resumedValues))
+      
+      solver.clearCheckpoints(checkpointDir)
+      self.assertFalse(solver.hasCheckpoints(checkpointDir))
+      self.assertEqual([], os.listdir(checkpointDir))
+      self.assertEqual(0, solver._loadCheckpoints(checkpointDir, resumedValues))
+    
+    with self.assertRaises(ValueError):
+      solver.solve(resume=True)
+
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_outOfCore(self):
+    
+    solver = self.solver
+    valuesShape = (2 ** solver.numberOfRows, solver.numberOfUpperTotals, 2)
+    
+    # masks are ranked by their position in their layer
+    allMasks  = np.arange(2 ** solver.numberOfRows)
+    popCounts = LayerStore.countFreeRows(allMasks, solver.numberOfRows)
+    for numberOfFreeRows in (0, 1, 5, 13):
+      layerMasks = solver.getLayerMasks(numberOfFreeRows)
+      self.assertTrue(np.array_equal(allMasks[popCounts == numberOfFreeRows], layerMasks))
+    with tempfile.TemporaryDirectory() as storeDir:
+      store = solver._createLayerStore(storeDir)
+      self.assertTrue(np.array_equal(np.arange(len(layerMasks)), store.getLayerRanks(layerMasks)))
+    
+    # a small memory budget splits each mask's states up by upper total
+    tableBytes = sum(solver.getTableMemory())
+    masksPerBlock, totalsPerBlock = solver.getBlockShape(tableBytes + 2**20)
+    self.assertEqual(1, masksPerBlock)
+    self.assertLess(totalsPerBlock, solver.numberOfUpperTotals)
+    with self.assertRaises(ValueError):
+      solver.getBlockShape(tableBytes)
+    
+    # solve the first layers in memory, and out of core
+    values = np.zeros(valuesShape)
+    for numberOfFreeRows in (1, 2):
+      solver._solveLayer(numberOfFreeRows, values)
+    
+    with tempfile.TemporaryDirectory() as storeDir:
+      store = solver._createLayerStore(storeDir)
+      for numberOfFreeRows in (1, 2):
+        layerWriter = store.createLayer(numberOfFreeRows)
+        solver._solveLayer(numberOfFreeRows, store, blockShape=(5, totalsPerBlock))
+        layerWriter.commit()
+      self.assertEqual(2, store.countCompleteLayers())
+      
+      for numberOfFreeRows in (1, 2):
+        layerMasks = solver.getLayerMasks(numberOfFreeRows)
+        self.assertTrue(np.allclose(values[layerMasks], store[layerMasks]))
+      self.assertEqual(values[3, 10, 1], store[3, 10, 1])
+      store.close()
+  
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_tablesOverBudget(self):
+    """ Roll tables bigger than the memory budget are memory-mapped, and applied a chunk at a time """
+    
+    # small working arrays and no dense transition matrix, so the transitions
+    # are applied in many chunks
+    maxWorkingElements, maxDenseTransitions = RollTable.MAX_WORKING_ELEMENTS, RollTable.MAX_DENSE_TRANSITIONS
+    RollTable.MAX_WORKING_ELEMENTS, RollTable.MAX_DENSE_TRANSITIONS = 2**12, 0
+    try:
+      memorySolver = StrategySolver(6, 6, 3)
+      with tempfile.TemporaryDirectory() as rollCacheDir:
+        RollTable.setCacheDir(rollCacheDir)
+        try:
+          mappedSolver = StrategySolver(6, 6, 3)
+        finally:
+          RollTable.setCacheDir(None)
+        self.assertTrue(mappedSolver.rollTable.isMapped())
+        self.assertIsNone(mappedSolver.rollTable.getTransitionMatrix())
+        
+        # mapped tables are shared by the workers, and here are more than the whole budget
+        privateBytes, sharedBytes = mappedSolver.getTableMemory()
+        self.assertGreater(sharedBytes, privateBytes)
+        memoryBudget = sharedBytes - 2**15
+        with self.assertRaises(ValueError):
+          memorySolver.getBlockShape(memoryBudget)
+        with self.assertRaises(ValueError):
+          mappedSolver.getBlockShape(memoryBudget, numberOfWorkers=2)
+        with self.assertLogs(solverModule.logger, "WARNING"):
+          masksPerBlock, totalsPerBlock = mappedSolver.getBlockShape(memoryBudget)
+        self.assertEqual(1, masksPerBlock)
+        self.assertLess(totalsPerBlock, mappedSolver.numberOfUpperTotals)
+        
+        # blocks that fit the budget solve the same as solving in memory
+        values = np.zeros((2 ** memorySolver.numberOfRows, memorySolver.numberOfUpperTotals, 2))
+        memorySolver._solveLayer(1, values)
+        for freeRowMask in mappedSolver.getLayerMasks(1)[[0, -1]]:
+          for iStart in range(0, mappedSolver.numberOfUpperTotals, totalsPerBlock):
+            upperTotalSlice = slice(iStart, iStart + totalsPerBlock)
+            blockValues = mappedSolver._solveStates(np.array([freeRowMask]), values, upperTotalSlice)
+            self.assertTrue(np.allclose(values[freeRowMask, upperTotalSlice], blockValues[0]))
+    finally:
+      RollTable.MAX_WORKING_ELEMENTS, RollTable.MAX_DENSE_TRANSITIONS = maxWorkingElements, maxDenseTransitions
@@ -0,0 +1,56 @@
+import unittest
+
+from tournament import Tournament, TournamentResults
+
+
+class test_Tournament(unittest.TestCase):
+
+  # perform all tests in this class
+  TEST_ALL = True
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_results(self):
+
+    results = TournamentResults(["a", "b", "c"])
+    results.addGame({"a": 200, "b": 150, "c": 200})
+    results.addGame({"a": 100, "b": 150, "c": 120})
+
+    # a tie for first splits the win
+    self.assertEqual({"a": 0.5, "b": 1.0, "c": 0.5}, results.wins)
+    self.assertEqual((1, 1, 0), results.getHeadToHead("a", "b"))
+    self.assertEqual((0, 1, 1), results.getHeadToHead("a", "c"))
+    self.assertEqual((1, 0, 1), results.getHeadToHead("c", "a"))
+
+    # merging is the same as adding the games
+    other = TournamentResults(["a", "b", "c"])
+    other.addGame({"a": 300, "b": 0, "c": 10})
+    results.merge(other)
+    self.assertEqual(3, results.numberOfGames)
+    self.assertEqual((2, 1, 0), results.getHeadToHead("a", "b"))
+    self.assertAlmostEqual(1.5 / 3, results.getWinRate("a"))
+
+    stats = results.getScoreStats("a")
+    self.assertAlmostEqual(200, stats["mean"])
+    self.assertEqual((100, 300, 200), (stats["min"], stats["max"], stats["p50"]))
+    self.assertIn("head to head", results.formatTable())
+
+  @unittest.skipIf(not TEST_ALL, " not part of individual test")
+  def test_run(self):
+
+    with self.assertRaises(ValueError):
+      Tournament(["greedy", "unknown"])
+
+    # the same seed plays the same games, however many workers there are
+    partialGames = []
+    tournament = Tournament(["greedy", "random"], seed=7)
+    results = tournament.run(500, numberOfWorkers=1,
+                             progressCallback=lambda results: partialGames.append(results.numberOfGames))
+    results2 = Tournament(["greedy", "random"], seed=7).run(500, numberOfWorkers=2)
+
+    self.assertEqual(results.scores, results2.scores)
+    self.assertEqual(results.headToHead, results2.headToHead)
+    self.assertEqual([200, 400, 500], partialGames)
+
+    # every game has a winner, and greedy beats random
+    self.assertAlmostEqual(1.0, sum(results.getWinRate(playerName) for playerName in results.playerNames))
+    self.assertGreater(results.getWinRate("1-greedy"), 0.9)
@@ -2,20 +2,35 @@ import logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-from controller import Controller
+import sys
 
 
 if __name__ == "__main__":
   
+  # "python yahtzee headless ..." and "python yahtzee tournament ..." play
+  # games without a GUI, so don't need PyQt
+  isHeadless = len(sys.argv) > 1 and sys.argv[1] in ("headless", "tournament")
+  
   # test imports
   try:
     import yaml
     import numpy
-    import PyQt5
-    import pandas
+    if not isHeadless:
+      import PyQt5
   except ImportError as err:
     print("ERROR: Importing failed. Run 'pip3 install -r requirements.txt' to install requirements")
     raise err
   
-  app = Controller("config.yaml")
-  app.run()
\ No newline at end of file
+  if isHeadless:
+    logging.getLogger().setLevel(logging.INFO)
+    if sys.argv[1] == "tournament":
+      import tournament
+      tournament.main(sys.argv[2:])
+    else:
+      import headless
+      headless.main(sys.argv[2:])
+  
+  else:
+    from controller import Controller
+    app = Controller("config.yaml")
+    app.run()
\ No newline at end of file
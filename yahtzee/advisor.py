@@ -0,0 +1,205 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import functools
+import itertools
+
+import numpy as np
+
+from hand import Hand
+from model import Scorecard
+
+
+class HoldAdvisor:
+  """
+  # Exact expected value of every hold, for the hand a player is looking at
+  #
+  # Uses the state values of a solved StrategySolver, so the value of a hold
+  # is the expected score still to come this game, playing optimally after it.
+  #
+  #  -holds are the distinct multisets of dice that can be kept, so holding
+  #   either of two identical dice is one hold, not two
+  #  -rerolls are enumerated as multisets of dice values, weighted by their
+  #   multinomial probability, rather than as every ordered roll
+  #
+  """
+
+  # number of scorecard states, and of (hand, rolls left, state) rankings,
+  # to remember
+  STATE_CACHE_SIZE = 64
+  HOLD_CACHE_SIZE  = 4096
+
+  def __init__(self, solver):
+    """
+    #
+    # solver: (StrategySolver) solver with its state values solved or loaded
+    #
+    """
+
+    # CHECK: solver has values to work from
+    if solver.values is None:
+      raise SystemError("solver has no values; solve or load a table first")
+
+    self.solver = solver
+
+    # memoised per instance, so the caches go with the advisor
+    self._getStateHandValues = functools.lru_cache(maxsize=HoldAdvisor.STATE_CACHE_SIZE)(self._calcStateHandValues)
+    self._rankHolds          = functools.lru_cache(maxsize=HoldAdvisor.HOLD_CACHE_SIZE)(self._calcRankedHolds)
+
+
+  @staticmethod
+  def getDistinctHolds(diceValues):
+    """
+    # Every distinct multiset of <diceValues> that can be held, as sorted tuples
+    #  -a hand with a face repeated n times gives n+1 choices for that face,
+    #   rather than 2^n hold masks
+    """
+    hand = Hand(diceValues)
+    countChoices = [range(hand.getCount(face) + 1) for face in hand.uniqueFaces]
+
+    holds = []
+    for counts in itertools.product(*countChoices):
+      holds.append(tuple(face for face, count in zip(hand.uniqueFaces, counts) for _ in range(count)))
+    return holds
+
+  @staticmethod
+  def getHoldMask(diceValues, heldDice):
+    """
+    # Which of <diceValues> to hold to keep the multiset <heldDice>
+    #  -returns a list of bools, one per die
+    """
+    toHold = list(heldDice)
+    holdMask = []
+    for diceValue in diceValues:
+      isHeld = diceValue in toHold
+      if isHeld:
+        toHold.remove(diceValue)
+      holdMask.append(isHeld)
+
+    # CHECK: all the held dice were found
+    if toHold:
+      raise ValueError("can't hold {} from {}".format(heldDice, diceValues))
+
+    return holdMask
+
+
+  def _calcStateHandValues(self, stateKey):
+    """
+    # Value of every hand in this state, for each number of rolls left
+    #  -returns a list where element r is the (numberOfHands) array of
+    #   values with r rolls left, i.e., element 0 is scoring the hand
+    #
+    # stateKey: (tuple) (freeRowMask, upperTotal, yahtzeeScored)
+    #
+    """
+    solver = self.solver
+    freeRowMask, upperTotal, yahtzeeScored = stateKey
+
+    finalValues = solver._scoreHandValues(np.array([freeRowMask]), solver.values)[0, :, upperTotal, yahtzeeScored]
+
+    rollTable  = solver.rollTable
+    handValues = [finalValues]
+    for _ in range(solver.numberOfRolls - 1):
+      keepValues = rollTable.expectKeepValues(handValues[-1][:, np.newaxis])
+      handValues.append(rollTable.bestKeepValues(keepValues)[:, 0])
+    return handValues
+
+  def _calcRankedHolds(self, sortedDice, remainingRolls, stateKey):
+    """ Ranked holds of this hand; see getRankedHolds """
+
+    rollTable = self.solver.rollTable
+    nextHandValues = self._getStateHandValues(stateKey)[remainingRolls - 1]
+
+    holdValues = []
+    for heldDice in HoldAdvisor.getDistinctHolds(sortedDice):
+
+      # every outcome of rolling the rest of the dice
+      nextHands, outcomeProbs = rollTable.getKeepOutcomes(rollTable.getKeepIndex(heldDice))
+      holdValues.append((heldDice, float(outcomeProbs @ nextHandValues[nextHands])))
+
+    # best first; ties broken by holding more dice
+    holdValues.sort(key=lambda x: (-x[1], -len(x[0]), x[0]))
+    return tuple(holdValues)
+
+
+  def getRankedHolds(self, diceValues, remainingRolls, scorecard):
+    """
+    # Every distinct hold of <diceValues> with its exact expected value, best first
+    #  -returns a list of (heldDice, expectedValue), where heldDice is a
+    #   sorted tuple of dice values and expectedValue is the score still to
+    #   come this game, not counting what's already on <scorecard>
+    #
+    # diceValues:     (list) current dice values
+    # remainingRolls: (int) number of rolls left this turn
+    # scorecard:      (Scorecard) scorecard of the player to advise
+    #
+    """
+    solver = self.solver
+
+    # CHECK: there's a hand to hold dice from, and a roll to use
+    if len(diceValues) != solver.numberOfDice or None in diceValues:
+      raise ValueError("need {} rolled dice, got {}".format(solver.numberOfDice, diceValues))
+    if not (1 <= remainingRolls < solver.numberOfRolls):
+      raise ValueError("can only hold dice with between 1 and {} rolls left".format(solver.numberOfRolls - 1))
+
+    stateKey = solver.getStateKey(scorecard)
+    if stateKey[0] == 0:
+      raise ValueError("scorecard is already full")
+
+    return list(self._rankHolds(tuple(sorted(diceValues)), remainingRolls, stateKey))
+
+  def getBestHold(self, diceValues, remainingRolls, scorecard):
+    """ Best hold of <diceValues>, as (heldDice, expectedValue) """
+    return self.getRankedHolds(diceValues, remainingRolls, scorecard)[0]
+
+  def getRankedRows(self, diceValues, scorecard):
+    """
+    # Every row <diceValues> can be scored in, with its exact expected value, best first
+    #  -returns a list of (rowName, expectedValue), where expectedValue is
+    #   the score still to come this game, including the row's own score
+    #   and any bonus it earns, playing optimally after it
+    #
+    # diceValues: (list) final dice values of the turn
+    # scorecard:  (Scorecard) scorecard of the player to advise
+    #
+    """
+    solver = self.solver
+    freeRowMask, upperTotal, yahtzeeScored = solver.getStateKey(scorecard)
+    possibleScorecard = scorecard.getPossibleScorecard(diceValues)
+
+    # a joker earns the yahtzee bonus, whichever row it's scored in
+    isJoker = yahtzeeScored and len(set(diceValues)) == 1
+    bonus = Scorecard.POINTS.YAHTZEE_BONUS.value if isJoker else 0
+
+    rowValues = []
+    for rowName in scorecard.getScorableRows(diceValues):
+      iRow = solver.rowNames.index(rowName)
+      rowScore = possibleScorecard.getRowScore(rowName) or 0
+      rowValue = rowScore + bonus
+      nextUpperTotal, nextYahtzeeScored = upperTotal, yahtzeeScored
+
+      # upper section: the upper total moves on, and may earn the bonus
+      if iRow < solver.numberOfDiceFaces:
+        nextUpperTotal = min(upperTotal + rowScore, solver.upperBonusThreshold)
+        if upperTotal < solver.upperBonusThreshold <= upperTotal + rowScore:
+          rowValue += Scorecard.POINTS.UPPER_BONUS.value
+
+      # yahtzee: scoring 50 makes the joker rules apply from then on
+      elif iRow == solver.yahtzeeRowIndex and rowScore == Scorecard.POINTS.YAHTZEE.value:
+        nextYahtzeeScored = 1
+
+      rowValue += solver.getStateValue(freeRowMask ^ (1 << iRow), nextUpperTotal, nextYahtzeeScored)
+      rowValues.append((rowName, rowValue))
+
+    # best first; ties broken by scorecard order
+    rowValues.sort(key=lambda x: -x[1])
+    return rowValues
+
+  def getBestRow(self, diceValues, scorecard):
+    """ Best row to score <diceValues> in, as (rowName, expectedValue) """
+    return self.getRankedRows(diceValues, scorecard)[0]
+
+  def getGameHolds(self, game):
+    """ Ranked holds for the current player of a <game>; see getRankedHolds """
+    scorecard = game.getCurrentPlayer().getScorecard()
+    return self.getRankedHolds(game.getDiceValues(), game.getRemainingRolls(), scorecard)
@@ -0,0 +1,111 @@
+import logging
+logger = logging.getLogger(__name__)
+
+
+class GUI(object):
+  
+  def confirmAction(self, text):
+    """ Ask the user to confirm they want to do <the thing> """
+    raise NotImplementedError("subclass must implement")
+  
+  def gameComplete(self):
+    """ Called when game is completed """
+    raise NotImplementedError("subclass must implement")
+  
+  def newGame(self, game):
+    """ Reset the GUI and start a new game """
+    raise NotImplementedError("subclass must implement")
+  
+  def notifyStatus(self, text):
+    """ Status notification; used or ignored, up to the GUI """
+    raise NotImplementedError("subclass must implement")
+  
+  def requestNewPlayerName(self, existingPlayers=None):
+    """
+    # Ask the user for the name of the new player to add
+    #  -returns new name or None
+    #
+    # existingPlayers: (list) of existing player names to exclude
+    """
+    raise NotImplementedError("subclass must implement")
+  
+  def requestDiceSetup(self):
+    """
+    # Ask the user for info on the new dice setup
+    #  -returns new values or None
+    """
+    raise NotImplementedError("subclass must implement")
+  
+  def run(self):
+    """ Start GUI """
+    raise NotImplementedError("subclass must implement")
+  
+  def startPlayerTurn(self, player):
+    """ Start this player's turn """
+    raise NotImplementedError("subclass must implement")
+
+  def updateDice(self, diceValues):
+    """ Show the current values of the dice """
+    raise NotImplementedError("subclass must implement")
+
+  def updateHeldDice(self, heldDiceIndices):
+    """ Show the held dice as <heldDiceIndices> """
+    raise NotImplementedError("subclass must implement")
+  
+  def updatePossibleScorecard(self, playerList):
+    """ Show the possible scores given the current dice values """
+    raise NotImplementedError("subclass must implement")
+
+  def updateScorecard(self, playerList):
+    """ Update the scorecard scores """
+    raise NotImplementedError("subclass must implement")
+
+
+
+class NullGUI(GUI):
+  """
+  # GUI that shows nothing, for running the Controller without a display
+  #  -confirmations are accepted, requests for input get no answer, and
+  #   notifications are logged
+  #
+  """
+  
+  def __init__(self, controller, game):
+    self.controller = controller
+    self.game       = game
+  
+  def confirmAction(self, text):
+    return True
+  
+  def gameComplete(self):
+    logger.debug("gameComplete: {}".format(self.game.getTotalScores()))
+  
+  def newGame(self, game):
+    self.game = game
+  
+  def notifyStatus(self, text, title="Yahtzee", font=None):
+    logger.debug("notifyStatus: {}".format(text))
+  
+  def requestNewPlayerName(self, existingPlayers=None):
+    return None
+  
+  def requestDiceSetup(self):
+    return None
+  
+  def run(self):
+    pass
+  
+  def startPlayerTurn(self, player):
+    pass
+  
+  def updateDice(self, diceValues):
+    pass
+  
+  def updateHeldDice(self, heldDiceIndices):
+    pass
+  
+  def updatePossibleScorecard(self, playerList):
+    pass
+  
+  def updateScorecard(self, playerList):
+    pass
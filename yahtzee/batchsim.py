@@ -0,0 +1,284 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import argparse
+import time
+
+import numpy as np
+
+from model import ArrayScorecard, Game, Scorecard
+
+
+class BatchSimulator:
+  """
+  # Plays N solitaire games in lockstep, stored as NumPy arrays
+  #
+  # Every game is at the same point of the same turn, so each step (roll,
+  # hold, score) is applied to all N games at once:
+  #  -dice:           (N x numberOfDice) dice values, 0 for not rolled yet
+  #  -held:           (N x numberOfDice) which dice are held
+  #  -remainingRolls: (N) rolls left this turn
+  #  -scores:         (N x numberOfRows) score of each scorable row, in
+  #                   scorecard order, NO_SCORE for free rows
+  #  -yahtzeeBonus:   (N) yahtzee bonus points
+  #
+  # Scoring follows the same rules as Scorecard.PointsCalculator, including
+  # the joker rule and yahtzee bonus.
+  #
+  """
+
+  NO_SCORE = ArrayScorecard.NO_SCORE
+
+  def __init__(self, numberOfGames, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3, rng=None):
+    """
+    #
+    # numberOfGames: (int) number of games to play at once
+    # rng:           (Generator) numpy random generator, default is a new one
+    #
+    """
+    self.numberOfGames     = numberOfGames
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.numberOfRolls     = numberOfRolls
+    self.rng = np.random.default_rng() if rng is None else rng
+
+    # scorable rows, in scorecard order
+    layout = ArrayScorecard.getLayout(numberOfDiceFaces)
+    self.rowNames     = [layout.rowNames[rowId] for rowId in layout.scorableIds]
+    self.numberOfRows = len(self.rowNames)
+    self.rowIds       = {rowName: iRow for iRow, rowName in enumerate(self.rowNames)}
+
+    self.yahtzeeRow = self.rowIds[Scorecard.ROW_NAME.YAHTZEE.value]
+    self.jokerRows  = [(self.rowIds[Scorecard.ROW_NAME.FULL_HOUSE.value],     Scorecard.POINTS.FULL_HOUSE.value),
+                       (self.rowIds[Scorecard.ROW_NAME.SMALL_STRAIGHT.value], Scorecard.POINTS.SMALL_STRAIGHT.value),
+                       (self.rowIds[Scorecard.ROW_NAME.LARGE_STRAIGHT.value], Scorecard.POINTS.LARGE_STRAIGHT.value)]
+    self.upperBonusThreshold = sum(range(1, numberOfDiceFaces + 1)) * 3
+
+    self.newGames()
+
+
+  def newGames(self):
+    """ Start all the games again, with blank scorecards """
+    numberOfGames = self.numberOfGames
+    self.scores         = np.full((numberOfGames, self.numberOfRows), BatchSimulator.NO_SCORE, dtype=np.int32)
+    self.yahtzeeBonus   = np.zeros(numberOfGames, dtype=np.int32)
+    self.remainingTurns = self.numberOfRows
+    self.startTurn()
+
+  def startTurn(self):
+    """ Reset the dice for a new turn """
+    self.dice           = np.zeros((self.numberOfGames, self.numberOfDice), dtype=np.int64)
+    self.held           = np.zeros((self.numberOfGames, self.numberOfDice), dtype=bool)
+    self.remainingRolls = np.full(self.numberOfGames, self.numberOfRolls, dtype=np.int64)
+    self._clearDiceInfo()
+
+  def _clearDiceInfo(self):
+    """ Forget what was worked out from the dice, after they change """
+    self._diceCounts     = None
+    self._possibleScores = None
+    self._scorableRows   = None
+
+  def isFinished(self):
+    return self.remainingTurns == 0
+
+
+  ###########################################################################
+  # turn steps
+  ###########################################################################
+
+  def roll(self):
+    """ Roll every free die, in the games with rolls left """
+
+    # CHECK: there are rolls left
+    if not np.all(self.remainingRolls > 0):
+      raise SystemError("trying to roll dice when there are no rolls left")
+
+    isRolled = ~self.held
+    self.dice[isRolled] = self.rng.integers(1, self.numberOfDiceFaces + 1, size=int(isRolled.sum()))
+    self.remainingRolls -= 1
+    self._clearDiceInfo()
+
+  def setHolds(self, held):
+    """
+    # Hold the dice in <held>, and free the rest
+    #  -dice can only be held after the first roll
+    #
+    # held: (array) N x numberOfDice bools
+    #
+    """
+    canHold = (self.remainingRolls < self.numberOfRolls)[:, np.newaxis]
+    self.held = np.asarray(held, dtype=bool) & canHold
+
+  # what's worked out from the dice is kept until they change, as the
+  # policies and scoring all need it; callers mustn't change the arrays
+  
+  def getDiceCounts(self):
+    """ (N x numberOfDiceFaces+1) number of dice showing each face; column 0 is unused """
+    if self._diceCounts is None:
+      self._diceCounts = Scorecard.PointsCalculator.countDiceBatch(self.dice, self.numberOfDiceFaces)
+      self._diceCounts[:, 0] = 0
+    return self._diceCounts
+
+  def _getJokers(self, diceCounts):
+    """ Which games can use the joker rule: a yahtzee, after scoring 50 in the Yahtzee row """
+    return (diceCounts.max(axis=1) == self.numberOfDice) &\
+           (self.scores[:, self.yahtzeeRow] == Scorecard.POINTS.YAHTZEE.value)
+
+  def getPossibleScores(self):
+    """
+    # Score the current dice would get in each row, as PointsCalculator.calculate
+    #  -returns an (N x numberOfRows) array; rows already scored are included,
+    #   mask them with getScorableRows
+    #
+    """
+    if self._possibleScores is not None:
+      return self._possibleScores
+    
+    diceCounts = self.getDiceCounts()
+    possibleScores = Scorecard.PointsCalculator.calculateRawBatch(self.rowNames, diceCounts, self.numberOfDice)
+
+    # jokers score max points in the joker-eligible rows
+    isJoker = self._getJokers(diceCounts)
+    for iRow, maxScore in self.jokerRows:
+      possibleScores[isJoker, iRow] = maxScore
+
+    self._possibleScores = possibleScores
+    return possibleScores
+
+  def getScorableRows(self):
+    """ (N x numberOfRows) bools, which rows the current dice can be scored in, as canScoreRow """
+    if self._scorableRows is not None:
+      return self._scorableRows
+    
+    diceCounts = self.getDiceCounts()
+    isScorable = self.scores == BatchSimulator.NO_SCORE
+
+    # a joker must be scored in its own upper row, if it's free
+    games     = np.arange(self.numberOfGames)
+    ownRow    = np.argmax(diceCounts[:, 1:], axis=1)
+    mustScore = self._getJokers(diceCounts) & isScorable[games, ownRow]
+    isScorable[mustScore] = False
+    isScorable[games[mustScore], ownRow[mustScore]] = True
+
+    self._scorableRows = isScorable
+    return isScorable
+
+  def score(self, rows):
+    """
+    # Score the current dice in a row of every game, and end the turn
+    #
+    # rows: (array) N row indices, into rowNames
+    #
+    """
+    diceCounts = self.getDiceCounts()
+    rows  = np.asarray(rows, dtype=np.int64)
+    games = np.arange(self.numberOfGames)
+
+    # CHECK: rows can be scored in
+    if not np.all(self.getScorableRows()[games, rows]):
+      raise ValueError("can't score in a row that's been scored already, or against the joker rule")
+
+    # every joker gets a yahtzee bonus, whichever row it's scored in
+    self.yahtzeeBonus[self._getJokers(diceCounts)] += Scorecard.POINTS.YAHTZEE_BONUS.value
+    self.scores[games, rows] = self.getPossibleScores()[games, rows]
+
+    self.remainingTurns -= 1
+    self.startTurn()
+
+  def getTotalScores(self):
+    """ (N) total score of each game, as Scorecard.getTotalScore """
+    scored = np.maximum(self.scores, 0)
+    upperTotal = scored[:, :self.numberOfDiceFaces].sum(axis=1)
+    upperBonus = np.where(upperTotal >= self.upperBonusThreshold, Scorecard.POINTS.UPPER_BONUS.value, 0)
+    return upperTotal + upperBonus + scored[:, self.numberOfDiceFaces:].sum(axis=1) + self.yahtzeeBonus
+
+
+  ###########################################################################
+  # policies
+  ###########################################################################
+
+  @staticmethod
+  def holdMostCommon(sim):
+    """ Hold policy: every die showing the most common face, the highest if there's a tie """
+    faceCounts = sim.getDiceCounts()[:, :0:-1]
+    mostCommon = sim.numberOfDiceFaces - np.argmax(faceCounts, axis=1)
+    return sim.dice == mostCommon[:, np.newaxis]
+
+  @staticmethod
+  def scoreBestRow(sim):
+    """ Row policy: the row worth the most points now, the first if there's a tie """
+    possibleScores = np.where(sim.getScorableRows(), sim.getPossibleScores(), -1)
+    return np.argmax(possibleScores, axis=1)
+
+
+  def playTurn(self, holdPolicy, rowPolicy):
+    """
+    # Play a turn of every game
+    #
+    # holdPolicy: (function) sim -> N x numberOfDice bools, dice to hold
+    # rowPolicy:  (function) sim -> N row indices, rows to score in
+    #
+    """
+    self.roll()
+    for _ in range(self.numberOfRolls - 1):
+      self.setHolds(holdPolicy(self))
+      self.roll()
+    self.score(rowPolicy(self))
+
+  def playGames(self, holdPolicy=None, rowPolicy=None):
+    """
+    # Play every game to the end; returns the (N) total scores
+    #  -default policies are holdMostCommon and scoreBestRow, i.e., the same
+    #   as headless.GreedyPolicy
+    #
+    """
+    holdPolicy = BatchSimulator.holdMostCommon if holdPolicy is None else holdPolicy
+    rowPolicy  = BatchSimulator.scoreBestRow if rowPolicy is None else rowPolicy
+
+    self.newGames()
+    while not self.isFinished():
+      self.playTurn(holdPolicy, rowPolicy)
+    return self.getTotalScores()
+
+
+def parseArgs(argv=None):
+  """ Read the command line options """
+
+  parser = argparse.ArgumentParser(description="Play many solitaire games at once and report the scores")
+  parser.add_argument("--games", type=int, default=10**6,
+                      help="number of games to play")
+  parser.add_argument("--batch-size", type=int, default=2**17,
+                      help="number of games to play at once")
+  parser.add_argument("--seed", type=int, default=None,
+                      help="seed for the dice, for repeatable runs")
+  parser.add_argument("--dice",  type=int, default=5,
+                      help="number of dice ({}-{})".format(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE))
+  parser.add_argument("--faces", type=int, default=6,
+                      help="number of dice faces ({}-{})".format(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES))
+  parser.add_argument("--rolls", type=int, default=3,
+                      help="number of rolls per turn ({}-{})".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
+
+  args = parseArgs(argv)
+  rng = np.random.default_rng(args.seed)
+
+  startTime = time.time()
+  totalScores = []
+  for iStart in range(0, args.games, args.batch_size):
+    sim = BatchSimulator(min(args.batch_size, args.games - iStart), numberOfDice=args.dice,
+                         numberOfDiceFaces=args.faces, numberOfRolls=args.rolls, rng=rng)
+    totalScores.append(sim.playGames())
+  totalScores = np.concatenate(totalScores)
+  elapsed = time.time() - startTime
+
+  logger.info("played {} games in {:.1f}s ({:.0f} games/s)".format(args.games, elapsed, args.games / elapsed))
+  logger.info("mean score {:.2f}, sd {:.2f}, min {}, max {}"
+              .format(totalScores.mean(), totalScores.std(), totalScores.min(), totalScores.max()))
+
+
+if __name__ == "__main__":
+  logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+  main()
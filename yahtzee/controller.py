@@ -12,8 +12,11 @@ import numpy as np
 
 from concurrent import futures
 
+from gamelog import GameLog
+from history import GameHistory
 from model import Game
-from gui import PyQtGUI
+from predictioncache import PredictionCache
+from predictor import ProbabilityPredictor
 
 
 class Controller:
@@ -25,6 +28,13 @@ class Controller:
     "numberOfDiceFaces": 6,
     "numberOfRolls":     3,
     "version":           1.0,
+    
+    # optional: predictor cache size, and file to keep it in between runs
+    "predictorCacheSize": 4096,
+    "predictorCacheFile": None,
+    
+    # optional: directory to archive played games in, one game log per dice config
+    "gameLogDir": None,
   }
   
   @staticmethod
@@ -83,7 +93,14 @@ class Controller:
       yaml.safe_dump(configData, f)
   
   
-  def __init__(self, configFileLoc):
+  def __init__(self, configFileLoc, guiClass=None):
+    """
+    #
+    # configFileLoc: (str) config file, created with the defaults if it doesn't exist
+    # guiClass:      (class) GUI implementation, default is PyQtGUI; use
+    #                NullGUI to run without a display
+    #
+    """
     
     # if there's no config file, create a new one
     if not os.path.exists(configFileLoc):
@@ -98,12 +115,31 @@ class Controller:
     # keep a record of the players this session
     self.currentPlayerList = [self.configData["playerName"]]
     
+    # predictor results are cached, and optionally kept on disk
+    predictorCache = PredictionCache(maxSize = self.configData.get("predictorCacheSize", 4096),
+                                     diskLoc = self.configData.get("predictorCacheFile", None))
+    ProbabilityPredictor.setCache(predictorCache)
+    
+    # game logs being written to, by dice config
+    self.gameLogs = {}
+    
+    # finished games are kept in the database
+    #  -a relative database file is next to the config file
+    self.history = GameHistory(os.path.join(os.path.dirname(configFileLoc), self.configData["databaseFile"]))
+    
     # create a new game and GUI using the config data
     self.game = Game(playerNameList    = self.currentPlayerList,
                      numberOfDice      = self.configData["numberOfDice"],
                      numberOfDiceFaces = self.configData["numberOfDiceFaces"],
                      numberOfRolls     = self.configData["numberOfRolls"])
-    self.gui = PyQtGUI(self, self.game)
+    self.logGame()
+    
+    # PyQt is only imported when its GUI is used, so headless runs don't need it
+    if guiClass is None:
+      from gui import PyQtGUI
+      guiClass = PyQtGUI
+    self.gui = guiClass(self, self.game)
+    self.warmUpPredictor()
     
     
   def newGame(self, forceNewGame=False):
@@ -119,16 +155,49 @@ class Controller:
     self.configData = Controller._loadConfigFile(self.configFileLoc)
     
     # create a new game and tell the GUI
+    oldDiceConfig = (self.game.getNumberOfDice(), self.game.getNumberOfDiceFaces(), self.game.getNumberOfRolls())
     logger.debug("newGame: players: {}".format(self.currentPlayerList))
     logger.debug("newGame: numDice: {}".format(self.configData["numberOfDice"]))
     logger.debug("newGame: numFaces: {}".format(self.configData["numberOfDiceFaces"]))
     logger.debug("newGame: numRolls: {}".format(self.configData["numberOfRolls"]))
+    
+    # an abandoned game isn't archived
+    for gameLog in self.gameLogs.values():
+      gameLog.detach(self.game)
+    
     self.game = Game(playerNameList    = self.currentPlayerList,
                      numberOfDice      = self.configData["numberOfDice"],
                      numberOfDiceFaces = self.configData["numberOfDiceFaces"],
                      numberOfRolls     = self.configData["numberOfRolls"])
+    self.logGame()
     self.gui.newGame(self.game)
     
+    # new dice config, so new predictions will be needed
+    if (self.game.getNumberOfDice(), self.game.getNumberOfDiceFaces(), self.game.getNumberOfRolls()) != oldDiceConfig:
+      self.warmUpPredictor()
+  
+  
+  def logGame(self):
+    """ Archive the current game in the game log for its dice config, if game logging is on """
+    gameLogDir = self.configData.get("gameLogDir", None)
+    if gameLogDir is None:
+      return
+    
+    # open the log the first time a game with this dice config is played
+    #  -each game is written as soon as it finishes
+    diceConfig = (self.game.getNumberOfDice(), self.game.getNumberOfDiceFaces(), self.game.getNumberOfRolls())
+    if diceConfig not in self.gameLogs:
+      os.makedirs(gameLogDir, exist_ok=True)
+      gameLogLoc = os.path.join(gameLogDir, "games-{}d{}-{}r.ygl".format(*diceConfig))
+      self.gameLogs[diceConfig] = GameLog.create(gameLogLoc, *diceConfig, gamesPerBlock=1)
+    self.gameLogs[diceConfig].attach(self.game)
+  
+  def warmUpPredictor(self):
+    """ Fill the predictor cache for the current dice config, in the background """
+    diceConfig = (self.game.getNumberOfDice(), self.game.getNumberOfDiceFaces(), self.game.getNumberOfRolls())
+    logger.debug("warmUpPredictor: {}".format(diceConfig))
+    threading.Thread(target=ProbabilityPredictor.warmUp, args=diceConfig, daemon=True).start()
+    
   
   
   def aboutText(self, textFormat="richtext"):
@@ -171,7 +240,15 @@ class Controller:
     
   
   def run(self):
-    self.gui.run()
+    try:
+      self.gui.run()
+    
+    # write out the predictor cache, and close the game history and logs, on the way out
+    finally:
+      ProbabilityPredictor.cache.close()
+      self.history.close()
+      for gameLog in self.gameLogs.values():
+        gameLog.close()
   
   def addPlayer(self):
     """ Add a new player """
@@ -337,7 +414,9 @@ class Controller:
     self.gui.startPlayerTurn(self.game.getCurrentPlayer())
     
     # check if game is over
+    #  -the game is written to the history in the background
     if self.game.getGameStatus() == Game.STATUS.FINISHED:
+      self.history.submitGame(self.game)
       self.gui.gameComplete()
       
     
@@ -0,0 +1,108 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+
+class DiceSource:
+  """
+  # Where a game's dice values come from
+  #  -subclasses return the values of <numberOfDice> newly rolled dice
+  #
+  """
+
+  def roll(self, numberOfDice):
+    """ List of the values of <numberOfDice> rolled dice """
+    raise NotImplementedError("subclass must implement")
+
+
+class RandomDice(DiceSource):
+  """ Draws every roll from <rng> as it's needed """
+
+  def __init__(self, numberOfDiceFaces, rng=None):
+    """
+    #
+    # numberOfDiceFaces: (int) number of sides on each die
+    # rng:               (Generator) numpy random generator, default is a new one
+    #
+    """
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.rng = np.random.default_rng() if rng is None else rng
+
+  def roll(self, numberOfDice):
+    return self.rng.integers(1, self.numberOfDiceFaces + 1, size=numberOfDice).tolist()
+
+
+class BufferedDice(RandomDice):
+  """
+  # Draws many dice values from <rng> at once, and serves rolls from them
+  #  -one vectorized draw fills the buffer, which is refilled when it runs
+  #   out, so most rolls are just a list slice
+  #  -the same seed and buffer size give the same dice
+  #
+  """
+
+  # dice values drawn at a time
+  BUFFER_SIZE = 4096
+
+  def __init__(self, numberOfDiceFaces, rng=None, bufferSize=None):
+    """
+    #
+    # bufferSize: (int) dice values drawn at a time, default is BUFFER_SIZE
+    #
+    """
+    super().__init__(numberOfDiceFaces, rng)
+    self.bufferSize = BufferedDice.BUFFER_SIZE if bufferSize is None else bufferSize
+
+    # CHECK: buffer holds something
+    if self.bufferSize < 1:
+      raise ValueError("buffer size must be at least 1")
+
+    self.buffer      = []
+    self.bufferIndex = 0
+
+  def _refill(self, numberOfDice):
+    """ Draw a new buffer of dice values, keeping any left over, with at least <numberOfDice> values """
+    leftOver = self.buffer[self.bufferIndex:]
+    self.buffer      = leftOver + super().roll(max(self.bufferSize, numberOfDice - len(leftOver)))
+    self.bufferIndex = 0
+
+  def roll(self, numberOfDice):
+    if self.bufferIndex + numberOfDice > len(self.buffer):
+      self._refill(numberOfDice)
+    rolled = self.buffer[self.bufferIndex:self.bufferIndex + numberOfDice]
+    self.bufferIndex += numberOfDice
+    return rolled
+
+
+class ScriptedDice(DiceSource):
+  """
+  # Serves dice values from a fixed sequence, in order, e.g., for tests
+  #  -rolls are taken from the front of <diceValues>, so a roll of 3 dice
+  #   gets the next 3 values
+  #
+  """
+
+  def __init__(self, diceValues):
+    """
+    #
+    # diceValues: (iterable) dice values to roll, in order
+    #
+    """
+    self.diceValues = list(diceValues)
+    self.index      = 0
+
+  def getRemaining(self):
+    """ Number of dice values not rolled yet """
+    return len(self.diceValues) - self.index
+
+  def roll(self, numberOfDice):
+
+    # CHECK: there are enough values left
+    if numberOfDice > self.getRemaining():
+      raise SystemError("tried to roll {} dice, but only {} scripted values are left"
+                        .format(numberOfDice, self.getRemaining()))
+
+    rolled = self.diceValues[self.index:self.index + numberOfDice]
+    self.index += numberOfDice
+    return rolled
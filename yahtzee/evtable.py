@@ -0,0 +1,216 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from model import Scorecard
+
+
+class EVTable:
+  """
+  # Binary file format for solved expected-value tables
+  #
+  # The file is a fixed-size header followed by the raw table data, which
+  # starts on a page boundary so it can be opened with numpy.memmap: values
+  # are only read from disk when they are looked up, and processes opening
+  # the same table share the OS page cache.
+  #
+  # Header:
+  #  -magic and format version
+  #  -game config: number of dice, dice faces and rolls
+  #  -fingerprint of the scoring rules the table was solved with
+  #  -dtype and shape of the table
+  #  -CRC32 checksum of the table data
+  #
+  """
+
+  MAGIC          = b"YHTZEVTB"
+  FORMAT_VERSION = 1
+
+  # bump when the solver's scoring rules change in a way not captured by
+  # Scorecard.POINTS, so older tables are rejected
+  RULES_VERSION = 1
+
+  # magic, format version, dice, faces, rolls, rules fingerprint, dtype,
+  # number of dimensions, shape, data checksum
+  HEADER_FORMAT = "<8sIBBB32s8sB4QI"
+
+  # table data starts here
+  DATA_OFFSET = 4096
+
+  # bytes to checksum at a time
+  CHECKSUM_CHUNK_SIZE = 2**24
+
+  @staticmethod
+  def rulesFingerprint():
+    """ Hash of the scoring rules an expected-value table depends on """
+    rules = ["rulesVersion={}".format(EVTable.RULES_VERSION)]
+    rules += ["{}={}".format(points.name, points.value) for points in Scorecard.POINTS]
+    return hashlib.sha256(";".join(rules).encode("ascii")).digest()
+
+  @staticmethod
+  def _checksum(data):
+    """ CRC32 of an array's bytes, read a chunk at a time """
+    rawBytes = np.asarray(data).reshape(-1).view(np.uint8)
+    checksum = 0
+    for iStart in range(0, rawBytes.size, EVTable.CHECKSUM_CHUNK_SIZE):
+      checksum = zlib.crc32(rawBytes[iStart:iStart + EVTable.CHECKSUM_CHUNK_SIZE], checksum)
+    return checksum
+
+
+  @staticmethod
+  def create(fileLoc, shape, numberOfDice, numberOfDiceFaces, numberOfRolls, dtype=np.float64):
+    """
+    # Start writing a table of <shape> to <fileLoc>, to be filled in a piece
+    # at a time
+    #  -the data is written to a file next to <fileLoc> through the returned
+    #   EVTable.Writer, and moved into place when it's committed, so readers
+    #   never see a partial table
+    #
+    # shape: (tuple) shape of the table
+    # dtype: (dtype) type to store the values as; float32 halves the size,
+    #        but at EVs of ~250 only resolves ~1.5e-5, which can reorder
+    #        near-tied holds
+    #
+    """
+    return EVTable.Writer(fileLoc, shape, (numberOfDice, numberOfDiceFaces, numberOfRolls), dtype)
+
+  @staticmethod
+  def getTempLoc(fileLoc):
+    """ File a table for <fileLoc> is written to before being committed """
+    return "{}.tmp".format(fileLoc)
+
+  class Writer:
+    """
+    # A table being written, see EVTable.create
+    #  -values are written to the memory-mapped <values>, so the whole table
+    #   never needs to be in memory
+    #
+    """
+
+    def __init__(self, fileLoc, shape, gameConfig, dtype):
+
+      # CHECK: we can describe the table in the header
+      if len(shape) > 4:
+        raise ValueError("table can have at most 4 dimensions")
+
+      self.fileLoc    = fileLoc
+      self.tempLoc    = EVTable.getTempLoc(fileLoc)
+      self.gameConfig = gameConfig
+      self.dtype      = np.dtype(dtype).newbyteorder("<")
+      self.values     = np.memmap(self.tempLoc, dtype=self.dtype, mode="w+",
+                                  offset=EVTable.DATA_OFFSET, shape=tuple(shape))
+
+    def commit(self):
+      """ Finish the table and move it into place """
+
+      values = self.values
+      values.flush()
+      checksum = EVTable._checksum(values)
+      shape = list(values.shape) + [0] * (4 - values.ndim)
+
+      header = struct.pack(EVTable.HEADER_FORMAT, EVTable.MAGIC, EVTable.FORMAT_VERSION,
+                           *self.gameConfig, EVTable.rulesFingerprint(),
+                           self.dtype.str.encode("ascii"), values.ndim, *shape, checksum)
+
+      with open(self.tempLoc, "r+b") as f:
+        f.write(header)
+        f.flush()
+        os.fsync(f.fileno())
+
+      self.values = None
+      del values
+      os.replace(self.tempLoc, self.fileLoc)
+
+
+  @staticmethod
+  def write(fileLoc, values, numberOfDice, numberOfDiceFaces, numberOfRolls, dtype=np.float64):
+    """
+    # Write a table of <values> to <fileLoc>
+    #  -the file is written next to <fileLoc> and moved into place when
+    #   complete, so readers never see a partial table
+    #
+    # values: (array) table to write
+    # dtype:  (dtype) type to store the values as
+    #
+    """
+    writer = EVTable.create(fileLoc, np.shape(values), numberOfDice, numberOfDiceFaces, numberOfRolls, dtype)
+    writer.values[...] = values
+    writer.commit()
+
+
+  @staticmethod
+  def open(fileLoc, numberOfDice=None, numberOfDiceFaces=None, numberOfRolls=None, verify=False):
+    """
+    # Open the table at <fileLoc>
+    #  -raises ValueError if the file isn't a table, was written for different
+    #   scoring rules or a different config than any given here
+    #
+    # numberOfDice:      (int) expected number of dice, or None to accept any
+    # numberOfDiceFaces: (int) expected number of dice faces, or None to accept any
+    # numberOfRolls:     (int) expected number of rolls, or None to accept any
+    # verify:            (bool) also check the data checksum; reads the whole table
+    #
+    """
+
+    with open(fileLoc, "rb") as f:
+      headerBytes = f.read(struct.calcsize(EVTable.HEADER_FORMAT))
+
+    # CHECK: this is a table we can read
+    if len(headerBytes) < struct.calcsize(EVTable.HEADER_FORMAT):
+      raise ValueError("{} is not an expected-value table".format(fileLoc))
+
+    header = struct.unpack(EVTable.HEADER_FORMAT, headerBytes)
+    magic, formatVersion, tableDice, tableFaces, tableRolls, fingerprint, dtypeStr, numDims = header[:8]
+    shape    = tuple(header[8:8 + numDims])
+    checksum = header[12]
+
+    if magic != EVTable.MAGIC:
+      raise ValueError("{} is not an expected-value table".format(fileLoc))
+    if formatVersion != EVTable.FORMAT_VERSION:
+      raise ValueError("{} has table format version {}, expected {}"
+                       .format(fileLoc, formatVersion, EVTable.FORMAT_VERSION))
+
+    # CHECK: table was solved with the current scoring rules
+    if fingerprint != EVTable.rulesFingerprint():
+      raise ValueError("{} was solved with different scoring rules".format(fileLoc))
+
+    # CHECK: table is for the expected config
+    expectedConfig = (numberOfDice, numberOfDiceFaces, numberOfRolls)
+    tableConfig    = (tableDice, tableFaces, tableRolls)
+    for expected, actual in zip(expectedConfig, tableConfig):
+      if expected is not None and expected != actual:
+        raise ValueError("{} is for config {}, not {}".format(fileLoc, tableConfig, expectedConfig))
+
+    dtype = np.dtype(dtypeStr.rstrip(b"\0").decode("ascii"))
+
+    # CHECK: file holds all the data
+    expectedSize = EVTable.DATA_OFFSET + dtype.itemsize * int(np.prod(shape))
+    if os.path.getsize(fileLoc) != expectedSize:
+      raise ValueError("{} is truncated or corrupt".format(fileLoc))
+
+    values = np.memmap(fileLoc, dtype=dtype, mode="r", offset=EVTable.DATA_OFFSET, shape=shape)
+
+    table = EVTable(values, tableDice, tableFaces, tableRolls, checksum)
+    if verify and not table.verify():
+      raise ValueError("{} failed its integrity check".format(fileLoc))
+
+    return table
+
+
+  def __init__(self, values, numberOfDice, numberOfDiceFaces, numberOfRolls, checksum):
+    """ Use EVTable.open to load a table """
+    self.values            = values
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.numberOfRolls     = numberOfRolls
+    self.checksum          = checksum
+
+  def verify(self):
+    """ Does the table data match its checksum """
+    return EVTable._checksum(self.values) == self.checksum
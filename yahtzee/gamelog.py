@@ -0,0 +1,387 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import struct
+
+from enum import Enum
+
+from dicesource import ScriptedDice
+from model import ArrayScorecard, Game
+
+
+class GameLog:
+  """
+  # Append-only binary file format for archiving played games
+  #
+  # Every game in a file has the same dice config, which is in the file
+  # header. After the header, the file is a sequence of blocks, each
+  # holding a batch of finished games:
+  #  -an index block: a BLOCK record with the number of games, an entry
+  #   with the block's first game number and length in bytes, then an
+  #   entry per game with its offset in the block and number of records
+  #  -the games' records, one per event
+  #
+  # Records and index entries are RECORD_SIZE bytes, so a game is a run of
+  # fixed-width records, and the reader can skip a whole block from its
+  # index without reading the games in it. A block left half written by a
+  # crash is ignored when reading, and cut off when the log is next opened
+  # for writing.
+  #
+  # Event records are (event, player index, argument, dice values, extra):
+  #  -GAME:    argument is the number of players, extra is the length of
+  #            the player names that follow, NUL separated and padded out
+  #            to whole records
+  #  -ROLL:    dice values are all the dice after the roll, argument is the
+  #            rolls left, extra is a bitmask of the dice rolled
+  #  -HOLD:    argument is the die index, extra is 1 to hold or 0 to free
+  #  -SCORE:   argument is the row index, in scorecard order
+  #  -ADVANCE: the player index is the player whose turn ended
+  #
+  """
+
+  MAGIC          = b"YHTZGLOG"
+  FORMAT_VERSION = 1
+
+  # magic, format version, dice, faces, rolls, record size
+  HEADER_FORMAT = "<8sIBBBB"
+  HEADER_SIZE   = struct.calcsize(HEADER_FORMAT)
+
+  # event, player index, argument, dice values, extra
+  RECORD = struct.Struct("<BBB9sI")
+  RECORD_SIZE = RECORD.size
+
+  # index entries: (first game number, block length) or (offset, number of records)
+  INDEX_ENTRY = struct.Struct("<QQ")
+
+  class EVENT(Enum):
+    """ Kinds of record """
+    BLOCK   = 0
+    GAME    = 1
+    ROLL    = 2
+    HOLD    = 3
+    SCORE   = 4
+    ADVANCE = 5
+
+  # Game actions that become records
+  ACTION_EVENTS = {Game.ACTION.ROLL:    EVENT.ROLL,
+                   Game.ACTION.HOLD:    EVENT.HOLD,
+                   Game.ACTION.SCORE:   EVENT.SCORE,
+                   Game.ACTION.ADVANCE: EVENT.ADVANCE}
+
+  # games written in each block, by default
+  GAMES_PER_BLOCK = 256
+
+
+  @staticmethod
+  def _packHeader(gameConfig):
+    header = struct.pack(GameLog.HEADER_FORMAT, GameLog.MAGIC, GameLog.FORMAT_VERSION, *gameConfig,
+                         GameLog.RECORD_SIZE)
+    return header + b"\0" * (-len(header) % GameLog.RECORD_SIZE)
+
+  @staticmethod
+  def _readHeader(f, fileLoc):
+    """ Read the file header from <f>; returns the game config """
+
+    header = f.read(len(GameLog._packHeader((0, 0, 0))))
+    if len(header) < GameLog.HEADER_SIZE:
+      raise ValueError("{} is too short to be a game log".format(fileLoc))
+
+    magic, formatVersion, numberOfDice, numberOfDiceFaces, numberOfRolls, recordSize = \
+      struct.unpack_from(GameLog.HEADER_FORMAT, header)
+
+    # CHECK: file is a game log we can read
+    if magic != GameLog.MAGIC:
+      raise ValueError("{} is not a game log".format(fileLoc))
+    if formatVersion != GameLog.FORMAT_VERSION or recordSize != GameLog.RECORD_SIZE:
+      raise ValueError("{} is game log format version {}, expected {}"
+                       .format(fileLoc, formatVersion, GameLog.FORMAT_VERSION))
+
+    return numberOfDice, numberOfDiceFaces, numberOfRolls
+
+
+  @staticmethod
+  def create(fileLoc, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3, gamesPerBlock=None):
+    """
+    # Open a game log to add games to, making it if it doesn't exist
+    #  -an existing log must have the same dice config
+    #
+    # gamesPerBlock: (int) finished games to keep before writing them, default is GAMES_PER_BLOCK
+    #
+    """
+    return GameLog.Writer(fileLoc, (numberOfDice, numberOfDiceFaces, numberOfRolls), gamesPerBlock)
+
+  @staticmethod
+  def open(fileLoc):
+    """ Open a game log to read the games from """
+    return GameLog.Reader(fileLoc)
+
+
+  class Writer:
+    """
+    # Adds games to a game log, see GameLog.create
+    #  -a game is recorded through its event hooks, from when it's attached
+    #   until it finishes
+    #  -finished games are kept and written a block at a time, so the file
+    #   is written to once per block, not once per event
+    #
+    """
+
+    def __init__(self, fileLoc, gameConfig, gamesPerBlock=None):
+      self.fileLoc       = fileLoc
+      self.gameConfig    = tuple(gameConfig)
+      self.gamesPerBlock = GameLog.GAMES_PER_BLOCK if gamesPerBlock is None else gamesPerBlock
+      self.rowIndices    = {rowName: iRow for iRow, rowName
+                            in enumerate(ArrayScorecard.getLayout(self.gameConfig[1]).rowNames)}
+
+      # CHECK: games can go in a block
+      if self.gamesPerBlock < 1:
+        raise ValueError("need at least 1 game per block")
+
+      # carry on an existing log
+      if os.path.isfile(fileLoc) and os.path.getsize(fileLoc) > 0:
+        with open(fileLoc, "rb") as f:
+          fileConfig = GameLog._readHeader(f, fileLoc)
+        if fileConfig != self.gameConfig:
+          raise ValueError("{} logs games with config {}, not {}".format(fileLoc, fileConfig, self.gameConfig))
+
+        # drop a block left half written by a crash, so new blocks follow the last whole one
+        reader = GameLog.Reader(fileLoc)
+        self.numberOfGames = reader.countGames()
+        blocksEnd = reader.getBlocksEnd()
+        if blocksEnd < os.path.getsize(fileLoc):
+          logger.warning("dropping the incomplete block at the end of {}, from byte {}".format(fileLoc, blocksEnd))
+          os.truncate(fileLoc, blocksEnd)
+        self.file = open(fileLoc, "ab")
+
+      else:
+        self.numberOfGames = 0
+        self.file = open(fileLoc, "wb")
+        self.file.write(GameLog._packHeader(self.gameConfig))
+        self.file.flush()
+
+      # records of the games being played, by game, and the finished games
+      # waiting to be written
+      self.gameRecords   = {}
+      self.finishedGames = []
+
+    def __enter__(self):
+      return self
+
+    def __exit__(self, *exc):
+      self.close()
+
+
+    def attach(self, game):
+      """ Record <game>, from now until it finishes """
+
+      # CHECK: game has the log's dice config
+      gameConfig = (game.getNumberOfDice(), game.getNumberOfDiceFaces(), game.getNumberOfRolls())
+      if gameConfig != self.gameConfig:
+        raise ValueError("game config {} doesn't match the log's {}".format(gameConfig, self.gameConfig))
+
+      # the players' names start the game
+      playerNames = "\0".join(player.getName() for player in game.getAllPlayers()).encode("utf-8")
+      paddedLength = -(-len(playerNames) // GameLog.RECORD_SIZE) * GameLog.RECORD_SIZE
+      records = [GameLog.RECORD.pack(GameLog.EVENT.GAME.value, 0, game.getNumberOfPlayers(), b"",
+                                     len(playerNames)),
+                 playerNames.ljust(paddedLength, b"\0")]
+
+      self.gameRecords[game] = records
+      game.addEventHook(self._onAction)
+
+    def detach(self, game):
+      """ Stop recording <game>, if it's being recorded, without writing it """
+      if self.gameRecords.pop(game, None) is not None:
+        game.removeEventHook(self._onAction)
+
+    def _onAction(self, game, action):
+      """ Event hook: add the record of an <action> just taken in <game> """
+      actionType = action[0]
+      playerIndex = game.currentPlayerIndex
+      argument, diceValues, extra = 0, b"", 0
+
+      if actionType == Game.ACTION.ROLL:
+        argument   = game.getRemainingRolls()
+        diceValues = bytes(game.getDiceValues())
+        extra      = (1 << game.getNumberOfDice()) - 1 - sum(1 << iDice for iDice in game.getHeldDice())
+      elif actionType == Game.ACTION.HOLD:
+        argument, extra = action[1], int(action[2])
+      elif actionType == Game.ACTION.SCORE:
+        argument = self.rowIndices[action[1]]
+      elif actionType == Game.ACTION.ADVANCE:
+        playerIndex = (playerIndex - 1) % game.getNumberOfPlayers()
+
+      records = self.gameRecords[game]
+      records.append(GameLog.RECORD.pack(GameLog.ACTION_EVENTS[actionType].value, playerIndex, argument,
+                                         diceValues, extra))
+
+      # the game is over
+      if game.getGameStatus() == Game.STATUS.FINISHED:
+        game.removeEventHook(self._onAction)
+        self.finishedGames.append(b"".join(self.gameRecords.pop(game)))
+        if len(self.finishedGames) >= self.gamesPerBlock:
+          self.flush()
+
+    def flush(self):
+      """ Write the finished games waiting to be written, as a block """
+      if not self.finishedGames:
+        return
+
+      # offsets are from the start of the block, after its index
+      indexLength = GameLog.RECORD_SIZE * (2 + len(self.finishedGames))
+      entries = []
+      offset  = indexLength
+      for gameData in self.finishedGames:
+        entries.append(GameLog.INDEX_ENTRY.pack(offset, len(gameData) // GameLog.RECORD_SIZE))
+        offset += len(gameData)
+
+      index = [GameLog.RECORD.pack(GameLog.EVENT.BLOCK.value, 0, 0, b"", len(self.finishedGames)),
+               GameLog.INDEX_ENTRY.pack(self.numberOfGames, offset)]
+      self.file.write(b"".join(index + entries + self.finishedGames))
+      self.file.flush()
+
+      self.numberOfGames += len(self.finishedGames)
+      self.finishedGames = []
+
+    def close(self):
+      """ Write any finished games and close the file; unfinished games aren't recorded """
+      if self.file is None:
+        return
+      if self.gameRecords:
+        logger.warning("closing game log with {} unfinished games, which won't be recorded"
+                       .format(len(self.gameRecords)))
+        for game in list(self.gameRecords):
+          self.detach(game)
+      self.flush()
+      self.file.close()
+      self.file = None
+
+
+  class LoggedGame:
+    """
+    # A game read from a game log
+    #  -events are (GameLog.EVENT, player index, argument, dice values, extra),
+    #   with the dice values as a tuple of the game's dice
+    #
+    """
+
+    def __init__(self, gameNumber, gameConfig, playerNames, events):
+      self.gameNumber  = gameNumber
+      self.gameConfig  = gameConfig
+      self.playerNames = playerNames
+      self.events      = events
+
+    def getRolls(self):
+      """ Dice values after each roll, in order """
+      return [diceValues for event, _, _, diceValues, _ in self.events if event == GameLog.EVENT.ROLL]
+
+    def replay(self, **gameArgs):
+      """
+      # Play the game again, with the logged dice; returns the finished Game
+      #
+      # gameArgs: other Game arguments, e.g., scorecardClass
+      #
+      """
+      rowNames = ArrayScorecard.getLayout(self.gameConfig[1]).rowNames
+
+      # the rolled dice are served back in the order they were rolled
+      rolledValues = []
+      actions = []
+      for event, _, argument, diceValues, extra in self.events:
+        if event == GameLog.EVENT.ROLL:
+          rolledValues.extend(diceValue for iDice, diceValue in enumerate(diceValues) if extra & (1 << iDice))
+          actions.append((Game.ACTION.ROLL,))
+        elif event == GameLog.EVENT.HOLD:
+          actions.append((Game.ACTION.HOLD, argument, bool(extra)))
+        elif event == GameLog.EVENT.SCORE:
+          actions.append((Game.ACTION.SCORE, rowNames[argument]))
+        elif event == GameLog.EVENT.ADVANCE:
+          actions.append((Game.ACTION.ADVANCE,))
+
+      numberOfDice, numberOfDiceFaces, numberOfRolls = self.gameConfig
+      return Game.replay(self.playerNames, None, actions, numberOfDice=numberOfDice,
+                         numberOfDiceFaces=numberOfDiceFaces, numberOfRolls=numberOfRolls,
+                         diceSource=ScriptedDice(rolledValues), **gameArgs)
+
+
+  class Reader:
+    """
+    # Reads the games from a game log, see GameLog.open
+    #  -iterating streams the games a block at a time, so files of any size
+    #   can be read in bounded memory
+    #
+    """
+
+    def __init__(self, fileLoc):
+      self.fileLoc = fileLoc
+      with open(fileLoc, "rb") as f:
+        self.gameConfig = GameLog._readHeader(f, fileLoc)
+        self.dataOffset = f.tell()
+      self.numberOfDice = self.gameConfig[0]
+
+    def _iterateBlocks(self, f):
+      """ (block offset, first game number, number of games, block length) of each complete block """
+      fileSize = os.fstat(f.fileno()).st_size
+      offset = self.dataOffset
+      while offset + 2 * GameLog.RECORD_SIZE <= fileSize:
+        f.seek(offset)
+        event, _, _, _, numberOfGames = GameLog.RECORD.unpack(f.read(GameLog.RECORD_SIZE))
+        firstGame, blockLength = GameLog.INDEX_ENTRY.unpack(f.read(GameLog.RECORD_SIZE))
+
+        # CHECK: block is whole
+        if event != GameLog.EVENT.BLOCK.value or offset + blockLength > fileSize:
+          logger.warning("{} ends with an incomplete block, at byte {}".format(self.fileLoc, offset))
+          return
+
+        yield offset, firstGame, numberOfGames, blockLength
+        offset += blockLength
+
+    def _parseGame(self, gameNumber, gameData):
+      """ LoggedGame from a game's records """
+      _, _, numberOfPlayers, _, namesLength = GameLog.RECORD.unpack_from(gameData)
+      playerNames = gameData[GameLog.RECORD_SIZE:GameLog.RECORD_SIZE + namesLength].decode("utf-8").split("\0")
+      namesEnd = GameLog.RECORD_SIZE + -(-namesLength // GameLog.RECORD_SIZE) * GameLog.RECORD_SIZE
+
+      numberOfDice = self.numberOfDice
+      events = []
+      for event, playerIndex, argument, diceValues, extra in GameLog.RECORD.iter_unpack(gameData[namesEnd:]):
+        events.append((GameLog.EVENT(event), playerIndex, argument, tuple(diceValues[:numberOfDice]), extra))
+      return GameLog.LoggedGame(gameNumber, self.gameConfig, playerNames[:numberOfPlayers], events)
+
+    def _readBlockGames(self, f, blockOffset, firstGame, numberOfGames, blockLength):
+      """ LoggedGames in a block """
+      f.seek(blockOffset)
+      block = f.read(blockLength)
+      for iGame in range(numberOfGames):
+        offset, numberOfRecords = GameLog.INDEX_ENTRY.unpack_from(block, GameLog.RECORD_SIZE * (2 + iGame))
+        yield self._parseGame(firstGame + iGame, block[offset:offset + numberOfRecords * GameLog.RECORD_SIZE])
+
+    def __iter__(self):
+      with open(self.fileLoc, "rb") as f:
+        for blockInfo in self._iterateBlocks(f):
+          yield from self._readBlockGames(f, *blockInfo)
+
+    def countGames(self):
+      """ Number of games in the log, from the block indexes """
+      with open(self.fileLoc, "rb") as f:
+        return sum(numberOfGames for _, _, numberOfGames, _ in self._iterateBlocks(f))
+
+    def getBlocksEnd(self):
+      """ Offset of the end of the last complete block, where the next block should go """
+      with open(self.fileLoc, "rb") as f:
+        blocksEnd = self.dataOffset
+        for blockOffset, _, _, blockLength in self._iterateBlocks(f):
+          blocksEnd = blockOffset + blockLength
+        return blocksEnd
+
+    def getGame(self, gameNumber):
+      """ LoggedGame with the number <gameNumber>, read without reading the games before it """
+      with open(self.fileLoc, "rb") as f:
+        for blockOffset, firstGame, numberOfGames, blockLength in self._iterateBlocks(f):
+          if firstGame <= gameNumber < firstGame + numberOfGames:
+            f.seek(blockOffset + GameLog.RECORD_SIZE * (2 + gameNumber - firstGame))
+            offset, numberOfRecords = GameLog.INDEX_ENTRY.unpack(f.read(GameLog.RECORD_SIZE))
+            f.seek(blockOffset + offset)
+            return self._parseGame(gameNumber, f.read(numberOfRecords * GameLog.RECORD_SIZE))
+      raise IndexError("game {} isn't in {}".format(gameNumber, self.fileLoc))
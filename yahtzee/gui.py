@@ -5,76 +5,14 @@ import threading
 import time
 import sys
 
+from concurrent import futures
+
 import PyQt5.QtCore as QtCore
 import PyQt5.QtGui as QtGui
 import PyQt5.QtWidgets as QtWidgets
 
-
-class GUI(object):
-  
-  def confirmAction(self, text):
-    """ Ask the user to confirm they want to do <the thing> """
-    raise NotImplementedError("subclass must implement")
-  
-  def gameComplete(self):
-    """ Called when game is completed """
-    raise NotImplementedError("subclass must implement")
-  
-  def newGame(self, game):
-    """ Reset the GUI and start a new game """
-    raise NotImplementedError("subclass must implement")
-  
-  def notifyStatus(self, text):
-    """ Status notification; used or ignored, up to the GUI """
-    raise NotImplementedError("subclass must implement")
-  
-  def requestNewPlayerName(self, existingPlayers=None):
-    """
-    # Ask the user for the name of the new player to add
-    #  -returns new name or None
-    #
-    # existingPlayers: (list) of existing player names to exclude
-    """
-    raise NotImplementedError("subclass must implement")
-  
-  def requestDiceSetup(self):
-    """
-    # Ask the user for info on the new dice setup
-    #  -returns new values or None
-    """
-    raise NotImplementedError("subclass must implement")
-  
-  def run(self):
-    """ Start GUI """
-    raise NotImplementedError("subclass must implement")
-  
-  def startPlayerTurn(self, player):
-    """ Start this player's turn """
-    raise NotImplementedError("subclass must implement")
-
-  def updateDice(self, diceValues):
-    """ Show the current values of the dice """
-    raise NotImplementedError("subclass must implement")
-
-  def updateHeldDice(self, heldDiceIndices):
-    """ Show the held dice as <heldDiceIndices> """
-    raise NotImplementedError("subclass must implement")
-  
-  def updatePossibleScorecard(self, playerList):
-    """ Show the possible scores given the current dice values """
-    raise NotImplementedError("subclass must implement")
-
-  def updateScorecard(self, playerList):
-    """ Update the scorecard scores """
-    raise NotImplementedError("subclass must implement")
-
-
-  
-
-  
-  
-  
-
+from basegui import GUI
+from predictor import ProbabilityPredictor
 
 
 class PyQtGUI(GUI, QtCore.QObject):
@@ -682,18 +620,13 @@ class PyQtGUI(GUI, QtCore.QObject):
     
     def _createProbabilityCell(self, align=QtCore.Qt.AlignCenter):
       """
-      # Create a score cell
-      #
-      # score:   (int) current score
-      # rowName: (str) row in scorecard
-      # player:  (Player) the scorecard belongs to
-      # x:       (int) x-axis grid position of cell
-      # y:       (int) y-axis grid position of cell
+      # Create a probability cell
+      #  -starts blank, and is filled in by PyQtGUI.updateProbabilities
       #
       """
 
-      # make None scores blank
-      prob = "@"# if score is None else str(score)
+      # no probability until it's calculated
+      prob = "-"
 
       # cell is a label
       cell = QtWidgets.QLabel(prob)
@@ -1004,8 +937,14 @@ class PyQtGUI(GUI, QtCore.QObject):
       return rollButton, displayDice, rollBoxUnstretcher
   
   
-    def createProbabilityGrid(self, players, numDiceFaces):
-      """ Grid for displaying the probabilities for each row"""
+    def createProbabilityGrid(self, players, numDice):
+      """
+      # Grid for displaying the probabilities for each row
+      #  -one row per upper section row, i.e., per face, and one column for
+      #   each number of dice: the chance of ending the turn with at least
+      #   that many dice showing the face
+      #
+      """
       
       # grid layout for grid...
       gridLayout = QtWidgets.QGridLayout()
@@ -1022,7 +961,7 @@ class PyQtGUI(GUI, QtCore.QObject):
         gridLayout.addWidget(self._createLabelCell(label), iLabel + 1, 0)
   
       # populate dice count row
-      for iDice in range(1, numDiceFaces+1):
+      for iDice in range(1, numDice+1):
         nameCell = self._createLabelCell(str(iDice), align=QtCore.Qt.AlignCenter)
         gridLayout.addWidget(nameCell, 0, iDice)
         
@@ -1032,7 +971,7 @@ class PyQtGUI(GUI, QtCore.QObject):
   
         probCells[rowName] = {}
         
-        for diceNum in range(1, numDiceFaces+1):
+        for diceNum in range(1, numDice+1):
           
           probCells[rowName][diceNum] = self._createProbabilityCell()
           gridLayout.addWidget(probCells[rowName][diceNum], iRow+1, diceNum)
@@ -1087,6 +1026,13 @@ class PyQtGUI(GUI, QtCore.QObject):
     self.controller = controller
     self.game       = game
     
+    # probabilities are calculated off the GUI thread, one request at a time
+    #  -each request gets a new number, so results of superseded requests
+    #   can be dropped
+    self.probabilityExecutor = futures.ThreadPoolExecutor(max_workers=1)
+    self.probabilityFuture   = None
+    self.probabilityRequest  = 0
+    
     
     ###########################################################################
     # define stylesheets for GUI elements and text
@@ -1219,7 +1165,7 @@ class PyQtGUI(GUI, QtCore.QObject):
     # probability grid
     logger.debug("Creating layout: probability grid")
     self.probabilityCells, probGridLayout = appCreator.createProbabilityGrid(self.game.getAllPlayers(),
-                                                                             self.game.getNumberOfDiceFaces())
+                                                                             self.game.getNumberOfDice())
     # roll box
     logger.debug("Creating layout: roll box")
     self.rollButton, self.displayDice, rollBoxLayout = appCreator.createRollBox(self.game.getNumberOfDice())
@@ -1266,6 +1212,9 @@ class PyQtGUI(GUI, QtCore.QObject):
       
     threading.Thread(target=fn).start()
     
+    # probabilities for the new layout
+    self.updateProbabilities()
+    
     
     
     # game grid
@@ -1380,6 +1329,8 @@ class PyQtGUI(GUI, QtCore.QObject):
     # dice change (always?) means a roll was done, so update roll button
     self._updateRollButton("Roll ({})".format(self.game.getRemainingRolls()))
     
+    self.updateProbabilities()
+    
 
   def updateHeldDice(self, heldDiceIndices):
     """ Update the display to show the currently held and free dice """
@@ -1387,11 +1338,61 @@ class PyQtGUI(GUI, QtCore.QObject):
   
     for diceIndex in range(self.game.getNumberOfDice()):
       self._updateHeldDice(diceIndex, diceIndex in heldDiceIndices)
+    
+    self.updateProbabilities()
       
 
 
     
     
+  @staticmethod
+  def _formatProbability(prob):
+    """ Probability as a percentage, without rounding to a certainty that isn't there """
+    if 0 < prob < 0.005:
+      return "<1%"
+    if 0.995 <= prob < 1:
+      return ">99%"
+    return "{:.0f}%".format(100 * prob)
+  
+  def _calcProbabilities(self, requestId, diceValues, heldDice, remainingRolls, numberOfDiceFaces):
+    """ Calculate the probability grid, on the worker thread, and send it to the GUI """
+    
+    # skip requests that were superseded while waiting
+    if requestId != self.probabilityRequest:
+      return
+    
+    probs = ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, heldDice, remainingRolls,
+                                                             numberOfDiceFaces)
+    self.funcCall.emit(lambda: self._showProbabilities(requestId, probs))
+  
+  def _showProbabilities(self, requestId, probs):
+    """ Display a calculated probability grid, unless the dice have changed since """
+    if requestId != self.probabilityRequest:
+      return
+    
+    for face, rowName in enumerate(self.probabilityCells, 1):
+      for diceNum, cell in self.probabilityCells[rowName].items():
+        cell.setText(self._formatProbability(float(probs[face-1, diceNum-1])))
+  
+  def updateProbabilities(self):
+    """
+    # Recalculate the probability grid for the current dice and held dice
+    #  -the calculation runs in the background, so this never blocks; a
+    #   calculation not yet started for earlier dice is cancelled
+    #
+    """
+    
+    self.probabilityRequest += 1
+    if self.probabilityFuture is not None:
+      self.probabilityFuture.cancel()
+    
+    # snapshot the game, as it can change before the calculation runs
+    game = self.game
+    self.probabilityFuture = self.probabilityExecutor.submit(self._calcProbabilities, self.probabilityRequest,
+                                                             list(game.getDiceValues()), list(game.getHeldDice()),
+                                                             game.getRemainingRolls(), game.getNumberOfDiceFaces())
+  
+  
   def updatePossibleScorecard(self, playerList):
     """ Show the possible scores given the current dice values """
   
@@ -0,0 +1,81 @@
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Hand:
+  """
+  # Compact representation of a hand of dice, stored as the number of dice
+  # showing each face
+  #  -the order of the dice doesn't matter
+  #  -dice without a value (None, i.e., not rolled yet) are ignored
+  #
+  """
+
+  # largest dice value we can count
+  MAX_DICE_FACES = 20
+
+  __slots__ = ("counts", "uniqueFaces", "total", "faceMask", "numberOfDice")
+
+  def __init__(self, diceValues):
+    """
+    #
+    # diceValues: (list) of dice values
+    #
+    """
+
+    counts = [0] * (Hand.MAX_DICE_FACES + 1)
+    for diceValue in diceValues:
+      if diceValue is not None:
+        counts[diceValue] += 1
+
+    # counts[face] is the number of dice showing <face>; counts[0] is unused
+    self.counts = tuple(counts)
+
+    # sorted faces that appear in the hand
+    self.uniqueFaces = tuple(face for face, count in enumerate(counts) if count > 0)
+
+    # sum of all the dice
+    self.total = sum(face * counts[face] for face in self.uniqueFaces)
+
+    # bit <face> is set if the face appears in the hand
+    self.faceMask = 0
+    for face in self.uniqueFaces:
+      self.faceMask |= 1 << face
+
+    self.numberOfDice = sum(counts)
+
+  def __eq__(self, other):
+    return isinstance(other, Hand) and self.counts == other.counts
+
+  def __hash__(self):
+    return hash(self.counts)
+
+  def __repr__(self):
+    return "Hand({})".format(self.getDiceValues())
+
+  def getCount(self, face):
+    """ Number of dice showing <face> """
+    if 0 < face <= Hand.MAX_DICE_FACES:
+      return self.counts[face]
+    return 0
+
+  def getDiceValues(self):
+    """ Sorted list of the dice values """
+    return [face for face in self.uniqueFaces for _ in range(self.counts[face])]
+
+  def getFacesWithAtLeast(self, num):
+    """ Faces that appear at least <num> times """
+    return [face for face in self.uniqueFaces if self.counts[face] >= num]
+
+  def hasStraight(self, length):
+    """ Is there a straight sequence of <length> consecutive dice values """
+
+    # each step leaves the bits that start a run one longer than before
+    runStarts = self.faceMask
+    for _ in range(length - 1):
+      runStarts &= runStarts >> 1
+    return runStarts != 0
+
+  def isYahtzee(self):
+    """ Do all the dice show the same value """
+    return len(self.uniqueFaces) == 1
@@ -0,0 +1,332 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import argparse
+import os
+import random
+import time
+
+from collections import OrderedDict
+
+import numpy as np
+
+from advisor import HoldAdvisor
+from model import ArrayScorecard, Game
+from solver import StrategySolver
+
+
+class Policy:
+  """
+  # Decides what a player does on their turn; a bot, attached to a Player
+  # with Player.setStrategy
+  #  -subclasses choose which dice to hold between rolls, and which row to
+  #   score in at the end of the turn, from a TurnView of the game
+  #  -policies that make random choices draw them from <rng>, so they can
+  #   be seeded
+  #  -decisions should be asked for with decideHeldDice and decideRow,
+  #   which time each one, see getLatencyStats
+  #
+  """
+
+  # kinds of decision, as timed
+  DECISIONS = ("hold", "row")
+
+  def __init__(self, rng=None):
+    """
+    #
+    # rng: (Random) random number generator, default is a new one
+    #
+    """
+    self.rng = random.Random() if rng is None else rng
+    self.resetLatencyStats()
+
+  def chooseHeldDice(self, turnView):
+    """ Indices of the dice to hold for the next roll; holding them all ends the turn """
+    raise NotImplementedError("subclass must implement")
+
+  def chooseRow(self, turnView):
+    """ Name of the row to score the current dice in """
+    raise NotImplementedError("subclass must implement")
+
+  @staticmethod
+  def getScorableRows(turnView):
+    """ Rows the player can score the current dice in """
+    return turnView.scorecard.getScorableRows(list(turnView.diceValues))
+
+
+  def _timeDecision(self, decision, chooseFn, turnView):
+    """ Make a decision with <chooseFn>, adding how long it took to the <decision> stats """
+    startTime = time.perf_counter()
+    choice = chooseFn(turnView)
+    elapsed = time.perf_counter() - startTime
+
+    stats = self.latencyStats[decision]
+    stats[0] += 1
+    stats[1] += elapsed
+    stats[2]  = max(stats[2], elapsed)
+    return choice
+
+  def decideHeldDice(self, turnView):
+    """ chooseHeldDice, timed """
+    return self._timeDecision("hold", self.chooseHeldDice, turnView)
+
+  def decideRow(self, turnView):
+    """ chooseRow, timed """
+    return self._timeDecision("row", self.chooseRow, turnView)
+
+  def resetLatencyStats(self):
+    # [number of decisions, total seconds, max seconds], by kind of decision
+    self.latencyStats = {decision: [0, 0.0, 0.0] for decision in Policy.DECISIONS}
+
+  def getLatencyStats(self):
+    """
+    # How long decisions have taken, by kind of decision
+    #  -returns {decision: {"count", "meanSeconds", "maxSeconds", "perSecond"}}
+    #
+    """
+    latencyStats = OrderedDict()
+    for decision, (count, totalSeconds, maxSeconds) in self.latencyStats.items():
+      latencyStats[decision] = {"count":       count,
+                                "meanSeconds": totalSeconds / count if count else 0.0,
+                                "maxSeconds":  maxSeconds,
+                                "perSecond":   count / totalSeconds if totalSeconds else 0.0}
+    return latencyStats
+
+
+class RandomPolicy(Policy):
+  """ Holds each die with even odds, and scores in any row it can """
+
+  def chooseHeldDice(self, turnView):
+    return [iDice for iDice in range(len(turnView.diceValues)) if self.rng.random() < 0.5]
+
+  def chooseRow(self, turnView):
+    return self.rng.choice(Policy.getScorableRows(turnView))
+
+
+class GreedyPolicy(Policy):
+  """
+  # Holds every die showing the most common face (the highest, if there's a
+  # tie), and scores in the row worth the most points right now
+  #
+  """
+
+  def chooseHeldDice(self, turnView):
+    diceValues = turnView.diceValues
+    mostCommon = max(set(diceValues), key=lambda diceValue: (diceValues.count(diceValue), diceValue))
+    return [iDice for iDice, diceValue in enumerate(diceValues) if diceValue == mostCommon]
+
+  def chooseRow(self, turnView):
+    possibleScorecard = turnView.scorecard.getPossibleScorecard(list(turnView.diceValues))
+
+    # most points first, then the first row on the scorecard
+    bestRow, bestScore = None, -1
+    for rowName in Policy.getScorableRows(turnView):
+      rowScore = possibleScorecard.getRowScore(rowName) or 0
+      if rowScore > bestScore:
+        bestRow, bestScore = rowName, rowScore
+    return bestRow
+
+
+class OptimalPolicy(Policy):
+  """
+  # Makes the decisions with the best expected final score, from a solved
+  # strategy table (see precompute.py)
+  #  -plays the optimal solitaire strategy, so ignores the opponents' scores
+  #  -without an advisor, the table for the game's dice config is loaded
+  #   from TABLE_DIR the first time it's needed
+  #
+  """
+
+  # where tables are loaded from, and their file names, as precompute.py saves them
+  TABLE_DIR       = "."
+  TABLE_FILE_NAME = "ev-{}d{}-{}r.evt"
+
+  # advisors for each dice config, shared by the policies in a process
+  _advisors = {}
+
+  def __init__(self, rng=None, advisor=None):
+    """
+    #
+    # advisor: (HoldAdvisor) advisor for the game's dice config, default is
+    #          one for the saved table
+    #
+    """
+    super().__init__(rng)
+    self.advisor = advisor
+
+  @staticmethod
+  def getAdvisor(numberOfDice, numberOfDiceFaces, numberOfRolls):
+    """ HoldAdvisor from the saved table for this dice config, loaded the first time """
+    gameConfig = (numberOfDice, numberOfDiceFaces, numberOfRolls)
+    if gameConfig not in OptimalPolicy._advisors:
+      tableLoc = os.path.join(OptimalPolicy.TABLE_DIR, OptimalPolicy.TABLE_FILE_NAME.format(*gameConfig))
+
+      # CHECK: table has been made
+      if not os.path.isfile(tableLoc):
+        raise FileNotFoundError("no strategy table at {}; run precompute.py to make one".format(tableLoc))
+
+      solver = StrategySolver(*gameConfig)
+      solver.load(tableLoc)
+      OptimalPolicy._advisors[gameConfig] = HoldAdvisor(solver)
+    return OptimalPolicy._advisors[gameConfig]
+
+  def _getAdvisor(self, turnView):
+    if self.advisor is None:
+      self.advisor = OptimalPolicy.getAdvisor(len(turnView.diceValues), turnView.numberOfDiceFaces,
+                                              turnView.numberOfRolls)
+    return self.advisor
+
+  def chooseHeldDice(self, turnView):
+    diceValues = list(turnView.diceValues)
+    heldDice, _ = self._getAdvisor(turnView).getBestHold(diceValues, turnView.remainingRolls, turnView.scorecard)
+    holdMask = HoldAdvisor.getHoldMask(diceValues, heldDice)
+    return [iDice for iDice, isHeld in enumerate(holdMask) if isHeld]
+
+  def chooseRow(self, turnView):
+    rowName, _ = self._getAdvisor(turnView).getBestRow(list(turnView.diceValues), turnView.scorecard)
+    return rowName
+
+
+class HeadlessRunner:
+  """
+  # Plays complete games without a GUI
+  #
+  # Games are played through the same Game state machine the Controller
+  # uses (rollDice, setDiceHold, score, advanceTurn), with each player's
+  # moves chosen by the Policy attached to them as their strategy.
+  #
+  # With the greedy policy, a core plays around a thousand 5-dice games a
+  # second; what's left of the time is spread over the Game's own calls
+  # (rolls, holds, the action list), which every game has to go through.
+  #
+  """
+
+  # policies that can be chosen by name on the command line
+  POLICIES = OrderedDict([("greedy",  GreedyPolicy),
+                          ("optimal", OptimalPolicy),
+                          ("random",  RandomPolicy)])
+
+  def __init__(self, policies, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3, scorecardClass=ArrayScorecard):
+    """
+    #
+    # policies:       (dict) player name: Policy, in turn order
+    # scorecardClass: (class) scorecard implementation for the players
+    #
+    """
+
+    # CHECK: there's someone to play
+    if not policies:
+      raise ValueError("need at least one player")
+
+    self.policies          = OrderedDict(policies)
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.numberOfRolls     = numberOfRolls
+    self.scorecardClass    = scorecardClass
+
+  def newGame(self, seed=None):
+    """
+    # A new game between the players
+    #
+    # seed: (int or SeedSequence) seed of the game's dice, default is a random one
+    #
+    """
+    game = Game(list(self.policies), numberOfDice=self.numberOfDice, numberOfDiceFaces=self.numberOfDiceFaces,
+                numberOfRolls=self.numberOfRolls, scorecardClass=self.scorecardClass, seed=seed)
+    self.attachPolicies(game)
+    return game
+
+  def attachPolicies(self, game):
+    """ Make each player's policy the strategy of their player in <game>, unless they have one already """
+    for player in game.getAllPlayers():
+      if player.getStrategy() is None:
+        player.setStrategy(self.policies[player.getName()])
+
+  def playTurn(self, game):
+    """ Play the current player's turn of <game>, from the first roll to scoring """
+
+    policy = game.getCurrentPlayer().getStrategy()
+
+    game.rollDice()
+    while game.getRemainingRolls() > 0:
+
+      # hold the chosen dice, and free the rest
+      #  -only the dice that change need to be set
+      heldDice = set(policy.decideHeldDice(game.getTurnView()))
+      if len(heldDice) == game.getNumberOfDice():
+        break
+      for iDice in heldDice.symmetric_difference(game.getHeldDice()):
+        game.setDiceHold(iDice, iDice in heldDice)
+      game.rollDice()
+
+    game.score(policy.decideRow(game.getTurnView()))
+    game.advanceTurn()
+
+  def playGame(self, game=None):
+    """
+    # Play a game to the end
+    #  -returns the total score of each player, by name
+    #
+    # game: (Game) game to play, default is a new game
+    #
+    """
+    if game is None:
+      game = self.newGame()
+    self.attachPolicies(game)
+
+    game.setStatus(Game.STATUS.RUNNING)
+    while game.getGameStatus() != Game.STATUS.FINISHED:
+      self.playTurn(game)
+
+    return game.getTotalScores()
+
+  def playGames(self, numberOfGames):
+    """ Play <numberOfGames> games; returns a list of the total scores of each """
+    return [self.playGame() for _ in range(numberOfGames)]
+
+
+def parseArgs(argv=None):
+  """ Read the command line options """
+
+  parser = argparse.ArgumentParser(description="Play games without a GUI and report the scores")
+  parser.add_argument("--games", type=int, default=1000,
+                      help="number of games to play")
+  parser.add_argument("--policy", nargs="+", default=["greedy"], choices=list(HeadlessRunner.POLICIES),
+                      help="policy of each player, one player per policy")
+  parser.add_argument("--dice",  type=int, default=5,
+                      help="number of dice ({}-{})".format(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE))
+  parser.add_argument("--faces", type=int, default=6,
+                      help="number of dice faces ({}-{})".format(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES))
+  parser.add_argument("--rolls", type=int, default=3,
+                      help="number of rolls per turn ({}-{})".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
+  parser.add_argument("--table-dir", default=OptimalPolicy.TABLE_DIR,
+                      help="directory of the strategy tables made by precompute.py, for the optimal policy")
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
+
+  args = parseArgs(argv)
+  OptimalPolicy.TABLE_DIR = args.table_dir
+  policies = OrderedDict(("{}-{}".format(iPlayer + 1, policyName), HeadlessRunner.POLICIES[policyName]())
+                         for iPlayer, policyName in enumerate(args.policy))
+  runner = HeadlessRunner(policies, numberOfDice=args.dice, numberOfDiceFaces=args.faces, numberOfRolls=args.rolls)
+
+  startTime = time.time()
+  results = runner.playGames(args.games)
+  elapsed = time.time() - startTime
+
+  logger.info("played {} games in {:.1f}s ({:.0f} games/s)".format(args.games, elapsed, args.games / elapsed))
+  for playerName, policy in policies.items():
+    scores = np.array([result[playerName] for result in results])
+    logger.info("{}: mean score {:.1f}, sd {:.1f}, min {}, max {}"
+                .format(playerName, scores.mean(), scores.std(), scores.min(), scores.max()))
+    for decision, stats in policy.getLatencyStats().items():
+      logger.info("{}: {} {} decisions, mean {:.1f}us, max {:.1f}us ({:.0f}/s)"
+                  .format(playerName, stats["count"], decision, 1e6 * stats["meanSeconds"], 1e6 * stats["maxSeconds"],
+                          stats["perSecond"]))
+
+
+if __name__ == "__main__":
+  logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+  main()
@@ -0,0 +1,220 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import queue
+import sqlite3
+import threading
+
+
+class GameHistory:
+  """
+  # Record of finished games, kept in an SQLite database
+  #
+  # Tables:
+  #  -games:       one row per game, with its dice config and when it ended
+  #  -gamePlayers: one row per player per game, with their final score
+  #  -rowScores:   one row per scored scorecard row, per player per game
+  #
+  # Games are submitted from the caller's thread, which only copies what's
+  # needed from the game, and written by a background thread. The writer
+  # commits whatever games are waiting in one transaction, so a burst of
+  # games costs one commit, and the caller never waits on the disk. The
+  # database uses write-ahead logging, so it can be read while it's being
+  # written.
+  #
+  """
+
+  SCHEMA = """
+    CREATE TABLE IF NOT EXISTS games (
+      gameId            INTEGER PRIMARY KEY,
+      finishedAt        TEXT    NOT NULL,
+      numberOfDice      INTEGER NOT NULL,
+      numberOfDiceFaces INTEGER NOT NULL,
+      numberOfRolls     INTEGER NOT NULL,
+      numberOfPlayers   INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS gamePlayers (
+      gameId     INTEGER NOT NULL REFERENCES games(gameId),
+      seat       INTEGER NOT NULL,
+      playerName TEXT    NOT NULL,
+      totalScore INTEGER NOT NULL,
+      isWinner   INTEGER NOT NULL,
+      PRIMARY KEY (gameId, seat)
+    );
+    CREATE TABLE IF NOT EXISTS rowScores (
+      gameId  INTEGER NOT NULL,
+      seat    INTEGER NOT NULL,
+      rowName TEXT    NOT NULL,
+      score   INTEGER NOT NULL,
+      PRIMARY KEY (gameId, seat, rowName)
+    );
+    CREATE INDEX IF NOT EXISTS gamePlayersByScore  ON gamePlayers (totalScore DESC);
+    CREATE INDEX IF NOT EXISTS gamePlayersByPlayer ON gamePlayers (playerName, totalScore DESC);
+    CREATE INDEX IF NOT EXISTS gamesByConfig       ON games (numberOfDice, numberOfDiceFaces, numberOfRolls);
+  """
+
+  # most games to write in one transaction
+  MAX_BATCH_SIZE = 512
+
+  # marks the end of the submitted games, for the writer thread
+  _STOP = object()
+
+  def __init__(self, dbFileLoc):
+    """
+    #
+    # dbFileLoc: (str) database file, created if it doesn't exist
+    #
+    """
+    self.dbFileLoc = dbFileLoc
+
+    # create the tables before anything's submitted, so problems with the
+    # file show up here rather than in the writer thread
+    connection = self._connect()
+    with connection:
+      connection.executescript(GameHistory.SCHEMA)
+    connection.close()
+
+    self.pending = queue.Queue()
+    self.writer  = threading.Thread(target=self._writeGames, name="GameHistoryWriter", daemon=True)
+    self.writer.start()
+
+  def _connect(self):
+    """ New connection to the database, in write-ahead logging mode """
+    connection = sqlite3.connect(self.dbFileLoc)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+  @staticmethod
+  def getGameRecord(game):
+    """
+    # What's kept of a finished <game>
+    #  -returns (game info, [(seat, player name, total score, is winner, row scores)]),
+    #   where row scores are (row name, score) for every scored row
+    #
+    """
+    totalScores = game.getTotalScores()
+    bestScore = max(totalScores.values())
+
+    players = []
+    for seat, player in enumerate(game.getAllPlayers()):
+      rowScores = [(rowName, score) for rowName, score in player.getScorecard().iterateOverScorecard()
+                   if score is not None]
+      players.append((seat, player.getName(), totalScores[player.getName()],
+                      totalScores[player.getName()] == bestScore, rowScores))
+
+    gameInfo = (datetime.datetime.now().isoformat(timespec="seconds"), game.getNumberOfDice(),
+                game.getNumberOfDiceFaces(), game.getNumberOfRolls(), game.getNumberOfPlayers())
+    return gameInfo, players
+
+  def submitGame(self, game):
+    """ Add a finished <game> to the history, in the background """
+    self.pending.put(GameHistory.getGameRecord(game))
+
+  def flush(self):
+    """ Wait until every submitted game has been written """
+    self.pending.join()
+
+  def close(self):
+    """ Write any submitted games, and stop the writer """
+    if self.writer.is_alive():
+      self.pending.put(GameHistory._STOP)
+      self.writer.join()
+
+
+  def _writeGames(self):
+    """ Writer thread: write submitted games, a batch per transaction, until stopped """
+    connection = self._connect()
+    try:
+      isStopping = False
+      while not isStopping:
+
+        # wait for a game, then take whatever else is waiting
+        batch = [self.pending.get()]
+        while len(batch) < GameHistory.MAX_BATCH_SIZE:
+          try:
+            batch.append(self.pending.get_nowait())
+          except queue.Empty:
+            break
+
+        isStopping = GameHistory._STOP in batch
+        gameRecords = [gameRecord for gameRecord in batch if gameRecord is not GameHistory._STOP]
+        try:
+          GameHistory._insertGames(connection, gameRecords)
+        except sqlite3.Error:
+          logger.exception("failed to write {} games to {}".format(len(gameRecords), self.dbFileLoc))
+        finally:
+          for _ in batch:
+            self.pending.task_done()
+    finally:
+      connection.close()
+
+  @staticmethod
+  def _insertGames(connection, gameRecords):
+    """ Insert <gameRecords>, from getGameRecord, in one transaction """
+    if not gameRecords:
+      return
+
+    with connection:
+      playerRows = []
+      rowScoreRows = []
+      for gameInfo, players in gameRecords:
+        gameId = connection.execute("INSERT INTO games (finishedAt, numberOfDice, numberOfDiceFaces, numberOfRolls, "
+                                    "numberOfPlayers) VALUES (?, ?, ?, ?, ?)", gameInfo).lastrowid
+        for seat, playerName, totalScore, isWinner, rowScores in players:
+          playerRows.append((gameId, seat, playerName, totalScore, int(isWinner)))
+          rowScoreRows.extend((gameId, seat, rowName, score) for rowName, score in rowScores)
+
+      connection.executemany("INSERT INTO gamePlayers VALUES (?, ?, ?, ?, ?)", playerRows)
+      connection.executemany("INSERT INTO rowScores VALUES (?, ?, ?, ?)", rowScoreRows)
+
+
+  ###########################################################################
+  # queries
+  ###########################################################################
+
+  def _query(self, sql, parameters=()):
+    """ Rows of a read-only query, on a connection of its own """
+    connection = self._connect()
+    try:
+      return connection.execute(sql, parameters).fetchall()
+    finally:
+      connection.close()
+
+  def getHighScores(self, limit=10, diceConfig=None):
+    """
+    # Best final scores, best first
+    #  -returns a list of (player name, total score, finished at, game id)
+    #
+    # diceConfig: (tuple) (numberOfDice, numberOfDiceFaces, numberOfRolls) to
+    #             only include games of, default is every game
+    #
+    """
+    sql = ("SELECT gamePlayers.playerName, gamePlayers.totalScore, games.finishedAt, games.gameId "
+           "FROM gamePlayers JOIN games USING (gameId) ")
+    parameters = []
+    if diceConfig is not None:
+      sql += "WHERE games.numberOfDice = ? AND games.numberOfDiceFaces = ? AND games.numberOfRolls = ? "
+      parameters.extend(diceConfig)
+    sql += "ORDER BY gamePlayers.totalScore DESC, games.gameId LIMIT ?"
+    return self._query(sql, parameters + [limit])
+
+  def getPlayerStats(self, playerName):
+    """ Summary of a player's games, as a dict of games, wins, mean, best and worst scores """
+    games, wins, meanScore, bestScore, worstScore = self._query(
+      "SELECT COUNT(*), SUM(isWinner), AVG(totalScore), MAX(totalScore), MIN(totalScore) "
+      "FROM gamePlayers WHERE playerName = ?", (playerName,))[0]
+    return {"games": games, "wins": wins or 0, "meanScore": meanScore, "bestScore": bestScore,
+            "worstScore": worstScore}
+
+  def getPlayerGames(self, playerName, limit=10):
+    """ A player's best games, as a list of (total score, finished at, game id) """
+    return self._query("SELECT gamePlayers.totalScore, games.finishedAt, games.gameId "
+                       "FROM gamePlayers JOIN games USING (gameId) WHERE gamePlayers.playerName = ? "
+                       "ORDER BY gamePlayers.totalScore DESC LIMIT ?", (playerName, limit))
+
+  def getRowScores(self, gameId, seat):
+    """ {row name: score} of a player's scorecard in a game """
+    return dict(self._query("SELECT rowName, score FROM rowScores WHERE gameId = ? AND seat = ?", (gameId, seat)))
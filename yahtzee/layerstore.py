@@ -0,0 +1,172 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+
+from math import comb
+
+import numpy as np
+
+from evtable import EVTable
+from scoretable import ScoreTable
+
+
+class LayerStore:
+  """
+  # State values kept on disk, one memory-mapped EVTable per layer
+  #
+  # A layer is every free row mask with the same number of free rows. Within
+  # a layer, masks are stored in increasing order, which is the colex order
+  # of their sets of free rows, so a mask's position is its combinatorial rank.
+  #
+  # Indexing looks like indexing the full (2^numberOfRows x upper totals x 2)
+  # value array, e.g., store[freeRowMasks, 10:20], as long as all the masks
+  # are in the same layer.
+  #  -complete layers are read from their committed table files
+  #  -the layer being solved is written through the temporary file of its
+  #    EVTable.Writer, so worker processes can write to it too
+  #
+  """
+
+  def __init__(self, storeDir, numberOfRows, numberOfUpperTotals, gameConfig):
+    """
+    #
+    # storeDir:            (str) directory holding the layer files
+    # numberOfRows:        (int) number of scorable rows
+    # numberOfUpperTotals: (int) number of capped upper section totals
+    # gameConfig:          (tuple) (numberOfDice, numberOfDiceFaces, numberOfRolls)
+    #
+    """
+    self.storeDir            = storeDir
+    self.numberOfRows        = numberOfRows
+    self.numberOfUpperTotals = numberOfUpperTotals
+    self.gameConfig          = gameConfig
+
+    # looks like the full value array
+    self.shape = (2 ** numberOfRows, numberOfUpperTotals, 2)
+    self.ndim  = len(self.shape)
+    self.dtype = np.dtype(np.float64)
+
+    self._binomial = np.array([[comb(n, k) for k in range(numberOfRows + 2)] for n in range(numberOfRows + 1)],
+                              dtype=np.int64)
+
+    # full scorecards are worth nothing more
+    self._emptyLayer = np.zeros((1, numberOfUpperTotals, 2))
+
+    # open layer files, by (numberOfFreeRows, isWritable)
+    self._layers = {}
+
+
+  @staticmethod
+  def getLayerLoc(storeDir, numberOfFreeRows):
+    """ File holding the values of the layer with <numberOfFreeRows> free rows """
+    return os.path.join(storeDir, "layer-{:02d}.evt".format(numberOfFreeRows))
+
+  @staticmethod
+  def getLayerMasks(numberOfRows, numberOfFreeRows):
+    """ All the free row masks with <numberOfFreeRows> of <numberOfRows> free rows, in increasing order """
+    if numberOfFreeRows == 0:
+      return np.zeros(1, dtype=np.int64)
+
+    # sorted multisets become strictly increasing row positions by adding
+    # each value's position
+    positions = ScoreTable._enumerateHands(numberOfFreeRows, numberOfRows - numberOfFreeRows + 1).astype(np.int64)
+    positions += np.arange(numberOfFreeRows)
+    return np.sort((1 << positions).sum(axis=1))
+
+  @staticmethod
+  def countFreeRows(freeRowMasks, numberOfRows):
+    """ Number of free rows in each mask """
+    freeRowMasks = np.asarray(freeRowMasks, dtype=np.int64)
+    popCounts = np.zeros(freeRowMasks.shape, dtype=np.int64)
+    for iRow in range(numberOfRows):
+      popCounts += (freeRowMasks >> iRow) & 1
+    return popCounts
+
+  def getLayerRanks(self, freeRowMasks):
+    """ Position of each mask within its layer """
+    freeRowMasks = np.asarray(freeRowMasks, dtype=np.int64)
+    ranks    = np.zeros(freeRowMasks.shape, dtype=np.int64)
+    numFound = np.zeros(freeRowMasks.shape, dtype=np.int64)
+    for iRow in range(self.numberOfRows):
+      isFree = (freeRowMasks >> iRow) & 1
+      numFound += isFree
+      ranks    += isFree * self._binomial[iRow, numFound]
+    return ranks
+
+
+  def countCompleteLayers(self):
+    """ Number of layers, from the first, that have been committed """
+    for numberOfFreeRows in range(1, self.numberOfRows + 1):
+      if not os.path.exists(LayerStore.getLayerLoc(self.storeDir, numberOfFreeRows)):
+        return numberOfFreeRows - 1
+    return self.numberOfRows
+
+  def verifyLayer(self, numberOfFreeRows):
+    """ Check a committed layer is for this config and scoring rules, and isn't corrupt; raises ValueError """
+    layerLoc = LayerStore.getLayerLoc(self.storeDir, numberOfFreeRows)
+    table = EVTable.open(layerLoc, *self.gameConfig, verify=True)
+    expectedShape = (comb(self.numberOfRows, numberOfFreeRows), self.numberOfUpperTotals, 2)
+    if table.values.shape != expectedShape:
+      raise ValueError("layer file {} doesn't match its layer".format(layerLoc))
+
+  def createLayer(self, numberOfFreeRows):
+    """ Start writing a layer; returns the EVTable.Writer to commit when it's solved """
+    layerShape = (comb(self.numberOfRows, numberOfFreeRows), self.numberOfUpperTotals, 2)
+    return EVTable.create(LayerStore.getLayerLoc(self.storeDir, numberOfFreeRows), layerShape,
+                          *self.gameConfig, dtype=np.float64)
+
+  def getLayer(self, numberOfFreeRows, isWritable=False):
+    """ Memory-mapped values of a layer, in mask order """
+
+    if numberOfFreeRows == 0:
+      return self._emptyLayer
+
+    key = (numberOfFreeRows, isWritable)
+    layer = self._layers.get(key, None)
+    if layer is None:
+
+      # only the layers either side of this one are needed
+      for otherKey in list(self._layers):
+        if abs(otherKey[0] - numberOfFreeRows) > 1:
+          del self._layers[otherKey]
+
+      layerShape = (comb(self.numberOfRows, numberOfFreeRows), self.numberOfUpperTotals, 2)
+      layerLoc = LayerStore.getLayerLoc(self.storeDir, numberOfFreeRows)
+      if isWritable:
+        layer = np.memmap(EVTable.getTempLoc(layerLoc), dtype="<f8", mode="r+",
+                          offset=EVTable.DATA_OFFSET, shape=layerShape)
+      else:
+        layer = EVTable.open(layerLoc, *self.gameConfig).values
+      self._layers[key] = layer
+
+    return layer
+
+  def close(self):
+    """ Let go of the open layer files """
+    self._layers = {}
+
+
+  def _splitKey(self, key, isWritable):
+    """ Layer and in-layer index of an index into the full value array """
+
+    if not isinstance(key, tuple):
+      key = (key,)
+    freeRowMasks, rest = key[0], key[1:]
+
+    popCounts = LayerStore.countFreeRows(freeRowMasks, self.numberOfRows)
+    numberOfFreeRows = int(np.min(popCounts)) if popCounts.size else 0
+
+    # CHECK: all the masks are in one layer
+    if np.any(popCounts != numberOfFreeRows):
+      raise IndexError("can only index masks with the same number of free rows at once")
+
+    return self.getLayer(numberOfFreeRows, isWritable), (self.getLayerRanks(freeRowMasks),) + rest
+
+  def __getitem__(self, key):
+    layer, layerKey = self._splitKey(key, False)
+    return np.asarray(layer[layerKey])
+
+  def __setitem__(self, key, values):
+    layer, layerKey = self._splitKey(key, True)
+    layer[layerKey] = values
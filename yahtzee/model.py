@@ -1,18 +1,19 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import itertools
-import random
-
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
 import functools
 
+from types import MappingProxyType
+
 import numpy as np
-import pandas as pd
 
 from enum import Enum
 
+from dicesource import BufferedDice
+from hand import Hand
+
 class Scorecard:
   
   numberWords = {
@@ -38,6 +39,9 @@ class Scorecard:
     YAHTZEE         = "Yahtzee"
     YAHTZEE_BONUS   = "Yahtzee Bonus"
     LOWER_TOTAL     = "Lower Total"
+  
+  # ROW_NAME members by their row names, to look names up without raising
+  ROW_NAMES_BY_VALUE = {rowName.value: rowName for rowName in ROW_NAME}
 
   class POINTS(Enum):
     UPPER_BONUS    =  35
@@ -54,122 +58,115 @@ class Scorecard:
     """
     
     @staticmethod
-    def _hasStraight(uniqueSortedDice, length):
+    def _hasStraight(hand, length):
       """
-      # Is there a straight sequence of <length> dice within the list of
-      # unique, sorted dice
+      # Is there a straight sequence of <length> dice within the hand
+      #  -checked with the hand's face bitmask, rather than trying every
+      #   combination of the unique dice
       """
-    
+      
       # if we don't have enough dice for a straight
-      if len(uniqueSortedDice) < length:
+      if len(hand.uniqueFaces) < length:
         return False
-    
-      # check if we can find a sequence in the list of unique, sorted dice
-      for comb in itertools.combinations(uniqueSortedDice, length):
-        if comb == tuple(range(comb[0], comb[0] + length)):
-          return True
-    
-      # no dice
-      return False
+      
+      return hand.hasStraight(length)
   
     @staticmethod
-    def _hasFullHouse(diceCounts):
+    def _hasFullHouse(hand):
       """
       # Do we have a full house, i.e., only two unique dice values, with
       # at least 2 of everything
       """
-      return len(diceCounts.index) == 2 and (diceCounts > 1).all()
+      return len(hand.uniqueFaces) == 2 and all(hand.counts[face] > 1 for face in hand.uniqueFaces)
 
     @staticmethod
-    def _hasYahtzee(diceCounts):
+    def _hasYahtzee(hand):
       """ Do we have a Yahtzee, i.e., all dice values are the same """
-      return len(diceCounts) == 1
+      return hand.isYahtzee()
 
     @staticmethod
-    def _calcOfAKindScore(num, kind, diceValues):
+    def _calcOfAKindScore(num, kind, hand):
       """
       # Calculate score of X-of-a-kind, e.g., 3-of-a-kind
       #
-      # num:        (int) hpw many of-a-kind
-      # kind:       (int) dice value to look for <num> of
-      # diceValues: (list) actual dice values to process
+      # num:  (int) hpw many of-a-kind
+      # kind: (int) dice value to look for <num> of
+      # hand: (Hand) actual dice values to process
       #
       """
-      valCounts = pd.Series(diceValues).value_counts()
     
       # if we don't have enough "kind"s, then score is 0
       #  -e.g., not enough 4s
-      if valCounts.get(kind, 0) < num:
+      if hand.getCount(kind) < num:
         return 0
     
       # if we have enough "kind"s, then score is sum of all dice
-      return sum(diceValues)
+      return hand.total
   
     @staticmethod
-    def _calcSingleDiceScore(kind, diceValues):
+    def _calcSingleDiceScore(kind, hand):
       """
       # Calculate score of a single dice value, e.g., upper section score for 3s
       #
-      # kind:       (int) dice value to look at
-      # diceValues: (list) actual dice values to process
+      # kind: (int) dice value to look at
+      # hand: (Hand) actual dice values to process
       #
       """
-      valCounts = pd.Series(diceValues).value_counts()
     
       # add together all the "kind" of dice we see
-      return valCounts.get(kind, 0) * kind
+      return hand.getCount(kind) * kind
     
     def _calcUpperSection(self, diceValue):
       """ score based on how many die of <diceValue> we have """
-      return self.diceCounts.get(diceValue, 0) * diceValue
+      return self.hand.getCount(diceValue) * diceValue
     
     def _calc3ofAKind(self):
       # 3-of-a-kind score is max of all available three-of-a-kinds
       #  -note: in normal, 5-dice game, this is overkill
       threeOfAKindScore = 0
-      for threeOfAKind in self.diceCounts.index[self.diceCounts > 2]:
+      for threeOfAKind in self.hand.getFacesWithAtLeast(3):
         threeOfAKindScore = max(threeOfAKindScore,
-                                Scorecard.PointsCalculator._calcOfAKindScore(3, threeOfAKind, self.diceValues))
+                                Scorecard.PointsCalculator._calcOfAKindScore(3, threeOfAKind, self.hand))
       return threeOfAKindScore
   
     def _calc4ofAKind(self):
       # 4-of-a-kind score is max of all available four-of-a-kinds
       #  -note: in normal, 5-dice game, this is overkill
       fourOfAKindScore = 0
-      for fourOfAKind in self.diceCounts.index[self.diceCounts > 3]:
+      for fourOfAKind in self.hand.getFacesWithAtLeast(4):
         fourOfAKindScore = max(fourOfAKindScore,
-                               Scorecard.PointsCalculator._calcOfAKindScore(4, fourOfAKind, self.diceValues))
+                               Scorecard.PointsCalculator._calcOfAKindScore(4, fourOfAKind, self.hand))
       return fourOfAKindScore
   
     def _calcFullHouse(self):
       # full house score
-      hasFullHouse = Scorecard.PointsCalculator._hasFullHouse(self.diceCounts)
+      hasFullHouse = Scorecard.PointsCalculator._hasFullHouse(self.hand)
       fullHouseScore = Scorecard.POINTS.FULL_HOUSE.value if hasFullHouse else 0
       return fullHouseScore
   
     def _calcSmallStraight(self):
       # small straight score
-      hasSmallStraight = Scorecard.PointsCalculator._hasStraight(self.uniqueSortedDice, len(self.diceSorted) - 1)
+      hasSmallStraight = Scorecard.PointsCalculator._hasStraight(self.hand, len(self.diceValues) - 1)
       smallStraightScore = Scorecard.POINTS.SMALL_STRAIGHT.value if hasSmallStraight else 0
       return smallStraightScore
   
     def _calcLargeStraight(self):
       # large straight score
-      hasLargeStraight = Scorecard.PointsCalculator._hasStraight(self.uniqueSortedDice, len(self.diceSorted))
+      hasLargeStraight = Scorecard.PointsCalculator._hasStraight(self.hand, len(self.diceValues))
       largeStraightScore = Scorecard.POINTS.LARGE_STRAIGHT.value if hasLargeStraight else 0
       return largeStraightScore
     
     def _calcChance(self):
       """ Chance score """
-      return sum(self.diceValues)
+      return self.hand.total
       
     def _calcYahtzee(self):
       """ Yahtzee score """
-      return Scorecard.POINTS.YAHTZEE.value if Scorecard.PointsCalculator._hasYahtzee(self.diceCounts) else 0
+      return Scorecard.POINTS.YAHTZEE.value if Scorecard.PointsCalculator._hasYahtzee(self.hand) else 0
     
     def _calcYahtzeeBonus(self):
       # yahtzee bonus
-      canGetYahtzeeBonus = len(self.diceCounts) == 1 and\
+      canGetYahtzeeBonus = self.hand.isYahtzee() and\
                            self.scorecard.getRowScore("Yahtzee") is not None
       return Scorecard.POINTS.YAHTZEE_BONUS if canGetYahtzeeBonus else None
     
@@ -184,10 +181,11 @@ class Scorecard:
       self.scorecard = scorecard
 
       # dice info
-      self.diceValues       = None
-      self.diceSorted       = None
-      self.diceCounts       = None
-      self.uniqueSortedDice = None
+      self.diceValues = None
+      self.hand       = None
+
+      # table the raw row scores are looked up in, see _getScoreTable
+      self.scoreTable = None
       
       ## score function mappings
       #self.scoreFn = {
@@ -222,19 +220,50 @@ class Scorecard:
       }
       
       
+    def _getScoreTable(self, numberOfDice):
+      """
+      # ScoreTable to look up the raw scores of <numberOfDice> dice in, or
+      # None if the configuration has too many hands to keep a table of
+      """
+      numberOfDiceFaces = self.scorecard.numberOfDiceFaces
+      if self.scoreTable is None or self.scoreTable.numberOfDice != numberOfDice:
+        from scoretable import ScoreTable
+        if ScoreTable.countHands(numberOfDice, numberOfDiceFaces) > ScoreTable.MAX_LOOKUP_HANDS:
+          return None
+        self.scoreTable = ScoreTable.getTable(numberOfDice, numberOfDiceFaces)
+      return self.scoreTable
+    
     def calculate(self, rowNameList, diceValues):
       """
       # Find the score that would be earned in each row for <rowNameList>
       # when given the <diceValues>
+      #  -raw row scores are looked up in the ScoreTable, when there is one,
+      #   and the joker and bonus rules are applied on top
       """
-      logger.debug("points calculate: {}, {}".format(rowNameList, diceValues))
+      logger.debug("points calculate: %s, %s", rowNameList, diceValues)
+      
       
+      # look up the hand's raw scores, if every die has been rolled
+      self.diceValues = diceValues
+      scoreTable = None if None in diceValues else self._getScoreTable(len(diceValues))
+      if scoreTable is None:
+        handScores = None
+      else:
+        handScores = scoreTable.scores[scoreTable.rankHand(diceValues)].tolist()
+        
+        # without a yahtzee, the joker rule can't apply, so the raw scores are
+        # the scores of every row in the table
+        if handScores[scoreTable.yahtzeeIndex] == 0:
+          rowIndices = scoreTable.rowIndices
+          if all(rowName in rowIndices for rowName in rowNameList):
+            self.hand = None
+            return {rowName: handScores[rowIndices[rowName]] for rowName in rowNameList}
       
-      # sort and process dice
-      self.diceValues       = diceValues
-      self.diceSorted       = sorted(diceValues)
-      self.diceCounts       = pd.Series(self.diceSorted).value_counts()
-      self.uniqueSortedDice = sorted(self.diceCounts.index.to_list())
+      # count the dice, if any rows aren't in the table
+      if handScores is None or not all(rowName in scoreTable.rowIndices for rowName in rowNameList):
+        self.hand = Hand(diceValues)
+      else:
+        self.hand = None
       
       
       # name of known lower sections, i.e., those in our score mapping
@@ -247,16 +276,23 @@ class Scorecard:
       upperSectionRows = []
       lowerSectionRows = []
       for rowName in rowNameList:
-        try:
-          lowerSectionRows.append(Scorecard.ROW_NAME(rowName))
-        except ValueError:
+        lowerRow = Scorecard.ROW_NAMES_BY_VALUE.get(rowName, None)
+        if lowerRow is None:
           upperSectionRows.append(rowName)
+        else:
+          lowerSectionRows.append(lowerRow)
           
       results = {}
 
       # upper section calculations
       for sectionName in upperSectionRows:
         
+        # raw score from the table
+        iColumn = None if handScores is None else scoreTable.rowIndices.get(sectionName, None)
+        if iColumn is not None:
+          results[sectionName] = handScores[iColumn]
+          continue
+        
         # convert row word to number
         try:
           sectionNum = Scorecard.wordToNum(sectionName)
@@ -272,9 +308,13 @@ class Scorecard:
       # does the joker rule apply, i.e.:
       #  -the yahtzee score has been taken, and is not 0
       #  -this the second+ yahtzee
-      isJoker = Scorecard.PointsCalculator._hasYahtzee(self.diceCounts) and\
+      if handScores is None:
+        hasYahtzee = Scorecard.PointsCalculator._hasYahtzee(self.hand)
+      else:
+        hasYahtzee = handScores[scoreTable.yahtzeeIndex] == Scorecard.POINTS.YAHTZEE.value
+      isJoker = hasYahtzee and\
                 self.scorecard.getRowScore(Scorecard.ROW_NAME.YAHTZEE.value) == Scorecard.POINTS.YAHTZEE.value
-      logger.debug("points calculate: isJoker: {}".format(isJoker))
+      logger.debug("points calculate: isJoker: %s", isJoker)
 
       # if the joker rule applies, scoring in the upper section takes priority
       if isJoker:
@@ -299,7 +339,11 @@ class Scorecard:
       #  -don't need to check for KeyErrors as <lowerSectionRows> is taken
       #   directly from <scoreFn>'s keys
       for sectionName in lowerSectionRows:
-        results[sectionName.value] = self.scoreFn[sectionName]()
+        iColumn = None if handScores is None else scoreTable.rowIndices.get(sectionName.value, None)
+        if iColumn is None:
+          results[sectionName.value] = self.scoreFn[sectionName]()
+        else:
+          results[sectionName.value] = handScores[iColumn]
 
       
       # if the joker rule applies then we can score the max values in
@@ -308,10 +352,202 @@ class Scorecard:
         for rowName, maxRowScore in self.jokerEligibleSections.items():
           if results.get(rowName.value, None) is not None:
             results[rowName.value] = maxRowScore
-      
+
       return results
-    
-    
+
+
+    ###########################################################################
+    # batch scoring
+    ###########################################################################
+
+    # score given to a row that calculate() would leave out of its results,
+    # e.g., lower rows when the joker rule forces an upper section score
+    NO_SCORE = -1
+
+    @staticmethod
+    def countDiceBatch(diceArray, numberOfDiceFaces):
+      """
+      # Count how many of each dice value appear in every hand
+      #  -returns an (N x numberOfDiceFaces+1) array, where column <face> is the
+      #   number of dice showing <face>; column 0 is unused
+      #
+      # diceArray:         (array) N x numberOfDice integer dice values
+      # numberOfDiceFaces: (int) number of sides on each die
+      #
+      """
+      diceArray = np.asarray(diceArray, dtype=np.int64)
+      numHands  = diceArray.shape[0]
+
+      # offset each hand's dice so a single bincount gives every histogram
+      offsets = np.arange(numHands, dtype=np.int64)[:, np.newaxis] * (numberOfDiceFaces + 1)
+      counts  = np.bincount((diceArray + offsets).ravel(), minlength=numHands * (numberOfDiceFaces + 1))
+      return counts.reshape(numHands, numberOfDiceFaces + 1)
+
+    @staticmethod
+    def _hasStraightBatch(diceCounts, length):
+      """
+      # For each hand, is there a straight sequence of <length> dice values
+      #
+      # diceCounts: (array) N x numberOfDiceFaces+1 dice counts
+      # length:     (int) length of straight to look for
+      #
+      """
+      present = diceCounts[:, 1:] > 0
+
+      # can't have a straight longer than the number of faces
+      if length > present.shape[1]:
+        return np.zeros(diceCounts.shape[0], dtype=bool)
+
+      # number of present values in every window of <length> consecutive values
+      #  -a window holding <length> present values is a straight
+      runningTotal = np.zeros((present.shape[0], present.shape[1] + 1), dtype=np.int64)
+      np.cumsum(present, axis=1, out=runningTotal[:, 1:])
+      return ((runningTotal[:, length:] - runningTotal[:, :-length]) == length).any(axis=1)
+
+    @staticmethod
+    def calculateRawBatch(rowNameList, diceCounts, numberOfDice):
+      """
+      # Score every hand in every row of <rowNameList>, without taking any
+      # scorecard-dependent rules (joker, yahtzee bonus) into account
+      #  -returns an (N x len(rowNameList)) integer array, columns in the
+      #   same order as <rowNameList>
+      #  -bonus and total rows are scored as NO_SCORE
+      #
+      # rowNameList:  (list) names of rows to score
+      # diceCounts:   (array) N x numberOfDiceFaces+1 dice counts, as given by
+      #               countDiceBatch
+      # numberOfDice: (int) number of dice in each hand
+      #
+      """
+      diceCounts = np.asarray(diceCounts)
+      numHands   = diceCounts.shape[0]
+      faceValues = np.arange(diceCounts.shape[1])
+
+      # hand properties shared by the lower section rows
+      diceSum     = diceCounts @ faceValues
+      maxCount    = diceCounts.max(axis=1)
+      numUnique   = (diceCounts > 0).sum(axis=1)
+      numSingles  = (diceCounts == 1).sum(axis=1)
+
+      hasFullHouse = (numUnique == 2) & (numSingles == 0)
+      hasYahtzee   = numUnique == 1
+
+      scores = np.full((numHands, len(rowNameList)), Scorecard.PointsCalculator.NO_SCORE, dtype=np.int64)
+
+      for iRow, rowName in enumerate(rowNameList):
+
+        try:
+          lowerRow = Scorecard.ROW_NAME(rowName)
+
+        # upper section row
+        except ValueError:
+
+          # convert row word to number
+          try:
+            sectionNum = Scorecard.wordToNum(rowName)
+          except KeyError:
+            raise KeyError("Unknown rowName was given: {}".format(rowName))
+
+          if sectionNum < diceCounts.shape[1]:
+            scores[:, iRow] = diceCounts[:, sectionNum] * sectionNum
+          else:
+            scores[:, iRow] = 0
+          continue
+
+        # lower section rows
+        if lowerRow == Scorecard.ROW_NAME.THREE_OF_A_KIND:
+          scores[:, iRow] = np.where(maxCount >= 3, diceSum, 0)
+        elif lowerRow == Scorecard.ROW_NAME.FOUR_OF_A_KIND:
+          scores[:, iRow] = np.where(maxCount >= 4, diceSum, 0)
+        elif lowerRow == Scorecard.ROW_NAME.FULL_HOUSE:
+          scores[:, iRow] = np.where(hasFullHouse, Scorecard.POINTS.FULL_HOUSE.value, 0)
+        elif lowerRow == Scorecard.ROW_NAME.SMALL_STRAIGHT:
+          hasStraight = Scorecard.PointsCalculator._hasStraightBatch(diceCounts, numberOfDice - 1)
+          scores[:, iRow] = np.where(hasStraight, Scorecard.POINTS.SMALL_STRAIGHT.value, 0)
+        elif lowerRow == Scorecard.ROW_NAME.LARGE_STRAIGHT:
+          hasStraight = Scorecard.PointsCalculator._hasStraightBatch(diceCounts, numberOfDice)
+          scores[:, iRow] = np.where(hasStraight, Scorecard.POINTS.LARGE_STRAIGHT.value, 0)
+        elif lowerRow == Scorecard.ROW_NAME.CHANCE:
+          scores[:, iRow] = diceSum
+        elif lowerRow == Scorecard.ROW_NAME.YAHTZEE:
+          scores[:, iRow] = np.where(hasYahtzee, Scorecard.POINTS.YAHTZEE.value, 0)
+
+      return scores
+
+    def calculateBatch(self, rowNameList, diceArray):
+      """
+      # Vectorised version of calculate(): find the score that would be earned
+      # in each row of <rowNameList> for every hand in <diceArray>
+      #  -returns an (N x len(rowNameList)) integer array, columns in the
+      #   same order as <rowNameList>
+      #  -rows that calculate() would leave out of its results are NO_SCORE
+      #  -calculate() always adds the "Yahtzee Bonus" row when the joker rule
+      #   applies; here it is only filled in if it is part of <rowNameList>
+      #  -like calculate(), raw row scores come from the ScoreTable when
+      #   there is one
+      #
+      # rowNameList: (list) names of rows to score
+      # diceArray:   (array) N x numberOfDice integer dice values
+      #
+      """
+      diceArray  = np.asarray(diceArray, dtype=np.int64)
+      diceCounts = Scorecard.PointsCalculator.countDiceBatch(diceArray, self.scorecard.numberOfDiceFaces)
+
+      scoreTable = self._getScoreTable(diceArray.shape[1])
+      if scoreTable is None:
+        scores = Scorecard.PointsCalculator.calculateRawBatch(rowNameList, diceCounts, diceArray.shape[1])
+
+      # look up the rows the table has, and score the rest (bonuses, totals)
+      # from the dice counts
+      else:
+        tableRows = [iRow for iRow, rowName in enumerate(rowNameList) if rowName in scoreTable.rowIndices]
+        otherRows = [iRow for iRow, rowName in enumerate(rowNameList) if rowName not in scoreTable.rowIndices]
+
+        scores = np.empty((diceArray.shape[0], len(rowNameList)), dtype=np.int64)
+        handScores = scoreTable.scores[scoreTable.rankHands(diceArray)]
+        scores[:, tableRows] = handScores[:, [scoreTable.rowIndices[rowNameList[iRow]] for iRow in tableRows]]
+        if otherRows:
+          scores[:, otherRows] = Scorecard.PointsCalculator.calculateRawBatch(
+            [rowNameList[iRow] for iRow in otherRows], diceCounts, diceArray.shape[1])
+
+      # the joker rule only applies if the first yahtzee has been scored
+      if self.scorecard.getRowScore(Scorecard.ROW_NAME.YAHTZEE.value) != Scorecard.POINTS.YAHTZEE.value:
+        return scores
+
+      isJoker = (diceCounts > 0).sum(axis=1) == 1
+
+      # split the columns into upper and lower section rows
+      upperColumns = []
+      lowerColumns = []
+      for iRow, rowName in enumerate(rowNameList):
+        try:
+          lowerColumns.append((iRow, Scorecard.ROW_NAME(rowName)))
+        except ValueError:
+          upperColumns.append(iRow)
+
+      # if we can score in the upper section, we have to, so no lower scores
+      scoredInUpperSection = scores[:, upperColumns].sum(axis=1) > 0
+
+      # we add the yahtzee bonus regardless
+      currBonus = self.scorecard.getRowScore(Scorecard.ROW_NAME.YAHTZEE_BONUS.value)
+      if currBonus is None:
+        currBonus = 0
+
+      for iRow, rowName in lowerColumns:
+
+        if rowName == Scorecard.ROW_NAME.YAHTZEE_BONUS:
+          scores[isJoker, iRow] = currBonus + Scorecard.POINTS.YAHTZEE_BONUS.value
+          continue
+
+        # joker-eligible sections score their max value
+        if rowName in self.jokerEligibleSections:
+          scores[isJoker, iRow] = self.jokerEligibleSections[rowName]
+
+        scores[isJoker & scoredInUpperSection, iRow] = Scorecard.PointsCalculator.NO_SCORE
+
+      return scores
+
+
   
   @staticmethod
   def numToWord(num):
@@ -365,6 +601,10 @@ class Scorecard:
     
     # calculate the upper section's bonus threshold
     self.upperBonusThreshold = sum(list(range(1, self.numberOfDiceFaces + 1))) * 3
+    
+    # calculator, see getPointsCalculator, and results reused by getPossibleScorecard
+    self.pointsCalc        = None
+    self.possibleScorecard = None
   
   
   def canScoreRow(self, rowName, diceValues):
@@ -383,6 +623,18 @@ class Scorecard:
     # not a joker, then check if the row is free
     return rowName in freeRows
   
+  def getScorableRows(self, diceValues):
+    """ Rows the <diceValues> can be scored in; as canScoreRow, for every row at once """
+    
+    freeRows = self.getFreeRows()
+    
+    # if this is a joker then must score upper section first
+    upperSectionDiceRow = Scorecard.numToWord(diceValues[0])
+    if self.isJoker(diceValues) and upperSectionDiceRow in freeRows:
+      return [upperSectionDiceRow]
+    
+    return freeRows
+  
   @staticmethod
   def isBonusRow(rowName):
     """ Is <rowName> a bonus row """
@@ -395,9 +647,8 @@ class Scorecard:
     # AND
     #  -this isn't our first yahtzee
     """
-    diceCounts = pd.Series(diceValues).value_counts()
-    return len(diceCounts) == 1 and \
-           self.getRowScore(Scorecard.ROW_NAME.YAHTZEE.value) == Scorecard.POINTS.YAHTZEE.value
+    return self.getRowScore(Scorecard.ROW_NAME.YAHTZEE.value) == Scorecard.POINTS.YAHTZEE.value and \
+           Hand(diceValues).isYahtzee()
   
   def getAllScores(self):
     """ Return the full score card in order """
@@ -435,10 +686,17 @@ class Scorecard:
       return self.scorecardLower[rowName]
   
   
+  def getPointsCalculator(self):
+    """ PointsCalculator for this scorecard, made the first time it's needed """
+    if self.pointsCalc is None:
+      self.pointsCalc = Scorecard.PointsCalculator(self)
+    return self.pointsCalc
+  
   def getPossibleScorecard(self, diceValues, rowNameList=None):
     """
     # What are the possible scores given the dice values
     #  -total and bonuses are always set to None
+    #  -the returned PossibleScorecard is reused by later calls
     #
     # diceValues:  (list) of dice values to use
     # rowNameList: (list) name of section(s) to calculate, default is all
@@ -454,16 +712,15 @@ class Scorecard:
     else:
       rowNameList = list(filter(lambda x: x in freeRows, rowNameList))
     
-    # create a points calculator and find the possible scores
-    pointsCalc = Scorecard.PointsCalculator(self)
-    scores = pointsCalc.calculate(rowNameList, diceValues)
-  
-    # create a new, blank scorecard and populate it with our results
-    blankCard = Scorecard(self.numberOfDiceFaces)
-    for rowName, rowScore in scores.items():
-      blankCard.updateScore(rowName, rowScore, updateTotals=False)
+    # reuse this scorecard's points calculator and possible scores
+    if self.possibleScorecard is None:
+      self.possibleScorecard = PossibleScorecard(self.getRowNames(), len(self.scorecardUpper))
+    
+    # find the possible scores and populate the possible scorecard with them
+    scores = self.getPointsCalculator().calculate(rowNameList, diceValues)
+    self.possibleScorecard._setScores(scores)
   
-    return blankCard
+    return self.possibleScorecard
   
   
   def getTotalScore(self):
@@ -593,18 +850,428 @@ class Scorecard:
     # return any rows with no score, ignoring the "meta rows"
     return [rowName for rowName, rowScore in self.iterateOverScorecard()
              if rowScore is None and rowName not in ignoreRows]
+
+
+
+class PossibleScorecard:
+  """
+  # Read-only view of the scores that could be earned with the current dice
+  #  -each scorecard reuses a single view, so its contents are only valid
+  #   until the scorecard's next getPossibleScorecard call
+  #  -rows that can't be scored, totals and bonuses are None
+  #
+  """
+  
+  __slots__ = ("rowNames", "numberOfUpperRows", "rowIndices", "scores")
+  
+  def __init__(self, rowNames, numberOfUpperRows, rowIndices=None):
+    """
+    #
+    # rowNames:          (list) names of all the scorecard rows, in order
+    # numberOfUpperRows: (int) number of rows in the upper section
+    # rowIndices:        (dict) position of each row name in <rowNames>
+    #
+    """
+    self.rowNames          = rowNames
+    self.numberOfUpperRows = numberOfUpperRows
+    self.rowIndices        = rowIndices if rowIndices is not None else\
+                             {rowName: iRow for iRow, rowName in enumerate(rowNames)}
+    self.scores            = [None] * len(rowNames)
+  
+  def _setScores(self, scores):
+    """ Replace the possible scores with the {rowName: score} in <scores> """
+    for iRow in range(len(self.scores)):
+      self.scores[iRow] = None
+    for rowName, rowScore in scores.items():
+      try:
+        self.scores[self.rowIndices[rowName]] = rowScore
+      except KeyError:
+        raise KeyError("unknown rowName: {}".format(rowName))
+  
+  def getRowNames(self, section="all"):
+    """ Return the names of all the scorecard rows, including the totals """
+    
+    sectionNameLower = section.lower()
     
+    if sectionNameLower == "all":
+      return list(self.rowNames)
+    elif sectionNameLower == "upper":
+      return list(self.rowNames[:self.numberOfUpperRows])
+    elif sectionNameLower == "lower":
+      return list(self.rowNames[self.numberOfUpperRows:])
+    else:
+      raise ValueError("unknown section: {}".format(section))
   
+  def getRowScore(self, rowName):
+    """ Possible score for the <rowName> row """
+    try:
+      return self.scores[self.rowIndices[rowName]]
+    except KeyError:
+      raise KeyError("unknown rowName: {}".format(rowName))
+  
+  def iterateOverScorecard(self):
+    """ Iterate over all the possible scores """
+    return zip(self.rowNames, self.scores)
+
 
+class ArrayScorecard:
+  """
+  # Scorecard backed by a fixed row layout and an array of scores
+  #  -rows have integer ids, in the same order as Scorecard's rows
+  #  -section totals are kept as running totals, updated as each score is
+  #   set, instead of re-adding every row
+  #  -rows that can still be scored are tracked in a bitmask
+  #  -has the same public methods as Scorecard, so can be used in its place
+  #
+  """
+  
+  # value stored for rows without a score
+  NO_SCORE = -1
+  
+  class Layout:
+    """ Row ids and names for a given number of dice faces """
+    
+    def __init__(self, numberOfDiceFaces):
+      
+      # row names, in scorecard order
+      self.upperRowNames = [Scorecard.numToWord(num) for num in range(1, numberOfDiceFaces+1)] +\
+                           [Scorecard.ROW_NAME.UPPER_TOTAL.value, Scorecard.ROW_NAME.UPPER_BONUS.value]
+      self.lowerRowNames = [Scorecard.ROW_NAME.THREE_OF_A_KIND.value, Scorecard.ROW_NAME.FOUR_OF_A_KIND.value,
+                            Scorecard.ROW_NAME.FULL_HOUSE.value,      Scorecard.ROW_NAME.SMALL_STRAIGHT.value,
+                            Scorecard.ROW_NAME.LARGE_STRAIGHT.value,  Scorecard.ROW_NAME.CHANCE.value,
+                            Scorecard.ROW_NAME.YAHTZEE.value,         Scorecard.ROW_NAME.YAHTZEE_BONUS.value,
+                            Scorecard.ROW_NAME.LOWER_TOTAL.value]
+      self.rowNames = self.upperRowNames + self.lowerRowNames
+      self.rowIds   = {rowName: rowId for rowId, rowName in enumerate(self.rowNames)}
+      
+      # ids of the rows that depend on the others
+      self.upperTotalId   = self.rowIds[Scorecard.ROW_NAME.UPPER_TOTAL.value]
+      self.upperBonusId   = self.rowIds[Scorecard.ROW_NAME.UPPER_BONUS.value]
+      self.yahtzeeId      = self.rowIds[Scorecard.ROW_NAME.YAHTZEE.value]
+      self.yahtzeeBonusId = self.rowIds[Scorecard.ROW_NAME.YAHTZEE_BONUS.value]
+      self.lowerTotalId   = self.rowIds[Scorecard.ROW_NAME.LOWER_TOTAL.value]
+      
+      # rows that contribute to each section's total
+      self.lastUpperId = self.upperTotalId - 1
+      self.firstLowerId = len(self.upperRowNames)
+      
+      # rows that can be scored in, i.e., no totals or bonuses
+      self.scorableIds = [rowId for rowId in range(len(self.rowNames))
+                           if rowId not in (self.upperTotalId, self.upperBonusId,
+                                            self.yahtzeeBonusId, self.lowerTotalId)]
+      self.allScorableMask = 0
+      for rowId in self.scorableIds:
+        self.allScorableMask |= 1 << rowId
+  
+  # layouts that have already been created, by number of dice faces
+  _layouts = {}
+  
+  @staticmethod
+  def getLayout(numberOfDiceFaces):
+    """ Get the (shared) row layout for this number of dice faces """
+    layout = ArrayScorecard._layouts.get(numberOfDiceFaces, None)
+    if layout is None:
+      layout = ArrayScorecard.Layout(numberOfDiceFaces)
+      ArrayScorecard._layouts[numberOfDiceFaces] = layout
+    return layout
+  
+  # same helpers as Scorecard
+  numToWord  = staticmethod(Scorecard.numToWord)
+  wordToNum  = staticmethod(Scorecard.wordToNum)
+  isBonusRow = staticmethod(Scorecard.isBonusRow)
+  
+  __slots__ = ("numberOfDiceFaces", "upperBonusThreshold", "layout", "scores",
+               "freeRowMask", "upperRunningTotal", "lowerRunningTotal",
+               "pointsCalc", "possibleScorecard")
+  
+  def __init__(self, numberOfDiceFaces=6):
+    
+    # CHECK: we support the number of dice faces
+    if numberOfDiceFaces < Scorecard.MIN_DICE_FACES or numberOfDiceFaces > Scorecard.MAX_DICE_FACES:
+      raise ValueError("dice faces must be between {} and {}"
+                        .format(Scorecard.MIN_DICE_FACES, Scorecard.MAX_DICE_FACES))
+    
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.layout            = ArrayScorecard.getLayout(numberOfDiceFaces)
+    
+    # score of each row, by row id
+    self.scores = np.full(len(self.layout.rowNames), ArrayScorecard.NO_SCORE, dtype=np.int32)
+    
+    # bit <rowId> is set for every row that can still be scored
+    self.freeRowMask = self.layout.allScorableMask
+    
+    # sum of the scored rows in each section
+    self.upperRunningTotal = 0
+    self.lowerRunningTotal = 0
+    
+    # calculate the upper section's bonus threshold
+    self.upperBonusThreshold = sum(list(range(1, self.numberOfDiceFaces + 1))) * 3
+    
+    # calculator, see getPointsCalculator, and results reused by getPossibleScorecard
+    self.pointsCalc        = None
+    self.possibleScorecard = None
+  
+  
+  def _getRowId(self, rowName):
+    """ Id of the row called <rowName> """
+    try:
+      return self.layout.rowIds[rowName]
+    except KeyError:
+      raise KeyError("unknown rowName: {}".format(rowName))
+  
+  def _getScore(self, rowId):
+    """ Score stored for the row <rowId>, or None """
+    score = self.scores[rowId]
+    return None if score == ArrayScorecard.NO_SCORE else int(score)
+  
+  
+  def canScoreRow(self, rowName, diceValues):
+    """ Can we score, or update the score, in this row """
+    
+    rowId = self._getRowId(rowName)
+    
+    # if this is a joker then must score upper section first
+    upperSectionDiceRowId = diceValues[0] - 1
+    if self.isJoker(diceValues) and self.freeRowMask & (1 << upperSectionDiceRowId):
+      return rowId == upperSectionDiceRowId
+    
+    # not a joker, then check if the row is free
+    return bool(self.freeRowMask & (1 << rowId))
+  
+  def getScorableRows(self, diceValues):
+    """ Rows the <diceValues> can be scored in; as canScoreRow, for every row at once """
+    
+    # if this is a joker then must score upper section first
+    upperSectionDiceRowId = diceValues[0] - 1
+    if self.isJoker(diceValues) and self.freeRowMask & (1 << upperSectionDiceRowId):
+      return [self.layout.rowNames[upperSectionDiceRowId]]
+    
+    return self.getFreeRows()
+  
+  def isJoker(self, diceValues):
+    """
+    # Does the joker rule apply
+    #  -we have a yahtzee now
+    # AND
+    #  -this isn't our first yahtzee
+    """
+    return self.scores[self.layout.yahtzeeId] == Scorecard.POINTS.YAHTZEE.value and \
+           Hand(diceValues).isYahtzee()
+  
+  def getAllScores(self):
+    """ Return the full score card in order """
+    return OrderedDict(self.iterateOverScorecard())
+  
+  def getFreeRowMask(self):
+    """ Bitmask of the rows that can be scored, bit <rowId> set for each free row """
+    return self.freeRowMask
+  
+  def getRowNames(self, section="all"):
+    """ Return the names of all the scorecard rows, including the totals """
+    
+    sectionNameLower = section.lower()
+    
+    if sectionNameLower == "all":
+      return list(self.layout.rowNames)
+    elif sectionNameLower == "upper":
+      return list(self.layout.upperRowNames)
+    elif sectionNameLower == "lower":
+      return list(self.layout.lowerRowNames)
+    else:
+      raise ValueError("unknown section: {}".format(section))
+  
+  def getRowScore(self, rowName):
+    """
+    # Get the score for the <rowName> row
+    #
+    # rowName: (str) name of row
+    """
+    return self._getScore(self._getRowId(rowName))
+  
+  
+  def getPointsCalculator(self):
+    """ PointsCalculator for this scorecard, made the first time it's needed """
+    if self.pointsCalc is None:
+      self.pointsCalc = Scorecard.PointsCalculator(self)
+    return self.pointsCalc
+  
+  def getPossibleScorecard(self, diceValues, rowNameList=None):
+    """
+    # What are the possible scores given the dice values
+    #  -total and bonuses are always set to None
+    #  -the returned PossibleScorecard is reused by later calls
+    #
+    # diceValues:  (list) of dice values to use
+    # rowNameList: (list) name of section(s) to calculate, default is all
+    #
+    """
+    
+    # filter the rowNameList by free rows, or use all free rows if no rows
+    # are specified
+    freeRows = self.getFreeRows()
+    if rowNameList is None:
+      rowNameList = freeRows
+    else:
+      rowNameList = list(filter(lambda x: x in freeRows, rowNameList))
+    
+    # reuse this scorecard's points calculator and possible scores
+    if self.possibleScorecard is None:
+      self.possibleScorecard = PossibleScorecard(self.layout.rowNames, len(self.layout.upperRowNames),
+                                                 self.layout.rowIds)
+    
+    # find the possible scores and populate the possible scorecard with them
+    scores = self.getPointsCalculator().calculate(rowNameList, diceValues)
+    self.possibleScorecard._setScores(scores)
+    
+    return self.possibleScorecard
+  
+  
+  def getTotalScore(self):
+    """ Calculate and return the total score """
+    
+    total = 0
+    for rowId in (self.layout.upperTotalId, self.layout.upperBonusId, self.layout.lowerTotalId):
+      if self.scores[rowId] != ArrayScorecard.NO_SCORE:
+        total += int(self.scores[rowId])
+    return total
+  
+  
+  def updateScore(self, rowName, score, updateTotals=True):
+    """
+    # Update the score for the <rowName> row
+    #  -for normal rows the score is set to <score>, whilst bonus rows will
+    #  be += the score
+    #
+    # rowName:      (str) name of row to set
+    # score:        (int) score to set
+    # updateTotals: (bool) should we also update the section totals/bonuses
+    #
+    """
+    
+    rowId = self._getRowId(rowName)
+    
+    # check if it's a bonus to add or score to set
+    oldScore = self._getScore(rowId)
+    if ArrayScorecard.isBonusRow(rowName) and oldScore is not None:
+      score += oldScore
+    
+    # store the score and update the free rows
+    self.scores[rowId] = ArrayScorecard.NO_SCORE if score is None else score
+    if self.layout.allScorableMask & (1 << rowId):
+      if score is None:
+        self.freeRowMask |= 1 << rowId
+      else:
+        self.freeRowMask &= ~(1 << rowId)
+    
+    # keep the running totals up to date
+    scoreChange = (0 if score is None else score) - (0 if oldScore is None else oldScore)
     
+    if rowId <= self.layout.lastUpperId:
+      self.upperRunningTotal += scoreChange
+      if updateTotals:
+        self._updateUpperScore()
+    
+    elif rowId < self.layout.firstLowerId:
+      if updateTotals:
+        self._updateUpperScore()
+    
+    else:
+      if rowId != self.layout.lowerTotalId:
+        self.lowerRunningTotal += scoreChange
+      if updateTotals:
+        self._updateLowerScore()
+  
+  
+  def _updateUpperScore(self):
+    """ Store the total score, and bonus, for the upper section """
+    
+    # see if the bonus should be added
+    if self.upperRunningTotal >= self.upperBonusThreshold:
+      self.scores[self.layout.upperBonusId] = Scorecard.POINTS.UPPER_BONUS.value
+    else:
+      self.scores[self.layout.upperBonusId] = ArrayScorecard.NO_SCORE
+    
+    self.scores[self.layout.upperTotalId] = self.upperRunningTotal
+  
+  def _updateLowerScore(self):
+    """ Store the total score for the lower section """
+    self.scores[self.layout.lowerTotalId] = self.lowerRunningTotal
+  
+  
+  def iterateOverScorecard(self):
+    """ Iterate over all the scorecard entries """
+    for rowId, rowName in enumerate(self.layout.rowNames):
+      yield rowName, self._getScore(rowId)
+  
+  def getFreeRows(self):
+    """ Returns list of row names that can be scored """
+    return [self.layout.rowNames[rowId] for rowId in self.layout.scorableIds
+             if self.freeRowMask & (1 << rowId)]
+
+
+
+class ScorecardView:
+  """
+  # Read-only view of a Scorecard (or ArrayScorecard)
+  #  -has the scorecard's getters, but nothing that changes it, so a
+  #   strategy can read a player's scorecard without being able to score
+  #   in it
+  #  -follows the scorecard, so it's always up to date
+  #
+  """
+
+  __slots__ = ("_scorecard",)
+
+  def __init__(self, scorecard):
+    object.__setattr__(self, "_scorecard", scorecard)
+
+  def __setattr__(self, name, value):
+    raise AttributeError("scorecard view is read-only")
+
+  def canScoreRow(self, rowName, diceValues):  return self._scorecard.canScoreRow(rowName, diceValues)
+  def getFreeRows(self):                       return self._scorecard.getFreeRows()
+  def getRowNames(self, section="all"):        return self._scorecard.getRowNames(section)
+  def getRowScore(self, rowName):              return self._scorecard.getRowScore(rowName)
+  def getScorableRows(self, diceValues):       return self._scorecard.getScorableRows(diceValues)
+  def getTotalScore(self):                     return self._scorecard.getTotalScore()
+  def isJoker(self, diceValues):               return self._scorecard.isJoker(diceValues)
+  def iterateOverScorecard(self):              return self._scorecard.iterateOverScorecard()
+
+  def getPossibleScorecard(self, diceValues, rowNameList=None):
+    """ The scorecard's possible scores for <diceValues>, see Scorecard.getPossibleScorecard """
+    return self._scorecard.getPossibleScorecard(diceValues, rowNameList)
+
 
 class Player:
-  def __init__(self, name, scorecard):
+  def __init__(self, name, scorecard, strategy=None):
+    """
+    #
+    # strategy: (Policy) what makes the player's decisions, or None if the
+    #           player is a person
+    #
+    """
     self.name      = name
     self.scorecard = scorecard
+    self.strategy  = strategy
+
+    # read-only view of the scorecard, for strategies
+    self.scorecardView = ScorecardView(scorecard)
 
-  def getName(self):      return self.name
-  def getScorecard(self): return self.scorecard
+  def getName(self):          return self.name
+  def getScorecard(self):     return self.scorecard
+  def getScorecardView(self): return self.scorecardView
+  def getStrategy(self):      return self.strategy
+  
+  def setStrategy(self, strategy):
+    """ Let <strategy> make the player's decisions, or None to make them yourself """
+    self.strategy = strategy
+
+
+# what a strategy can see when making a decision on a turn
+#  -the dice are tuples and the scorecards are ScorecardViews, so the view
+#   can't change the game
+TurnView = namedtuple("TurnView", ["playerName", "diceValues", "heldDice", "remainingRolls", "numberOfRolls",
+                                   "numberOfDiceFaces", "scorecard", "opponentScorecards"])
 
 
 class Game:
@@ -627,10 +1294,31 @@ class Game:
     RUNNING     = 1
     FINISHED    = 2
   
+  class ACTION(Enum):
+    """ Actions that change the state of a game, as kept in its action list """
+    ROLL    = 0
+    HOLD    = 1
+    SCORE   = 2
+    ADVANCE = 3
   
 
   
-  def __init__(self, playerNameList, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3):
+  def __init__(self, playerNameList, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3,
+               scorecardClass=Scorecard, seed=None, diceSource=None):
+    """
+    #
+    # playerNameList:    (list) names of the initial players
+    # numberOfDice:      (int) number of dice rolled each turn
+    # numberOfDiceFaces: (int) number of sides on each die
+    # numberOfRolls:     (int) number of rolls each turn
+    # scorecardClass:    (class) scorecard implementation for the players,
+    #                    e.g., Scorecard or ArrayScorecard
+    # seed:              (int or SeedSequence) seed of the game's dice, default
+    #                    is a fresh random seed
+    # diceSource:        (DiceSource) where the dice values come from, default
+    #                    is a BufferedDice drawing from the game's generator
+    #
+    """
     
     # CHECK: number of dice
     if not (Game.MIN_NUM_DICE <= numberOfDice <= Game.MAX_NUM_DICE):
@@ -647,17 +1335,31 @@ class Game:
       raise ValueError(
         "number of dice rolls must be between {} and {}".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
 
-    # seed random number generator
-    random.seed()
+    # the game's own random number generator
+    #  -the seed is kept, so the game can be replayed from its actions
+    #  -games given SeedSequences spawned from the same parent have
+    #   independent dice, e.g., for games played in parallel
+    self.seedSequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    self.rng = np.random.default_rng(self.seedSequence)
+    self.diceSource = BufferedDice(numberOfDiceFaces, self.rng) if diceSource is None else diceSource
+    
+    # actions taken in the game, in order, and functions told about each one
+    self.actions    = []
+    self.eventHooks = []
     
     # game config info
     self.numberOfDice      = numberOfDice
     self.numberOfDiceFaces = numberOfDiceFaces
     self.numberOfRolls     = numberOfRolls
+    self.scorecardClass    = scorecardClass
     
     self.players    = []
     self.gameStatus = Game.STATUS.NOT_STARTED
     
+    # read-only views of each player's opponents' scorecards, by player
+    # index, made the first time they're needed, for getTurnView
+    self.opponentScorecards = {}
+    
     # the number of turns in the game
     self.turnsPerPlayer = Game.calculateTotalGameTurns(self.numberOfDiceFaces)
     self.totalGameTurns = None
@@ -682,6 +1384,7 @@ class Game:
     """ How many turns will this game have for each player """
     return 7 + numberOfDiceFaces
 
+  def getActions(self):           return self.actions
   def getAllPlayers(self):        return self.players
   def getCurrentPlayer(self):     return self.players[self.currentPlayerIndex]
   def getDiceValues(self):        return self.diceValues
@@ -691,12 +1394,24 @@ class Game:
   def getNumberOfPlayers(self):   return len(self.players)
   def getNumberOfRolls(self):     return self.numberOfRolls
   def getRemainingRolls(self):    return self.remainingRolls
+  def getSeedSequence(self):      return self.seedSequence
 
   def getHeldDice(self):
     """ Return the indices of the held dice """
     return [iDice for iDice, isHeld in enumerate(self.heldDice) if isHeld]
 
 
+  def getTurnView(self):
+    """ TurnView of the current player's turn, for their strategy to decide from """
+    currentPlayer = self.getCurrentPlayer()
+    opponentScorecards = self.opponentScorecards.get(self.currentPlayerIndex, None)
+    if opponentScorecards is None:
+      opponentScorecards = MappingProxyType(OrderedDict((player.getName(), player.getScorecardView())
+                                                        for player in self.players if player is not currentPlayer))
+      self.opponentScorecards[self.currentPlayerIndex] = opponentScorecards
+    return TurnView(currentPlayer.getName(), tuple(self.diceValues), tuple(self.getHeldDice()), self.remainingRolls,
+                    self.numberOfRolls, self.numberOfDiceFaces, currentPlayer.getScorecardView(), opponentScorecards)
+
   def getPlayer(self, name):
     """ Return the player with the given name """
     for player in self.players:
@@ -722,6 +1437,7 @@ class Game:
     # can only hold a die after the first roll
     canHold = self.getGameStatus() == Game.STATUS.RUNNING and self.getRemainingRolls() < self.getNumberOfRolls()
     self.heldDice[diceNum] = isHeld and canHold
+    self._recordAction((Game.ACTION.HOLD, diceNum, isHeld))
   
   
   def setStatus(self, status):
@@ -746,6 +1462,7 @@ class Game:
     # CHECK: row doesn't already have a score
     if playerScorecard.getRowScore(rowName) is not None:
       #raise SystemError("tried to score on an already scored row")
+      self._recordAction((Game.ACTION.SCORE, rowName))
       return
       
     
@@ -755,14 +1472,15 @@ class Game:
     #  raise SystemError("tried to score on an already scored row")
     
     # calculate the score for this row
-    pointsCalc = Scorecard.PointsCalculator(playerScorecard)
-    scores = pointsCalc.calculate([rowName], self.getDiceValues())
+    scores = playerScorecard.getPointsCalculator().calculate([rowName], self.getDiceValues())
     
     # store the score(s)
     #  -may be more than one score if there is a yahtzee bonus
     for scoreName, scoreValue in scores.items():
       playerScorecard.updateScore(scoreName, scoreValue)
     
+    self._recordAction((Game.ACTION.SCORE, rowName))
+    
     
   def advanceTurn(self):
     """ End the turn of the current player and move on to the next """
@@ -782,6 +1500,8 @@ class Game:
     self.totalGameTurns -= 1
     if self.totalGameTurns == 0:
       self.setStatus(Game.STATUS.FINISHED)
+    
+    self._recordAction((Game.ACTION.ADVANCE,))
       
   
   def rollDice(self):
@@ -792,7 +1512,6 @@ class Game:
       raise SystemError("trying to roll dice when there are no turns left")
     
     
-    
     # get the indices of the non-held dice
     freeDiceIndices = [iDice for iDice, isHeld in enumerate(self.heldDice) if not isHeld]
     
@@ -808,6 +1527,8 @@ class Game:
     
     # decrement number of turns left
     self.remainingRolls -= 1
+    
+    self._recordAction((Game.ACTION.ROLL,))
   
   
   def _rollFreeDice(self, numberOfDice):
@@ -823,8 +1544,67 @@ class Game:
                           .format(numberOfDice, self.numberOfDice))
     
     # roll the dice
-    return [random.randint(1, self.numberOfDiceFaces) for _ in range(numberOfDice)]
-    #return [1 for _ in range(numberOfDice)]
+    return self.diceSource.roll(numberOfDice)
+  
+  
+  def _recordAction(self, action):
+    """ Add an action, once it's been taken, to the action list and tell the event hooks """
+    self.actions.append(action)
+    
+    # hooks may remove themselves, e.g., when the game finishes
+    for eventHook in list(self.eventHooks):
+      eventHook(self, action)
+  
+  def addEventHook(self, eventHook):
+    """
+    # Call <eventHook> after every action taken in the game
+    #
+    # eventHook: (function) called with (game, action), where action is as
+    #            in the action list; the ADVANCE action comes after the
+    #            next player's turn has been set up
+    #
+    """
+    self.eventHooks.append(eventHook)
+  
+  def removeEventHook(self, eventHook):
+    self.eventHooks.remove(eventHook)
+  
+  
+  def applyAction(self, action):
+    """
+    # Take an <action> from a game's action list
+    #
+    # action: (tuple) Game.ACTION, followed by its arguments
+    #
+    """
+    actionType, *actionArgs = action
+    if actionType == Game.ACTION.ROLL:
+      self.rollDice()
+    elif actionType == Game.ACTION.HOLD:
+      self.setDiceHold(*actionArgs)
+    elif actionType == Game.ACTION.SCORE:
+      self.score(*actionArgs)
+    elif actionType == Game.ACTION.ADVANCE:
+      self.advanceTurn()
+    else:
+      raise ValueError("unknown action {}".format(actionType))
+  
+  @staticmethod
+  def replay(playerNameList, seed, actions, **gameArgs):
+    """
+    # Play a game again, from its seed and actions
+    #  -returns the replayed Game, in the same state as the original
+    #
+    # seed:     (int or SeedSequence) seed of the original game, see getSeedSequence
+    # actions:  (list) actions of the original game, see getActions
+    # gameArgs: other arguments the original Game was created with
+    #
+    """
+    game = Game(playerNameList, seed=seed, **gameArgs)
+    game.setStatus(Game.STATUS.RUNNING)
+    for action in actions:
+      game.applyAction(action)
+    return game
   
 
   
@@ -844,8 +1624,9 @@ class Game:
       raise SystemError("can't add a player after the game has started")
     
     # create a new player with a blank scorecard
-    player = Player(playerName, Scorecard(self.numberOfDiceFaces))
+    player = Player(playerName, self.scorecardClass(self.numberOfDiceFaces))
     self.players.append(player)
+    self.opponentScorecards.clear()
     
     # if this is the first player, make it their turn
     if self.getNumberOfPlayers() == 1:
@@ -870,6 +1651,7 @@ class Game:
     for player in self.players:
       if player.name == playerName:
         self.players.remove(player)
+        self.opponentScorecards.clear()
         self.totalGameTurns = self.turnsPerPlayer * self.getNumberOfPlayers()
         return
     
@@ -0,0 +1,98 @@
+import logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from model import Game
+from rolltable import RollTable
+from solver import StrategySolver
+
+
+def parseArgs(argv=None):
+  """ Read the command line options """
+  
+  parser = argparse.ArgumentParser(description="Solve the optimal solitaire strategy for a dice config "
+                                               "and save its expected-value table")
+  parser.add_argument("--dice",  type=int, default=5,
+                      help="number of dice ({}-{})".format(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE))
+  parser.add_argument("--faces", type=int, default=6,
+                      help="number of dice faces ({}-{})".format(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES))
+  parser.add_argument("--rolls", type=int, default=3,
+                      help="number of rolls per turn ({}-{})".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
+  parser.add_argument("--workers", type=int, default=1,
+                      help="number of processes to solve with, 0 for one per CPU")
+  parser.add_argument("--roll-cache", default=None,
+                      help="directory to cache the dice roll tables in, so workers and later runs can reuse them; "
+                           "out of core, default is in the checkpoint directory")
+  parser.add_argument("--output", default=None,
+                      help="table file to write, default is ev-<dice>d<faces>-<rolls>r.evt")
+  parser.add_argument("--checkpoint-dir", default=None,
+                      help="directory to checkpoint solved layers to, default is <output>.checkpoints")
+  restartGroup = parser.add_mutually_exclusive_group()
+  restartGroup.add_argument("--resume", action="store_true",
+                            help="carry on from the layers already checkpointed")
+  restartGroup.add_argument("--restart", action="store_true",
+                            help="delete the layers already checkpointed and start again")
+  parser.add_argument("--out-of-core", action="store_true",
+                      help="keep the solved values and the roll tables on disk, rather than in memory")
+  parser.add_argument("--float32", action="store_true",
+                      help="save the table at single precision, half the size, but near-tied holds may be reordered")
+  parser.add_argument("--memory-budget", type=int, default=None,
+                      help="MB of memory to solve with, shared by the workers")
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
+  
+  args = parseArgs(argv)
+  outputLoc = args.output
+  if outputLoc is None:
+    outputLoc = "ev-{}d{}-{}r.evt".format(args.dice, args.faces, args.rolls)
+  
+  checkpointDir = args.checkpoint_dir
+  if checkpointDir is None:
+    checkpointDir = "{}.checkpoints".format(outputLoc)
+  
+  # out of core, the roll tables are memory-mapped from their cache, so
+  # they're never built in memory
+  rollCacheDir = args.roll_cache
+  if rollCacheDir is None and args.out_of_core:
+    rollCacheDir = StrategySolver.getRollCacheDir(checkpointDir)
+  RollTable.setCacheDir(rollCacheDir)
+  solver = StrategySolver(numberOfDice=args.dice, numberOfDiceFaces=args.faces, numberOfRolls=args.rolls)
+  
+  startTime = time.time()
+  memoryBudget = None if args.memory_budget is None else args.memory_budget * 2**20
+  
+  # CHECK: an earlier run's layers aren't thrown away by mistake
+  if not (args.resume or args.restart) and solver.hasCheckpoints(checkpointDir):
+    logger.error("{} has layers checkpointed by an earlier run; pass --resume to carry on from them, "
+                 "or --restart to delete them and start again".format(checkpointDir))
+    sys.exit(1)
+  
+  solver.solve(numberOfWorkers=args.workers or None, checkpointDir=checkpointDir, resume=args.resume,
+               outOfCore=args.out_of_core, memoryBudget=memoryBudget, restart=args.restart)
+  logger.info("solved in {:.1f}s; expected score from a new game is {:.4f}"
+              .format(time.time() - startTime, solver.getStateValue(2**solver.numberOfRows - 1, 0, 0)))
+  
+  solver.save(outputLoc, dtype=np.float32 if args.float32 else np.float64)
+  logger.info("saved table to {}".format(outputLoc))
+  
+  # table is safely saved, so the checkpoints, and any roll tables cached
+  # with them, aren't needed
+  solver.clearCheckpoints(checkpointDir)
+  if args.roll_cache is None and os.path.isdir(StrategySolver.getRollCacheDir(checkpointDir)):
+    shutil.rmtree(StrategySolver.getRollCacheDir(checkpointDir))
+  if not os.listdir(checkpointDir):
+    os.rmdir(checkpointDir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,158 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import shelve
+import threading
+
+from collections import OrderedDict
+
+
+class PredictionCache:
+  """
+  # Size-bounded cache of predictor results
+  #
+  # Entries are keyed on (config, hand, rolls left, state), where the state is
+  # whatever else the result depends on, e.g., the kind of query and how the
+  # dice can be held. Keys must be hashable, and their repr must identify
+  # them, as that's how they're stored on disk.
+  #
+  #  -the memory tier evicts the least recently used entry once it's full
+  #  -the optional disk tier is a shelve file that keeps every entry, so
+  #   results survive restarts; entries found there are brought back into
+  #   memory
+  #  -safe to use from more than one thread
+  #
+  """
+
+  # bump when cached results change, so older disk entries are ignored
+  CACHE_VERSION = 1
+
+  def __init__(self, maxSize=4096, diskLoc=None):
+    """
+    #
+    # maxSize: (int) most entries to keep in memory
+    # diskLoc: (str) file for the disk tier, or None for memory only
+    #
+    """
+
+    # CHECK: there's room for something
+    if maxSize < 1:
+      raise ValueError("cache must hold at least one entry")
+
+    self.maxSize = maxSize
+    self.diskLoc = diskLoc
+
+    self._entries = OrderedDict()
+    self._lock    = threading.RLock()
+    self._shelf   = None if diskLoc is None else shelve.open(diskLoc)
+
+    self.resetStats()
+
+
+  def resetStats(self):
+    """ Zero the hit, miss and eviction counters """
+    with self._lock:
+      self.hits      = 0
+      self.diskHits  = 0
+      self.misses    = 0
+      self.evictions = 0
+
+  def getStats(self):
+    """
+    # Counters since the last reset, as a dict
+    #  -hits:      found in memory
+    #  -diskHits:  found on disk
+    #  -misses:    not found, so calculated
+    #  -evictions: dropped from memory to make room
+    #  -size:      entries in memory now
+    #
+    """
+    with self._lock:
+      return {"hits":      self.hits,
+              "diskHits":  self.diskHits,
+              "misses":    self.misses,
+              "evictions": self.evictions,
+              "size":      len(self._entries),
+              "maxSize":   self.maxSize}
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, key):
+    return key in self._entries
+
+
+  @staticmethod
+  def _getDiskKey(key):
+    return "v{}:{!r}".format(PredictionCache.CACHE_VERSION, key)
+
+  def _putMemory(self, key, value):
+    """ Store in memory, evicting the least recently used entries to make room """
+    self._entries[key] = value
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.maxSize:
+      self._entries.popitem(last=False)
+      self.evictions += 1
+
+  def get(self, key, default=None):
+    """ Cached value of <key>, or <default> if it isn't cached; doesn't count as a miss """
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+      if self._shelf is not None:
+        diskKey = PredictionCache._getDiskKey(key)
+        if diskKey in self._shelf:
+          value = self._shelf[diskKey]
+          self._putMemory(key, value)
+          self.diskHits += 1
+          return value
+
+    return default
+
+  def put(self, key, value):
+    """ Cache <value> for <key> """
+    with self._lock:
+      self._putMemory(key, value)
+      if self._shelf is not None:
+        self._shelf[PredictionCache._getDiskKey(key)] = value
+
+  def getOrCalculate(self, key, calcFn):
+    """
+    # Cached value of <key>, calculating and caching it with calcFn() if it
+    # isn't cached
+    #  -calculations happen outside the lock, so other threads aren't held
+    #   up; two threads missing the same key both calculate it
+    #
+    """
+    missing = object()
+    value = self.get(key, missing)
+    if value is not missing:
+      return value
+
+    with self._lock:
+      self.misses += 1
+    value = calcFn()
+    self.put(key, value)
+    return value
+
+
+  def clear(self):
+    """ Drop every entry in memory; the disk tier is kept """
+    with self._lock:
+      self._entries.clear()
+
+  def sync(self):
+    """ Write the disk tier out """
+    with self._lock:
+      if self._shelf is not None:
+        self._shelf.sync()
+
+  def close(self):
+    """ Write out and close the disk tier; the cache is memory only afterwards """
+    with self._lock:
+      if self._shelf is not None:
+        self._shelf.close()
+        self._shelf = None
@@ -6,24 +6,122 @@ import random
 
 from collections import OrderedDict
 
+from enum import Enum
+
 import functools
+import time
 
 from fractions import Fraction
 
 from math import comb
 
+from statistics import NormalDist
+
 import numpy as np
-import pandas as pd
+
+from hand import Hand
+from model import Scorecard
+from predictioncache import PredictionCache
+from rolltable import RollTable
   
 class ProbabilityPredictor:
   
+  class BACKEND(Enum):
+    """
+    # How probabilities are calculated
+    #  -EXACT: Fractions, slow but exact, for checking
+    #  -FLOAT: vectorised float64, for everything else
+    """
+    EXACT = "exact"
+    FLOAT = "float"
+  
+  # backend used when one isn't given
+  backend = BACKEND.FLOAT
+  
   @staticmethod
-  @functools.lru_cache(maxsize=256)
-  def probExactlyXDice(numInstances, numDice, numDieFaces):
+  def setBackend(backend):
+    """ Set the backend used when one isn't given """
+    
+    if backend not in ProbabilityPredictor.BACKEND:
+      raise ValueError("backend {} is not a valid backend".format(backend))
+    ProbabilityPredictor.backend = backend
+  
+  @staticmethod
+  def _getBackend(backend):
+    """ <backend>, or the default backend if it's None """
+    return ProbabilityPredictor.backend if backend is None else backend
+  
+  
+  # cache of query results, keyed on (config, hand, rolls left, state)
+  cache = PredictionCache()
+  
+  # most held hands to calculate ahead of time in warmUp
+  WARM_UP_LIMIT = 2048
+  
+  @staticmethod
+  def setCache(cache):
+    """ Cache query results in <cache> (PredictionCache) from now on """
+    ProbabilityPredictor.cache = cache
+  
+  @staticmethod
+  def getCacheStats():
     """
-    # Probability exactly <numInstances> occurrences of a dice value are
-    # shown when <numDice> are thrown, each die having <numDieFaces> sides
+    # Counters of the query cache (see PredictionCache.getStats), and of the
+    # per-config tables
+    #
+    """
+    stats = ProbabilityPredictor.cache.getStats()
+    stats["handChains"]  = ProbabilityPredictor.getHandChain.cache_info()._asdict()
+    stats["exactCounts"] = ProbabilityPredictor._probExactlyXDiceExact.cache_info()._asdict()
+    return stats
+  
+  @staticmethod
+  def _getCached(query, numDice, numDieFaces, handValues, rollsRemaining, state, calcFn):
+    """
+    # Result of a query, from the cache if it's there
+    #  -results are copied, so callers can't change what's cached
+    #
+    # query:      (str) kind of query
+    # handValues: (list) dice values the result depends on, None for dice not rolled
+    # state:      (tuple) anything else the result depends on
+    #
     """
+    hand = tuple(sorted(value for value in handValues if value is not None))
+    key  = ((numDice, numDieFaces), hand, rollsRemaining, (query,) + tuple(state))
+    result = ProbabilityPredictor.cache.getOrCalculate(key, calcFn)
+    return OrderedDict(result) if isinstance(result, OrderedDict) else result.copy()
+  
+  @staticmethod
+  def warmUp(numDice, numDieFaces, numberOfRolls, backend=None):
+    """
+    # Calculate the results a game with this dice config asks for most, so
+    # they're cached before they're needed
+    #  -the probability grid before the first roll, and for each hold after
+    #   it, fewest held dice first, up to WARM_UP_LIMIT holds
+    #  -returns the number of results calculated
+    #
+    """
+    diceValues = [None] * numDice
+    ProbabilityPredictor.getAtLeastProbabilities(diceValues, numberOfRolls, numDieFaces, backend=backend)
+    numCalculated = 1
+    
+    for numHeld in range(numDice + 1):
+      for heldValues in itertools.combinations_with_replacement(range(1, numDieFaces + 1), numHeld):
+        for rollsRemaining in range(numberOfRolls - 1, 0, -1):
+          if numCalculated >= ProbabilityPredictor.WARM_UP_LIMIT:
+            return numCalculated
+          diceValues = list(heldValues) + [1] * (numDice - numHeld)
+          ProbabilityPredictor.getHeldAtLeastProbabilities(diceValues, range(numHeld), rollsRemaining,
+                                                           numDieFaces, backend)
+          numCalculated += 1
+    
+    return numCalculated
+  
+  
+  @staticmethod
+  @functools.lru_cache(maxsize=None)
+  def _probExactlyXDiceExact(numInstances, numDice, numDieFaces):
+    """ Exact probExactlyXDice, as a Fraction """
     
     # probability die value will be shown
     probOccur = Fraction(1, numDieFaces)
@@ -39,11 +137,46 @@ class ProbabilityPredictor:
   
   
   @staticmethod
-  @functools.lru_cache(maxsize=256)
-  def probAtLeastXDice(numInstances, numDice, numDieFaces):
+  def _probExactlyXDiceFloat(numInstances, numDice, numDieFaces):
+    """
+    # probExactlyXDice in float64, for arrays of <numInstances> and <numDice>
+    #  -worked out in log space, so large numbers of dice don't over/underflow
+    """
+    numInstances, numDice = np.broadcast_arrays(np.asarray(numInstances, dtype=np.int64),
+                                                np.asarray(numDice, dtype=np.int64))
+    isPossible = (numInstances >= 0) & (numInstances <= numDice)
+    
+    # log of n! for every n needed
+    logFactorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max(int(numDice.max()), 0) + 1)))])
+    
+    k = np.where(isPossible, numInstances, 0)
+    n = np.where(isPossible, numDice, 0)
+    logProb = (logFactorial[n] - logFactorial[k] - logFactorial[n - k] +
+               k * np.log(1 / numDieFaces) + (n - k) * np.log1p(-1 / numDieFaces))
+    
+    return np.where(isPossible, np.exp(logProb), 0.0)
+  
+  
+  @staticmethod
+  def probExactlyXDice(numInstances, numDice, numDieFaces, backend=None):
+    """
+    # Probability exactly <numInstances> occurrences of a dice value are
+    # shown when <numDice> are thrown, each die having <numDieFaces> sides
+    #  -with the FLOAT backend, <numInstances> and <numDice> can be arrays
+    """
+    if ProbabilityPredictor._getBackend(backend) == ProbabilityPredictor.BACKEND.EXACT:
+      return ProbabilityPredictor._probExactlyXDiceExact(int(numInstances), int(numDice), int(numDieFaces))
+    
+    probs = ProbabilityPredictor._probExactlyXDiceFloat(numInstances, numDice, numDieFaces)
+    return float(probs) if probs.ndim == 0 else probs
+  
+  
+  @staticmethod
+  def probAtLeastXDice(numInstances, numDice, numDieFaces, backend=None):
     """
     # Probability at least <numInstances> occurrences of a dice value are
     # shown when <numDice> are thrown, each die having <numDieFaces> sides
+    #  -with the FLOAT backend, <numInstances> and <numDice> can be arrays
     """
     
     # add up the probabilities that:
@@ -54,148 +187,566 @@ class ProbabilityPredictor:
     #  -exactly <numInstances>-2 values are shown
     # +
     # ....
-    return sum([ProbabilityPredictor.probExactlyXDice(i, numDice, numDieFaces)
-                  for i in range(numInstances,numDice+1)])
+    if ProbabilityPredictor._getBackend(backend) == ProbabilityPredictor.BACKEND.EXACT:
+      return sum([ProbabilityPredictor._probExactlyXDiceExact(i, int(numDice), int(numDieFaces))
+                    for i in range(max(int(numInstances), 0), int(numDice)+1)], Fraction(0))
+    
+    numInstances, numDice = np.broadcast_arrays(np.asarray(numInstances, dtype=np.int64),
+                                                np.asarray(numDice, dtype=np.int64))
+    maxDice = max(int(numDice.max()), 0)
+    
+    # every number of occurrences up to the most dice, summed from the top
+    occurrences = np.arange(maxDice + 1)
+    exactProbs  = ProbabilityPredictor._probExactlyXDiceFloat(occurrences, numDice[..., np.newaxis], numDieFaces)
+    probs = np.where(occurrences >= numInstances[..., np.newaxis], exactProbs, 0.0).sum(axis=-1)
+    return float(probs) if probs.ndim == 0 else probs
+  
+  
+  @staticmethod
+  def getCountChain(numDice, numDieFaces, backend=None):
+    """
+    # Transitions of the number of dice showing one face, when all the dice
+    # showing it are held and the rest rolled
+    #  -returns a (numDice+1 x numDice+1) matrix, [c, c'] being the
+    #   probability of going from c to c' dice showing the face
+    #  -a numpy array with the FLOAT backend, a list of lists of Fractions
+    #   with the EXACT backend
+    #
+    """
+    if ProbabilityPredictor._getBackend(backend) == ProbabilityPredictor.BACKEND.EXACT:
+      return [[ProbabilityPredictor._probExactlyXDiceExact(nextNum - currNum, numDice - currNum, numDieFaces)
+               if nextNum >= currNum else Fraction(0)
+               for nextNum in range(numDice + 1)] for currNum in range(numDice + 1)]
+    
+    currNum, nextNum = np.meshgrid(np.arange(numDice + 1), np.arange(numDice + 1), indexing="ij")
+    return ProbabilityPredictor._probExactlyXDiceFloat(nextNum - currNum, numDice - currNum, numDieFaces)
+  
+  
+  @staticmethod
+  def probAtLeastByEnd(currentNums, numDice, numDieFaces, rollsRemaining, canHold=True, backend=None):
+    """
+    # Probability of ending the turn with at least 1-<numDice> dice showing
+    # a face, for each current number of dice showing it
+    #  -the best way to get at least k of a face is to hold every die
+    #   showing it, and roll the rest; without holding, the dice are all
+    #   rolled until there are k of it
+    #  -returns a (len(currentNums) x numDice) array, [i, k-1] being the
+    #   probability of at least k from currentNums[i]; an object array of
+    #   Fractions with the EXACT backend
+    #
+    # currentNums:    (list) number of dice showing the face now
+    # rollsRemaining: (int) number of rolls left this turn
+    # canHold:        (bool) dice can be held between rolls
+    #
+    """
+    isExact = ProbabilityPredictor._getBackend(backend) == ProbabilityPredictor.BACKEND.EXACT
+    numAtLeast = np.arange(1, numDice + 1)
+    
+    # which counts have at least k
+    hasAtLeast = np.arange(numDice + 1)[:, np.newaxis] >= numAtLeast
+    
+    # without holding: made already, or made on one of the rolls left
+    if not canHold:
+      rollProbs = [ProbabilityPredictor.probAtLeastXDice(k, numDice, numDieFaces, backend)
+                   for k in range(1, numDice + 1)]
+      probs = [[1 - (1 - rollProb) ** rollsRemaining for rollProb in rollProbs]] * (numDice + 1)
+      probs = np.where(hasAtLeast, Fraction(1) if isExact else 1.0, np.array(probs, dtype=object if isExact else None))
+    
+    # holding: apply the count transitions once per roll
+    elif isExact:
+      chain = ProbabilityPredictor.getCountChain(numDice, numDieFaces, backend)
+      probs = [[Fraction(int(x)) for x in row] for row in hasAtLeast]
+      for _ in range(rollsRemaining):
+        probs = [[sum((chain[c][n] * probs[n][k] for n in range(numDice + 1)), Fraction(0))
+                  for k in range(numDice)] for c in range(numDice + 1)]
+      probs = np.array(probs, dtype=object)
+    
+    else:
+      chain = ProbabilityPredictor.getCountChain(numDice, numDieFaces, backend)
+      probs = hasAtLeast.astype(np.float64)
+      for _ in range(rollsRemaining):
+        probs = np.where(hasAtLeast, 1.0, np.minimum(chain @ probs, 1.0))
+    
+    return probs[np.asarray(currentNums, dtype=np.int64)]
+  
+  
+  @staticmethod
+  @functools.lru_cache(maxsize=None)
+  def getHandChain(numDice, numDieFaces):
+    """ HandChain for this dice configuration, built on first use """
+    return ProbabilityPredictor.HandChain(numDice, numDieFaces)
 
 
-  @staticmethod
-  def DEPrangeOfAKind(numDice, kind, numDieFaces=6):
+  class HandChain:
     """
-    # Probability of getting 1-<numOccurrences> of <kind> dice values
-    #  -e.g., when rolling 5 dice, probability of getting 1, 2, 3, 4 or 5 "4"s
+    # Markov chain over the hands of a dice configuration
+    #  -a hand's state is its count of each face, i.e., the sorted dice
+    #  -each roll moves a hand to a new one: some of its dice are held and
+    #   the rest rerolled, giving each possible outcome with its multinomial
+    #   probability
     #
+    # The chance of making a target, e.g., a full house, by the end of the
+    # turn is found by working back from the last roll, holding whichever
+    # dice give the best chance of making that target. Every target is a
+    # column, so they're all solved together with matrix products.
     #
     """
-    
-    # current number of <kind> we have
-    currentNum = diceCount.get(kind, 0)
-    
-    # calculate the chance of getting X of <kind>
-    #  -e.g., for kind=3 with 5 dice, probability of getting 1x3, 2x3, 3x3, 4x3, 5x3
-    for numOccurrences in range(1, numDice + 1):
-    
-      # if we already have this number of <kind> then probability is 1.0
-      if currentNum >= numOccurrences:
-        prob[numOccurrences] = Fraction(1)
-    
-      # else, calculate the probability of rolling the number of <kind> needed
-      # with the dice we have available
+
+    def __init__(self, numDice, numDieFaces):
+      self.numDice     = numDice
+      self.numDieFaces = numDieFaces
+
+      # where rerolling dice can lead
+      self.rollTable  = RollTable.getTable(numDice, numDieFaces)
+      self.scoreTable = self.rollTable.scoreTable
+
+      # number of each face in each hand
+      self.handCounts = Scorecard.PointsCalculator.countDiceBatch(self.scoreTable.hands, numDieFaces)
+
+      # probabilities of each target, by (target name, can hold)
+      self._targetProbs = {}
+
+
+    def _rollValues(self, handValues, canHold):
+      """ Value of every hand with one more roll left, holding its best dice """
+
+      keepValues = self.rollTable.expectKeepValues(handValues)
+
+      # without holding, either stop or reroll everything
+      if not canHold:
+        return np.maximum(handValues, keepValues[0])
+
+      return self.rollTable.bestKeepValues(keepValues)
+
+    def getTargetProbabilities(self, targetName, targets, rollsRemaining, canHold=True):
+      """
+      # Probability of ending the turn with a hand that makes each target,
+      # from each hand, for each number of rolls left up to <rollsRemaining>
+      #  -returns a (rollsRemaining+1 x numberOfHands x C) array
+      #  -results are kept for <targetName>, so each set of targets is only
+      #   solved once per number of rolls
+      #
+      # targetName:     (str) name to keep the results under
+      # targets:        (array) numberOfHands x C bools, which hands make each target
+      # rollsRemaining: (int) number of rolls left
+      # canHold:        (bool) dice can be held between rolls
+      #
+      """
+      key = (targetName, canHold)
+      probs = self._targetProbs.get(key, None)
+      if probs is None:
+        probs = [np.asarray(targets, dtype=np.float64)]
+      for _ in range(len(probs), rollsRemaining + 1):
+        probs.append(self._rollValues(probs[-1], canHold))
+      self._targetProbs[key] = probs
+      return probs[:rollsRemaining + 1]
+
+    def getProbabilities(self, targetName, targets, diceValues, rollsRemaining, canHold=True):
+      """
+      # Probability of making each target by the end of the turn
+      #  -returns an array of C probabilities
+      #
+      # diceValues: (list) current dice values, or all None if they haven't
+      #             been rolled yet this turn
+      #
+      """
+      probs = self.getTargetProbabilities(targetName, targets, rollsRemaining, canHold)
+
+      # dice not rolled yet: the first roll is all the dice
+      if all(diceValue is None for diceValue in diceValues):
+        if rollsRemaining < 1:
+          return np.zeros(probs[0].shape[1])
+        handProbs = self.rollTable.expectRollValues(probs[rollsRemaining - 1])
+
+      # CHECK: there's a full hand
+      elif None in diceValues or len(diceValues) != self.numDice:
+        raise ValueError("need all {} dice to be rolled, got {}".format(self.numDice, diceValues))
+
       else:
-      
-        # if we can hold the current <kind> dice we have, then we only need to
-        # roll for the remaining number of <kind> we need
-        numKindNeeded    = numOccurrences - currentNum
-        numAvailableDice = numDice - currentNum
-      
-        # probability of getting the number of <kind> we need, given the dice we have
-        prob[numOccurrences] = ProbabilityPredictor.probAtLeastXDice(numKindNeeded,
-                                                                     numAvailableDice,
-                                                                     numDieFaces)
-  
-    return prob
+        handProbs = probs[rollsRemaining][self.scoreTable.rankHand(diceValues)]
 
+      # sums of outcome probabilities can come out a rounding error above 1
+      return np.minimum(handProbs, 1.0)
 
-  @staticmethod
-  def ofAKind(kind, diceValues, turnsRemaining, numDieFaces=6, canHold=True):
-    """  """
-  
-    numDice = len(diceValues)
+
+    def getCategoryTargets(self):
+      """
+      # Which hands make each scorecard category
+      #  -returns (categoryNames, numberOfHands x C bools)
+      #  -lower section categories are made by any hand that scores in them;
+      #   an upper section row is made by scoring par, i.e., three of its face
+      #
+      """
+      table = self.scoreTable
+      categoryNames = [Scorecard.ROW_NAME.THREE_OF_A_KIND.value, Scorecard.ROW_NAME.FOUR_OF_A_KIND.value,
+                       Scorecard.ROW_NAME.FULL_HOUSE.value, Scorecard.ROW_NAME.SMALL_STRAIGHT.value,
+                       Scorecard.ROW_NAME.LARGE_STRAIGHT.value, Scorecard.ROW_NAME.YAHTZEE.value]
+      targets = [table.scores[:, table.getRowIndex(rowName)] > 0 for rowName in categoryNames]
+
+      for face in range(1, self.numDieFaces + 1):
+        categoryNames.append(Scorecard.numToWord(face))
+        targets.append(self.handCounts[:, face] >= 3)
+
+      return categoryNames, np.column_stack(targets)
+
+    def getAtLeastTargets(self):
+      """
+      # Which hands have at least k dice of face f
+      #  -returns a (numberOfHands x numDieFaces*numDice) bool array, the
+      #   column for (f, k) being (f-1)*numDice + k-1
+      #
+      """
+      numAtLeast = np.arange(1, self.numDice + 1)
+      return (self.handCounts[:, 1:, np.newaxis] >= numAtLeast).reshape(len(self.handCounts), -1)
+
+
+  class Estimate:
+    """ Monte Carlo estimate of a probability, with its confidence interval """
     
-    diceCount = pd.Series(diceValues).value_counts()
+    __slots__ = ("probability", "lower", "upper", "numTrials")
     
-    # current number of <kind> we have
-    currentNum = diceCount.get(kind, 0)
+    def __init__(self, probability, lower, upper, numTrials):
+      self.probability = probability
+      self.lower       = lower
+      self.upper       = upper
+      self.numTrials   = numTrials
     
+    def __repr__(self):
+      return "Estimate({:.5f} [{:.5f}, {:.5f}], {} trials)".format(self.probability, self.lower, self.upper,
+                                                                  self.numTrials)
+  
+  
+  class MonteCarloEstimator:
     """
-    prob 5-of-a-kind of 1s:
-    -prob(getting 5 | got exactly 4 before) + prob(getting 5 | got exactly 3 before) +
-    
-    p(5|0) + p(4|1) + p(3|2) + p(2|3) + p(1|4) + p(5)
-    
+    # Estimates the chance of making each target by the end of the turn, by
+    # simulating the rest of the turn many times over
+    #  -for rule variants and configurations too big to solve exactly
+    #  -trials are simulated in batches, as arrays of dice counts
+    #  -each group of targets has a fixed hold policy, which decides what to
+    #   hold from the dice counts before each roll
+    #
+    # The default targets are the same as the exact predictor's: the lower
+    # section categories, par in each upper section row, and at least k dice
+    # of each face.
+    #
     """
     
+    # number of trials to simulate at once
+    BATCH_SIZE = 2**18
+    
+    def __init__(self, numDice, numDieFaces=6, targetGroups=None, rng=None):
+      """
+      #
+      # numDice:      (int) number of dice
+      # numDieFaces:  (int) number of sides on each die
+      # targetGroups: (list) of (holdPolicy, targetNames, targetsFn), default
+      #               is getDefaultTargetGroups()
+      #                -holdPolicy(diceCounts) gives the N x numDieFaces+1
+      #                 counts to hold from N x numDieFaces+1 dice counts
+      #                -targetsFn(diceCounts) gives N x len(targetNames) bools,
+      #                 whether each hand makes each target
+      # rng:          (Generator) numpy random generator, default is a new one
+      #
+      """
+      self.numDice     = numDice
+      self.numDieFaces = numDieFaces
+      self.rng = np.random.default_rng() if rng is None else rng
+      self.targetGroups = self.getDefaultTargetGroups() if targetGroups is None else targetGroups
+    
+    
+    @staticmethod
+    def holdFace(face):
+      """ Hold policy: every die showing <face> """
+      def holdPolicy(diceCounts):
+        heldCounts = np.zeros_like(diceCounts)
+        heldCounts[:, face] = diceCounts[:, face]
+        return heldCounts
+      return holdPolicy
+    
+    @staticmethod
+    def holdMostCommon(diceCounts):
+      """ Hold policy: every die showing the most common face, the highest if there's a tie """
+      heldCounts = np.zeros_like(diceCounts)
+      mostCommon = diceCounts.shape[1] - 1 - np.argmax(diceCounts[:, ::-1], axis=1)
+      rows = np.arange(len(diceCounts))
+      heldCounts[rows, mostCommon] = diceCounts[rows, mostCommon]
+      return heldCounts
+    
+    @staticmethod
+    def holdFullHouse(diceCounts):
+      """ Hold policy: up to three of the most common face, and two of the next """
+      heldCounts = np.zeros_like(diceCounts)
+      rows  = np.arange(len(diceCounts))
+      order = np.argsort(-diceCounts, axis=1, kind="stable")
+      heldCounts[rows, order[:, 0]] = np.minimum(diceCounts[rows, order[:, 0]], 3)
+      heldCounts[rows, order[:, 1]] = np.minimum(diceCounts[rows, order[:, 1]], 2)
+      return heldCounts
+    
+    @staticmethod
+    def holdStraight(length):
+      """ Hold policy: one die of each face in the window of <length> faces with the most faces showing """
+      def holdPolicy(diceCounts):
+        present = diceCounts[:, 1:] > 0
+        numWindows = max(present.shape[1] - length + 1, 1)
+        runningTotal = np.zeros((present.shape[0], present.shape[1] + 1), dtype=np.int64)
+        np.cumsum(present, axis=1, out=runningTotal[:, 1:])
+        windowTotals = runningTotal[:, length:length + numWindows] - runningTotal[:, :numWindows]
+        
+        # highest of the best windows, as high dice are worth more
+        windowStart = numWindows - 1 - np.argmax(windowTotals[:, ::-1], axis=1)
+        faces = np.arange(present.shape[1])
+        inWindow = (faces >= windowStart[:, np.newaxis]) & (faces < windowStart[:, np.newaxis] + length)
+        
+        heldCounts = np.zeros_like(diceCounts)
+        heldCounts[:, 1:] = present & inWindow
+        return heldCounts
+      return holdPolicy
     
     
+    def getDefaultTargetGroups(self):
+      """ Lower section categories, par in each upper row, and at least k of each face """
+      
+      numDice = self.numDice
+      rowName = Scorecard.ROW_NAME
+      
+      def rowTargets(rowNameList):
+        def targetsFn(diceCounts):
+          return Scorecard.PointsCalculator.calculateRawBatch(rowNameList, diceCounts, numDice) > 0
+        return rowNameList, targetsFn
+      
+      targetGroups = []
+      targetGroups.append((ProbabilityPredictor.MonteCarloEstimator.holdMostCommon,
+                           *rowTargets([rowName.THREE_OF_A_KIND.value, rowName.FOUR_OF_A_KIND.value,
+                                        rowName.YAHTZEE.value])))
+      targetGroups.append((ProbabilityPredictor.MonteCarloEstimator.holdFullHouse,
+                           *rowTargets([rowName.FULL_HOUSE.value])))
+      targetGroups.append((ProbabilityPredictor.MonteCarloEstimator.holdStraight(numDice - 1),
+                           *rowTargets([rowName.SMALL_STRAIGHT.value])))
+      targetGroups.append((ProbabilityPredictor.MonteCarloEstimator.holdStraight(numDice),
+                           *rowTargets([rowName.LARGE_STRAIGHT.value])))
+      
+      # upper row par, and at least k, of each face
+      #  -at least k targets are named (face, k)
+      numAtLeast = np.arange(1, numDice + 1)
+      for face in range(1, self.numDieFaces + 1):
+        def targetsFn(diceCounts, face=face):
+          return np.column_stack([diceCounts[:, face] >= 3, diceCounts[:, face, np.newaxis] >= numAtLeast])
+        targetNames = [Scorecard.numToWord(face)] + [(face, k) for k in numAtLeast.tolist()]
+        targetGroups.append((ProbabilityPredictor.MonteCarloEstimator.holdFace(face), targetNames, targetsFn))
+      
+      return targetGroups
     
     
-    probSum = 0
-    for numOccurrences in range(numDice):
-    
-      pA = ProbabilityPredictor.probAtLeastXDice(numDice-numOccurrences, numDice-numOccurrences, numDieFaces=6)
-      pB = ProbabilityPredictor.probExactlyXDice(numOccurrences, numDice, numDieFaces=6)
-      print("{}: {} * {}".format(numOccurrences, pA, pB))
-      probSum += pA * pB
-    
-    return probSum
-    
-    prob = {}
-
-    # prob getting X of a kind next turn
-    #prob[1] = 1.0 if currentNum >= 1 else ProbabilityPredictor.probAtLeastXDice(1, numDice, numDieFaces)
-    
-    # calculate the chance of getting X of <kind>
-    #  -e.g., for kind=3 with 5 dice, probability of getting 1x3, 2x3, 3x3, 4x3, 5x3
-    for numOccurrences in range(1, numDice+1):
+    def _rollDice(self, heldCounts):
+      """ Roll the dice that aren't held, for every trial """
+      numTrials = len(heldCounts)
+      numRolled = self.numDice - heldCounts.sum(axis=1)
       
-      # if we already have this number of <kind> then probability is 1.0
-      if currentNum >= numOccurrences:
-        prob[numOccurrences] = Fraction(1)
-        
-      # else, calculate the probability of rolling the number of <kind> needed
-      # with the dice we have available
-      else:
+      # unrolled dice are counted as the unused face 0
+      rolls = self.rng.integers(1, self.numDieFaces + 1, size=(numTrials, self.numDice))
+      rolls[np.arange(self.numDice) >= numRolled[:, np.newaxis]] = 0
+      
+      diceCounts = heldCounts + Scorecard.PointsCalculator.countDiceBatch(rolls, self.numDieFaces)
+      diceCounts[:, 0] = 0
+      return diceCounts
+    
+    def _simulateBatch(self, startCounts, rollsRemaining, numTrials):
+      """ Number of trials, of <numTrials>, that make each target """
+      numSuccesses = []
+      for holdPolicy, targetNames, targetsFn in self.targetGroups:
+        diceCounts = np.repeat(startCounts[np.newaxis, :], numTrials, axis=0)
+        for _ in range(rollsRemaining):
+          diceCounts = self._rollDice(holdPolicy(diceCounts))
+        numSuccesses.append(np.asarray(targetsFn(diceCounts)).reshape(numTrials, -1).sum(axis=0))
+      return np.concatenate(numSuccesses)
+    
+    
+    def estimate(self, diceValues, rollsRemaining, precision=0.001, timeBudget=1.0, confidence=0.95,
+                 maxTrials=None):
+      """
+      # Estimate the chance of making each target
+      #  -simulates batches of trials until every estimate's confidence
+      #   interval is within +/-<precision>, or <timeBudget> runs out
+      #  -returns an OrderedDict of target name: Estimate
+      #
+      # diceValues:     (list) current dice values, None for dice not rolled yet
+      # rollsRemaining: (int) number of rolls left this turn
+      # precision:      (float) largest confidence interval half-width to stop at
+      # timeBudget:     (float) seconds to stop after; at least one batch is run
+      # confidence:     (float) confidence level of the intervals
+      # maxTrials:      (int) most trials to simulate, or None for no limit
+      #
+      """
+      
+      # CHECK: hand fits the dice config
+      if len(diceValues) != self.numDice:
+        raise ValueError("need {} dice values, got {}".format(self.numDice, len(diceValues)))
+      
+      startCounts = np.zeros(self.numDieFaces + 1, dtype=np.int64)
+      hand = Hand(diceValues)
+      for face in hand.uniqueFaces:
+        startCounts[face] = hand.getCount(face)
+      
+      targetNames = [name for _, groupNames, _ in self.targetGroups for name in groupNames]
+      z = NormalDist().inv_cdf(0.5 + confidence / 2)
+      
+      startTime = time.time()
+      numTrials = 0
+      numSuccesses = np.zeros(len(targetNames), dtype=np.int64)
+      while True:
+        batchSize = ProbabilityPredictor.MonteCarloEstimator.BATCH_SIZE
+        if maxTrials is not None:
+          batchSize = min(batchSize, maxTrials - numTrials)
+        numSuccesses += self._simulateBatch(startCounts, rollsRemaining, batchSize)
+        numTrials += batchSize
         
-        # if we can hold the current <kind> dice we have, then we only need to
-        # roll for the remaining number of <kind> we need
-        numKindNeeded    = numOccurrences - currentNum if canHold else numOccurrences
-        numAvailableDice = numDice - currentNum        if canHold else numDice
+        # wilson score interval of each estimate
+        probs  = numSuccesses / numTrials
+        denom  = 1 + z**2 / numTrials
+        centre = (probs + z**2 / (2 * numTrials)) / denom
+        halfWidth = z * np.sqrt(probs * (1 - probs) / numTrials + z**2 / (4 * numTrials**2)) / denom
         
-        # probability of getting the number of <kind> we need, given the dice we have
-        prob[numOccurrences] = ProbabilityPredictor.probAtLeastXDice(numKindNeeded,
-                                                                     numAvailableDice,
-                                                                     numDieFaces)
-    
-    return prob
-    
-    # probability for each turn
-    probs = {}
-    
-    for iTurn in range(1, turnsRemaining+1):
+        if halfWidth.max() <= precision or time.time() - startTime >= timeBudget or\
+           (maxTrials is not None and numTrials >= maxTrials):
+          break
       
-      # prob getting X of a kind this turn
+      logger.debug("estimate: {} trials in {:.2f}s".format(numTrials, time.time() - startTime))
       
-      probs[iTurn] = {}
+      # the interval always reaches 0 or 1 when no trial, or every trial, made the target
+      lower = np.where(numSuccesses == 0, 0.0, np.maximum(centre - halfWidth, 0.0))
+      upper = np.where(numSuccesses == numTrials, 1.0, np.minimum(centre + halfWidth, 1.0))
+      
+      return OrderedDict((name, ProbabilityPredictor.Estimate(prob, low, high, numTrials))
+                         for name, prob, low, high in zip(targetNames, probs.tolist(), lower.tolist(), upper.tolist()))
     
-      for numOccurences in range(1, numDice + 1):
-        probs[iTurn][numOccurences] = ProbabilityPredictor.probAtLeastXDice(numOccurences, numDice, numDieFaces)
+    def estimateGame(self, game, **kwargs):
+      """ Estimate the chance of making each target from the current state of a <game>; see estimate """
+      return self.estimate(game.getDiceValues(), game.getRemainingRolls(), **kwargs)
+  
+  
+  @staticmethod
+  def estimateGameProbabilities(game, **kwargs):
+    """
+    # Monte Carlo estimates of the chance of making each target by the end of
+    # the current turn of a <game>, using the default targets and hold policies
+    #  -keyword arguments are passed to MonteCarloEstimator.estimate
+    #
+    """
+    estimator = ProbabilityPredictor.MonteCarloEstimator(game.getNumberOfDice(), game.getNumberOfDiceFaces())
+    return estimator.estimateGame(game, **kwargs)
+  
+  
+  @staticmethod
+  def getCategoryProbabilities(diceValues, rollsRemaining, numDieFaces=6, canHold=True):
+    """
+    # Probability of making each scorecard category by the end of the turn,
+    # holding the best dice for that category
+    #  -returns an OrderedDict of category name: probability
+    #  -an upper section row is made by getting at least three of its face
+    #
+    # diceValues:     (list) current dice values, all None if not rolled yet
+    # rollsRemaining: (int) number of rolls left this turn
+    # numDieFaces:    (int) number of sides on each die
+    # canHold:        (bool) dice can be held between rolls
+    #
+    """
+    def calcFn():
+      chain = ProbabilityPredictor.getHandChain(len(diceValues), numDieFaces)
+      categoryNames, targets = chain.getCategoryTargets()
+      probs = chain.getProbabilities("categories", targets, diceValues, rollsRemaining, canHold)
+      return OrderedDict(zip(categoryNames, probs.tolist()))
+    
+    return ProbabilityPredictor._getCached("categories", len(diceValues), numDieFaces, diceValues, rollsRemaining,
+                                           (canHold,), calcFn)
 
 
   @staticmethod
-  def OLDofAKind(kind, diceValues, numDieFaces=6, numTurns=3, canHold=True):
-    """  """
-
-    numDice = len(diceValues)
+  def getAtLeastProbabilities(diceValues, rollsRemaining, numDieFaces=6, canHold=True, backend=None):
+    """
+    # Probability of having at least k dice of face f by the end of the turn,
+    # holding the best dice for each (f, k)
+    #  -returns a (numDieFaces x numDice) array, [f-1, k-1] being the
+    #   probability for (f, k); an object array of Fractions with the EXACT backend
+    #
+    # diceValues:     (list) current dice values, None for dice not rolled yet
+    # rollsRemaining: (int) number of rolls left this turn
+    # numDieFaces:    (int) number of sides on each die
+    # canHold:        (bool) dice can be held between rolls
+    # backend:        (BACKEND) how to calculate, default is ProbabilityPredictor.backend
+    #
+    """
+    backend = ProbabilityPredictor._getBackend(backend)
     
-    # probability for each turn
-    probs = {}
+    def calcFn():
+      hand = Hand(diceValues)
+      currentNums = [hand.getCount(face) for face in range(1, numDieFaces + 1)]
+      return ProbabilityPredictor.probAtLeastByEnd(currentNums, len(diceValues), numDieFaces, rollsRemaining,
+                                                   canHold, backend)
     
-    for iTurn in range(numTurns):
-      
-      probs[iTurn] = {}
+    return ProbabilityPredictor._getCached("atLeast", len(diceValues), numDieFaces, diceValues, rollsRemaining,
+                                           (canHold, backend.name), calcFn)
+
+
+  @staticmethod
+  def getHeldAtLeastProbabilities(diceValues, heldDice, rollsRemaining, numDieFaces=6, backend=None):
+    """
+    # Probability of having at least k dice of face f by the end of the turn,
+    # when the next roll keeps <heldDice>, and the best dice for each (f, k)
+    # are held after that
+    #  -returns a (numDieFaces x numDice) array, as getAtLeastProbabilities
+    #  -dice not rolled yet, or no rolls left, leave nothing to choose, so
+    #   this is the same as getAtLeastProbabilities
+    #
+    # diceValues:     (list) current dice values, None for dice not rolled yet
+    # heldDice:       (list) indices of the dice held for the next roll
+    # rollsRemaining: (int) number of rolls left this turn
+    # numDieFaces:    (int) number of sides on each die
+    # backend:        (BACKEND) how to calculate, default is ProbabilityPredictor.backend
+    #
+    """
+    numDice = len(diceValues)
+    if rollsRemaining < 1 or None in diceValues:
+      return ProbabilityPredictor.getAtLeastProbabilities(diceValues, rollsRemaining, numDieFaces, True, backend)
+    
+    backend    = ProbabilityPredictor._getBackend(backend)
+    heldValues = [diceValues[iDice] for iDice in heldDice]
+    
+    # the next roll adds j of the face from the free dice, then the best
+    # holds take it from there
+    #  -only depends on the held dice, not the ones rerolled
+    def calcFn():
+      heldHand  = Hand(heldValues)
+      numRolled = numDice - len(heldValues)
+      rollProbs = [ProbabilityPredictor.probExactlyXDice(j, numRolled, numDieFaces, backend) if numRolled else 1
+                   for j in range(numRolled + 1)]
+      afterProbs = ProbabilityPredictor.probAtLeastByEnd(range(numDice + 1), numDice, numDieFaces,
+                                                         rollsRemaining - 1, True, backend)
       
-      for numOccurences in range(1, numDice+1):
-        probs[iTurn][numOccurences] = ProbabilityPredictor.probAtLeastXDice(numOccurences, numDice, numDieFaces)
+      probs = []
+      for face in range(1, numDieFaces + 1):
+        numHeld = heldHand.getCount(face)
+        probs.append(sum(rollProb * afterProbs[numHeld + j] for j, rollProb in enumerate(rollProbs)))
+      return np.array(probs)
+    
+    return ProbabilityPredictor._getCached("heldAtLeast", numDice, numDieFaces, heldValues, rollsRemaining,
+                                           (backend.name,), calcFn)
 
-    
-    
-    #probKind = Fraction(1,6)
-    
-    #diceCounts = pd.Series(diceValues).value_counts()
-    
-    #currNum = diceCounts.get(kind, 0)
-    #diceRemaining = numDice - currNum
-    
-    return probs
-    
-    
-    
\ No newline at end of file
+
+  @staticmethod
+  def ofAKind(kind, diceValues, turnsRemaining, numDieFaces=6, canHold=True, backend=None):
+    """
+    # Probability of ending the turn with at least 1-<numDice> of <kind> dice values
+    #  -e.g., with 5 dice, probability of getting at least 1, 2, 3, 4 or 5 "4"s
+    #  -returns a dict of number of occurrences: probability
+    #
+    # kind:           (int) dice value to look for
+    # diceValues:     (list) current dice values, None for dice not rolled yet
+    # turnsRemaining: (int) number of rolls left this turn
+    # canHold:        (bool) dice can be held between rolls
+    # backend:        (BACKEND) how to calculate, default is ProbabilityPredictor.backend
+    #
+    """
+    currentNum = Hand(diceValues).getCount(kind)
+    probs = ProbabilityPredictor.probAtLeastByEnd([currentNum], len(diceValues), numDieFaces, turnsRemaining,
+                                                  canHold, backend)[0]
+    return {numOccurrences: prob for numOccurrences, prob in enumerate(probs.tolist(), 1)}
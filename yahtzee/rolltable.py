@@ -0,0 +1,370 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import shutil
+import threading
+
+from math import factorial
+
+import numpy as np
+
+from model import Scorecard
+from scoretable import ScoreTable
+
+
+class RollTable:
+  """
+  # Where rerolling dice can lead, for a given dice configuration
+  #
+  # Rolling k dice gives an outcome: the sorted multiset of their values,
+  # with probability (its number of orderings) / faces^k. Holding some dice
+  # (a "keep") and rolling the rest gives the hand of the keep plus the
+  # outcome. For every keep size, the table has:
+  #  -the outcomes of rolling the rest of the dice, and their probabilities
+  #  -the rank of the hand each (keep, outcome) pair gives
+  #
+  # Keeps of every size, from none to all the dice, are numbered
+  # consecutively: a keep's index is the offset of its size plus its rank
+  # among keeps of that size.
+  #
+  # Tables are built on first use and cached, and can also be cached on disk
+  # so other processes don't have to build them again. A table cached on disk
+  # is a directory of .npy files, built into one keep size at a time, and
+  # memory-mapped when it's loaded, so it needn't fit in memory, and every
+  # process using it shares the same pages.
+  #
+  """
+
+  # bump when the layout of the cached arrays changes
+  CACHE_VERSION = 2
+
+  # number of (keep, outcome) pairs to rank at once when building a table
+  BUILD_CHUNK_SIZE = 2**18
+
+  # largest (keeps x hands) transition matrix to store densely; bigger
+  # configurations apply the transitions a chunk at a time
+  MAX_DENSE_TRANSITIONS = 2**22
+
+  # most values in a working array when applying the transitions a chunk at a time
+  MAX_WORKING_ELEMENTS = 2**20
+
+  # directory to cache tables in, if any; see setCacheDir
+  cacheDir = None
+
+  # tables that have already been built or loaded, by (numberOfDice, numberOfDiceFaces, cacheDir),
+  # and roll outcomes, by (numberOfRolled, numberOfDiceFaces)
+  #  -re-entrant, as building a table gets its roll outcomes
+  _tableCache     = {}
+  _outcomeCache   = {}
+  _tableCacheLock = threading.RLock()
+
+  @staticmethod
+  def setCacheDir(cacheDir):
+    """ Cache tables in <cacheDir> from now on, or None to only cache them in memory """
+    if cacheDir is not None:
+      os.makedirs(cacheDir, exist_ok=True)
+    RollTable.cacheDir = cacheDir
+
+  @staticmethod
+  def getTable(numberOfDice, numberOfDiceFaces, cacheDir=None):
+    """
+    # Get the table for this dice configuration, building or loading it on first use
+    #
+    # cacheDir: (str) directory to cache the table in, default is the one set
+    #           with setCacheDir
+    #
+    """
+
+    if cacheDir is None:
+      cacheDir = RollTable.cacheDir
+
+    key = (numberOfDice, numberOfDiceFaces, cacheDir)
+    with RollTable._tableCacheLock:
+      table = RollTable._tableCache.get(key, None)
+      if table is None:
+        table = RollTable(numberOfDice, numberOfDiceFaces, cacheDir)
+        RollTable._tableCache[key] = table
+    return table
+
+  @staticmethod
+  def countMaxKeeps(numberOfDice, numberOfDiceFaces):
+    """
+    # Most distinct keeps any hand has
+    #  -a hand with c_f dice showing each face f has prod(c_f + 1) keeps,
+    #   which is largest when the dice are spread as evenly as they can be
+    #   over as many faces as they can be
+    """
+    numberOfFaces = min(numberOfDice, numberOfDiceFaces)
+    perFace, extraDice = divmod(numberOfDice, numberOfFaces)
+    return (perFace + 2) ** extraDice * (perFace + 1) ** (numberOfFaces - extraDice)
+
+  @staticmethod
+  def getOutcomes(numberOfRolled, numberOfDiceFaces):
+    """
+    # Every outcome of rolling <numberOfRolled> dice, and its probability
+    #  -returns (numOutcomes x numberOfRolled) sorted dice values, in
+    #   lexicographic order, and their (numOutcomes) probabilities
+    #
+    """
+    key = (numberOfRolled, numberOfDiceFaces)
+    with RollTable._tableCacheLock:
+      outcomes = RollTable._outcomeCache.get(key, None)
+      if outcomes is None:
+
+        if numberOfRolled == 0:
+          diceValues = np.zeros((1, 0), dtype=np.int64)
+        else:
+          diceValues = ScoreTable._enumerateHands(numberOfRolled, numberOfDiceFaces).astype(np.int64) + 1
+
+        # multinomial probability of each outcome
+        diceCounts   = Scorecard.PointsCalculator.countDiceBatch(diceValues, numberOfDiceFaces)
+        numOrderings = np.array([factorial(numberOfRolled) // np.prod([factorial(x) for x in counts])
+                                 for counts in diceCounts.tolist()], dtype=np.float64)
+
+        outcomes = (diceValues, numOrderings / float(numberOfDiceFaces ** numberOfRolled))
+        RollTable._outcomeCache[key] = outcomes
+
+    return outcomes
+
+
+  def __init__(self, numberOfDice, numberOfDiceFaces, cacheDir=None):
+    """
+    #
+    # cacheDir: (str) directory to cache the table in, default is the one set
+    #           with setCacheDir
+    #
+    """
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.scoreTable        = ScoreTable.getTable(numberOfDice, numberOfDiceFaces)
+    self.cacheDir          = RollTable.cacheDir if cacheDir is None else cacheDir
+
+    # offset of the keeps of each size
+    self.keepOffsets   = np.cumsum([0] + [ScoreTable.countHands(keepSize, numberOfDiceFaces)
+                                          for keepSize in range(numberOfDice + 1)])
+    self.numberOfKeeps = int(self.keepOffsets[-1])
+
+    cacheLoc = self._getCacheLoc()
+    if cacheLoc is None:
+      logger.debug("RollTable: building table for {} dice, {} faces".format(numberOfDice, numberOfDiceFaces))
+      self._buildArrays()
+    else:
+      if not os.path.isdir(cacheLoc):
+        self._buildCache(cacheLoc)
+      self._loadArrays(cacheLoc)
+
+    # dense (keeps x hands) transition matrix, built when first needed
+    self._transitionMatrix = None
+
+
+  ###########################################################################
+  # building
+  ###########################################################################
+
+  @staticmethod
+  def _createArray(arrayDir, arrayName, shape, dtype):
+    """ New array, in memory or, given <arrayDir>, in a memory-mapped .npy file there """
+    if arrayDir is None:
+      return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(os.path.join(arrayDir, "{}.npy".format(arrayName)), mode="w+",
+                                     dtype=dtype, shape=shape)
+
+  def _getKeeps(self, keepSize):
+    """ The dice of every keep of <keepSize> dice, in rank order """
+    if keepSize == 0:
+      return np.zeros((1, 0), dtype=np.uint8)
+
+    lexKeeps = ScoreTable._enumerateHands(keepSize, self.numberOfDiceFaces) + 1
+    keeps = np.empty_like(lexKeeps)
+    for iStart in range(0, len(lexKeeps), RollTable.BUILD_CHUNK_SIZE):
+      lexChunk = lexKeeps[iStart:iStart + RollTable.BUILD_CHUNK_SIZE]
+      keeps[self.scoreTable._rankZeroBased(lexChunk - 1)] = lexChunk
+    return keeps
+
+  def _buildArrays(self, arrayDir=None):
+    """
+    # Build the transitions and the keeps of each hand
+    #  -built one keep size, and one chunk, at a time, so with <arrayDir>,
+    #   where the arrays are memory-mapped files, only a chunk needs to fit
+    #   in memory
+    #
+    """
+
+    table = self.scoreTable
+
+    # for each keep size: the hand reached by each (keep, outcome) pair, and
+    # the probability of each outcome
+    self.transitions = []
+    for keepSize in range(self.numberOfDice + 1):
+      keeps = self._getKeeps(keepSize)
+      outcomes, outcomeProbs = RollTable.getOutcomes(self.numberOfDice - keepSize, self.numberOfDiceFaces)
+
+      nextHands = RollTable._createArray(arrayDir, "nextHands{}".format(keepSize), (len(keeps), len(outcomes)),
+                                         np.int32)
+      keepsPerChunk = max(1, RollTable.BUILD_CHUNK_SIZE // len(outcomes))
+      outcomesPerChunk = RollTable.BUILD_CHUNK_SIZE // keepsPerChunk
+      for iStart in range(0, len(keeps), keepsPerChunk):
+        keepChunk = keeps[iStart:iStart + keepsPerChunk].astype(np.int64)
+        for oStart in range(0, len(outcomes), outcomesPerChunk):
+          outcomeChunk = outcomes[oStart:oStart + outcomesPerChunk]
+          combined = np.concatenate([np.repeat(keepChunk, len(outcomeChunk), axis=0),
+                                     np.tile(outcomeChunk, (len(keepChunk), 1))], axis=1)
+          nextHands[iStart:iStart + len(keepChunk), oStart:oStart + len(outcomeChunk)] =\
+            table.rankHands(combined).reshape(len(keepChunk), -1)
+
+      if arrayDir is not None:
+        probsArray = RollTable._createArray(arrayDir, "outcomeProbs{}".format(keepSize), outcomeProbs.shape,
+                                            outcomeProbs.dtype)
+        probsArray[:] = outcomeProbs
+        outcomeProbs = probsArray
+      self.transitions.append((nextHands, outcomeProbs))
+
+    # the keeps that can be made from each hand, found by trying every subset
+    # of the (sorted) dice
+    #  -identical subsets of repeated dice give the same keep, so each hand's
+    #   duplicates are replaced by its smallest keep, and only as many
+    #   columns as the hand with the most distinct keeps are kept
+    keepMasks = range(2 ** self.numberOfDice)
+    numHands  = table.numberOfHands
+    maxKeeps  = RollTable.countMaxKeeps(self.numberOfDice, self.numberOfDiceFaces)
+    handsPerChunk = max(1, RollTable.BUILD_CHUNK_SIZE // len(keepMasks))
+    self.handKeeps = RollTable._createArray(arrayDir, "handKeeps", (numHands, maxKeeps), np.int32)
+    for iStart in range(0, numHands, handsPerChunk):
+      hands = table.hands[iStart:iStart + handsPerChunk].astype(np.int64) - 1
+      handKeeps = np.empty((len(hands), len(keepMasks)), dtype=np.int64)
+      for keepMask in keepMasks:
+        positions = [iDice for iDice in range(self.numberOfDice) if keepMask & (1 << iDice)]
+        keepRanks = table._rankZeroBased(hands[:, positions]) if positions else 0
+        handKeeps[:, keepMask] = self.keepOffsets[len(positions)] + keepRanks
+
+      handKeeps.sort(axis=1)
+      isDuplicate = np.zeros(handKeeps.shape, dtype=bool)
+      isDuplicate[:, 1:] = handKeeps[:, 1:] == handKeeps[:, :-1]
+      handKeeps[isDuplicate] = np.broadcast_to(handKeeps[:, :1], handKeeps.shape)[isDuplicate]
+      handKeeps.sort(axis=1)
+      self.handKeeps[iStart:iStart + len(hands)] = handKeeps[:, -maxKeeps:]
+
+  def _getCacheLoc(self):
+    """ Directory this table is cached in, if caching on disk """
+    if self.cacheDir is None:
+      return None
+    return os.path.join(self.cacheDir, "rolltable-{}d{}-v{}".format(
+      self.numberOfDice, self.numberOfDiceFaces, RollTable.CACHE_VERSION))
+
+  def _buildCache(self, cacheLoc):
+    """ Build the arrays into files in <cacheLoc>; written next to it and moved into place """
+    logger.info("RollTable: building table for {} dice, {} faces in {}".format(
+      self.numberOfDice, self.numberOfDiceFaces, cacheLoc))
+
+    tempLoc = "{}.{}.tmp".format(cacheLoc, os.getpid())
+    os.makedirs(tempLoc, exist_ok=True)
+    self._buildArrays(tempLoc)
+    for array in [self.handKeeps] + [x for transition in self.transitions for x in transition]:
+      array.flush()
+
+    try:
+      os.rename(tempLoc, cacheLoc)
+
+    # another process cached the table first
+    except OSError:
+      shutil.rmtree(tempLoc)
+
+  def _loadArrays(self, cacheLoc):
+    """ Memory-map the arrays cached in <cacheLoc> """
+    logger.debug("RollTable: loading table from {}".format(cacheLoc))
+
+    def loadArray(arrayName):
+      return np.load(os.path.join(cacheLoc, "{}.npy".format(arrayName)), mmap_mode="r")
+
+    self.handKeeps = loadArray("handKeeps")
+    self.transitions = [(loadArray("nextHands{}".format(keepSize)), loadArray("outcomeProbs{}".format(keepSize)))
+                        for keepSize in range(self.numberOfDice + 1)]
+
+  def isMapped(self):
+    """ Whether the arrays are memory-mapped from the disk cache, so shared by every process using it """
+    return self.cacheDir is not None
+
+  def getArrayBytes(self):
+    """ Bytes of the transitions and the keeps of each hand """
+    arrays = [self.handKeeps] + [x for transition in self.transitions for x in transition]
+    return sum(x.nbytes for x in arrays)
+
+
+  ###########################################################################
+  # lookups
+  ###########################################################################
+
+  def getKeepIndex(self, heldDice):
+    """ Index of the keep of <heldDice>, in any order """
+    return int(self.keepOffsets[len(heldDice)]) + self.scoreTable.rankHand(heldDice)
+
+  def getTransitionMatrix(self):
+    """
+    # Dense (keeps x hands) matrix of the probability each keep leads to
+    # each hand, or None if it's too big to store
+    """
+    if self._transitionMatrix is None and\
+       self.numberOfKeeps * self.scoreTable.numberOfHands <= RollTable.MAX_DENSE_TRANSITIONS:
+      transitionMatrix = np.zeros((self.numberOfKeeps, self.scoreTable.numberOfHands))
+      for keepSize, (nextHands, outcomeProbs) in enumerate(self.transitions):
+        keepIndices = np.arange(self.keepOffsets[keepSize], self.keepOffsets[keepSize+1])
+        np.add.at(transitionMatrix, (keepIndices[:, np.newaxis], nextHands), outcomeProbs)
+      self._transitionMatrix = transitionMatrix
+    return self._transitionMatrix
+
+  def getKeepOutcomes(self, keepIndex):
+    """ Hands the keep at <keepIndex> leads to, and their probabilities """
+    keepSize = int(np.searchsorted(self.keepOffsets, keepIndex, side="right")) - 1
+    nextHands, outcomeProbs = self.transitions[keepSize]
+    return nextHands[keepIndex - self.keepOffsets[keepSize]], outcomeProbs
+
+
+  ###########################################################################
+  # calculations
+  ###########################################################################
+
+  def expectKeepValues(self, handValues):
+    """
+    # Expected value of every keep, given the value of every hand after the roll
+    #
+    # handValues: (array) numberOfHands x C values
+    #
+    """
+    transitionMatrix = self.getTransitionMatrix()
+    if transitionMatrix is not None:
+      return transitionMatrix @ handValues
+
+    # add up the outcomes a block of (keeps, outcomes) at a time, to keep the
+    # working arrays small and read the transitions in order
+    numColumns = int(np.prod(handValues.shape[1:]))
+    keepValues = np.zeros((self.numberOfKeeps,) + handValues.shape[1:])
+    for keepSize, (nextHands, outcomeProbs) in enumerate(self.transitions):
+      sizeValues = keepValues[self.keepOffsets[keepSize]:self.keepOffsets[keepSize+1]]
+      outcomesPerChunk = max(1, min(len(outcomeProbs), RollTable.MAX_WORKING_ELEMENTS // numColumns))
+      keepsPerChunk    = max(1, RollTable.MAX_WORKING_ELEMENTS // (outcomesPerChunk * numColumns))
+      for iStart in range(0, len(sizeValues), keepsPerChunk):
+        chunkValues = sizeValues[iStart:iStart + keepsPerChunk]
+        for oStart in range(0, len(outcomeProbs), outcomesPerChunk):
+          chunkHands = nextHands[iStart:iStart + keepsPerChunk, oStart:oStart + outcomesPerChunk]
+          chunkValues += np.tensordot(handValues[chunkHands], outcomeProbs[oStart:oStart + outcomesPerChunk],
+                                      axes=([1], [0]))
+    return keepValues
+
+  def bestKeepValues(self, keepValues):
+    """ Value of every hand when keeping the best subset of its dice """
+
+    # a chunk of hands at a time, to keep the working array small and read
+    # the keeps in order
+    numHands, maxKeeps = self.handKeeps.shape
+    handsPerChunk = max(1, RollTable.MAX_WORKING_ELEMENTS // (maxKeeps * int(np.prod(keepValues.shape[1:]))))
+    handValues = np.empty((numHands,) + keepValues.shape[1:], dtype=keepValues.dtype)
+    for iStart in range(0, numHands, handsPerChunk):
+      np.max(keepValues[self.handKeeps[iStart:iStart + handsPerChunk]], axis=1,
+             out=handValues[iStart:iStart + handsPerChunk])
+    return handValues
+
+  def expectRollValues(self, handValues):
+    """ Expected value of rolling all the dice, given the value of every hand after the roll """
+    nextHands, outcomeProbs = self.transitions[0]
+    return outcomeProbs @ handValues[nextHands[0]]
@@ -0,0 +1,175 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+
+from math import comb
+
+import numpy as np
+
+from model import Scorecard
+
+
+class ScoreTable:
+  """
+  # Raw score of every scorecard row for every distinct hand of a given
+  # dice configuration
+  #  -a hand is the sorted multiset of dice values, so the order the dice
+  #   were rolled in doesn't matter
+  #  -hands are indexed by their rank, so scoring becomes a lookup
+  #  -scores are "raw", i.e., they don't take the scorecard-dependent joker
+  #   and yahtzee bonus rules into account
+  #
+  """
+
+  # number of hands to score at once when building a table
+  BUILD_CHUNK_SIZE = 2**18
+
+  # most hands a table can have for Scorecard.PointsCalculator to look
+  # scores up in; bigger configurations, e.g., 9 20-sided dice, take too
+  # long to build and too much memory to keep just for scoring a game
+  MAX_LOOKUP_HANDS = 2**20
+
+  # tables that have already been built, by (numberOfDice, numberOfDiceFaces)
+  _tableCache     = {}
+  _tableCacheLock = threading.Lock()
+
+  @staticmethod
+  def getTable(numberOfDice, numberOfDiceFaces):
+    """ Get the table for this dice configuration, building it on first use """
+
+    key = (numberOfDice, numberOfDiceFaces)
+    with ScoreTable._tableCacheLock:
+      table = ScoreTable._tableCache.get(key, None)
+      if table is None:
+        table = ScoreTable(numberOfDice, numberOfDiceFaces)
+        ScoreTable._tableCache[key] = table
+    return table
+
+
+  @staticmethod
+  def countHands(numberOfDice, numberOfDiceFaces):
+    """ Number of distinct hands of <numberOfDice> dice with <numberOfDiceFaces> sides """
+    return comb(numberOfDiceFaces + numberOfDice - 1, numberOfDice)
+
+
+  @staticmethod
+  def _binomialTable(maxN, maxK):
+    """ (maxN+1 x maxK+2) table of binomial coefficients C(n, k) """
+    binomial = np.zeros((maxN + 1, maxK + 2), dtype=np.int64)
+    binomial[:, 0] = 1
+    for n in range(1, maxN + 1):
+      binomial[n, 1:] = binomial[n-1, 1:] + binomial[n-1, :-1]
+    return binomial
+
+
+  @staticmethod
+  def _enumerateHands(numberOfDice, numberOfDiceFaces):
+    """
+    # Every sorted hand in lexicographic order
+    #  -returns (numHands x numberOfDice) array of 0-based dice values
+    """
+
+    hands = np.arange(numberOfDiceFaces, dtype=np.uint8).reshape(-1, 1)
+
+    # add one die at a time, each new die being at least the value of the last
+    for _ in range(numberOfDice - 1):
+      lastDie   = hands[:, -1].astype(np.int64)
+      numRepeat = numberOfDiceFaces - lastDie
+
+      # position of each new row within the block of rows its parent creates
+      blockStarts = np.repeat(np.cumsum(numRepeat) - numRepeat, numRepeat)
+      newDie      = np.repeat(lastDie, numRepeat) + np.arange(blockStarts.size) - blockStarts
+
+      hands = np.column_stack([np.repeat(hands, numRepeat, axis=0), newDie.astype(np.uint8)])
+
+    return hands
+
+
+  def __init__(self, numberOfDice, numberOfDiceFaces):
+    logger.debug("ScoreTable: building table for {} dice, {} faces".format(numberOfDice, numberOfDiceFaces))
+
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+
+    # scorable rows, i.e., no totals or bonuses, in scorecard order
+    self.rowNames   = Scorecard(numberOfDiceFaces).getFreeRows()
+    self.rowIndices = {rowName: iRow for iRow, rowName in enumerate(self.rowNames)}
+    self.yahtzeeIndex = self.rowIndices[Scorecard.ROW_NAME.YAHTZEE.value]
+
+    # binomial coefficients used to rank hands
+    #  -also as lists, which are quicker to index one hand at a time
+    self._binomial     = ScoreTable._binomialTable(numberOfDiceFaces + numberOfDice, numberOfDice)
+    self._binomialRows = self._binomial.tolist()
+    self.numberOfHands = ScoreTable.countHands(numberOfDice, numberOfDiceFaces)
+
+    # every hand, stored in rank order
+    lexHands = ScoreTable._enumerateHands(numberOfDice, numberOfDiceFaces)
+    self.hands = np.empty_like(lexHands)
+    self.hands[self._rankZeroBased(lexHands)] = lexHands + 1
+    del lexHands
+
+    # score every hand in every row
+    #  -all scores fit in a byte for the supported configurations
+    maxScore   = max(numberOfDice * numberOfDiceFaces, max(x.value for x in Scorecard.POINTS))
+    scoreDtype = np.min_scalar_type(maxScore)
+
+    self.scores = np.empty((self.numberOfHands, len(self.rowNames)), dtype=scoreDtype)
+    for iStart in range(0, self.numberOfHands, ScoreTable.BUILD_CHUNK_SIZE):
+      handChunk  = self.hands[iStart:iStart + ScoreTable.BUILD_CHUNK_SIZE]
+      diceCounts = Scorecard.PointsCalculator.countDiceBatch(handChunk, numberOfDiceFaces)
+      self.scores[iStart:iStart + len(handChunk)] =\
+        Scorecard.PointsCalculator.calculateRawBatch(self.rowNames, diceCounts, numberOfDice)
+
+
+  def _rankZeroBased(self, sortedHands):
+    """
+    # Rank of each sorted hand of 0-based dice values
+    #  -uses the combinatorial number system: making the sorted values
+    #   strictly increasing (value + position) turns each hand into a unique
+    #   combination, whose rank is the sum of binomial coefficients
+    """
+    positions = np.arange(sortedHands.shape[1])
+    return self._binomial[sortedHands.astype(np.int64) + positions, positions + 1].sum(axis=1)
+
+
+  def rankHands(self, diceArray):
+    """
+    # Rank of every hand in <diceArray>
+    #
+    # diceArray: (array) N x numberOfDice dice values, in any order
+    #
+    """
+    diceArray = np.sort(np.asarray(diceArray, dtype=np.int64), axis=1)
+    return self._rankZeroBased(diceArray - 1)
+
+  def rankHand(self, diceValues):
+    """ Rank of a single hand of <diceValues>, in any order """
+    rank = 0
+    for position, diceValue in enumerate(sorted(diceValues)):
+      rank += self._binomialRows[diceValue - 1 + position][position + 1]
+    return rank
+
+  def getHand(self, rank):
+    """ Sorted dice values of the hand with this <rank> """
+    return tuple(self.hands[rank].tolist())
+
+  def getRowIndex(self, rowName):
+    """ Column of <rowName> in the score table """
+    try:
+      return self.rowIndices[rowName]
+    except KeyError:
+      raise KeyError("Unknown rowName was given: {}".format(rowName))
+
+  def getRowScores(self, diceValues, rowNameList=None):
+    """
+    # Raw score in each row of <rowNameList> for <diceValues>
+    #
+    # diceValues:  (list) of dice values to use
+    # rowNameList: (list) name of rows to look up, default is all rows
+    #
+    """
+    handScores = self.scores[self.rankHand(diceValues)]
+    if rowNameList is None:
+      rowNameList = self.rowNames
+    return {rowName: int(handScores[self.getRowIndex(rowName)]) for rowName in rowNameList}
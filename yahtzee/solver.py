@@ -0,0 +1,649 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import math
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from evtable import EVTable
+from layerstore import LayerStore
+from model import Game, Scorecard
+from rolltable import RollTable
+from scoretable import ScoreTable
+
+
+###########################################################################
+# worker processes
+###########################################################################
+
+# each worker process has its own solver, and a view of the shared state values
+_workerSolver = None
+_workerValues = None
+_workerMemory = None
+
+def _attachSharedMemory(name):
+  """ Attach to an existing shared memory block, leaving its cleanup to its creator """
+  try:
+    return shared_memory.SharedMemory(name=name, track=False)
+  except TypeError:
+    # before python 3.13, attaching also registers the block to be removed
+    # when this process exits
+    memory = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(memory._name, "shared_memory")
+    return memory
+
+def _initWorker(gameConfig, memoryName, valuesShape, storeDir=None, rollCacheDir=None):
+  """
+  # Set up a worker process to solve blocks of states
+  #  -values are in the shared memory block <memoryName>, or, out of core,
+  #   in the layer files in <storeDir>
+  #  -roll tables are memory-mapped from <rollCacheDir>, if given, so every
+  #   worker shares them
+  """
+  global _workerSolver, _workerValues, _workerMemory
+  RollTable.setCacheDir(rollCacheDir)
+  _workerSolver = StrategySolver(*gameConfig)
+  if storeDir is not None:
+    _workerValues = _workerSolver._createLayerStore(storeDir)
+  else:
+    _workerMemory = _attachSharedMemory(memoryName)
+    _workerValues = np.ndarray(valuesShape, dtype=np.float64, buffer=_workerMemory.buf)
+
+def _solveWorkerBlock(freeRowMasks, upperTotalSlice):
+  """ Solve a block of states in a worker process, writing the values to the shared values """
+  blockValues = _workerSolver._solveStates(freeRowMasks, _workerValues, upperTotalSlice)
+  _workerValues[freeRowMasks, upperTotalSlice] = blockValues
+  return blockValues.size / (2 * _workerSolver.numberOfUpperTotals)
+
+
+class StrategySolver:
+  """
+  # Optimal solitaire strategy, found by backward induction over the
+  # scorecard states
+  #
+  # A state is what matters about a scorecard for the rest of the game:
+  #  -which rows are still free, as a bitmask in ScoreTable row order
+  #  -the upper section total, capped at the upper bonus threshold
+  #  -whether a yahtzee has been scored, i.e., if the joker and yahtzee
+  #   bonus rules apply
+  #
+  # The value of a state is the expected score still to come when a turn
+  # starts in that state, playing optimally. States are solved in order of
+  # the number of free rows, as each only depends on states with one fewer.
+  #
+  """
+
+  # max number of float values in a working array when solving a batch of states
+  MAX_BATCH_ELEMENTS = 2**20
+
+  # seconds between progress messages while solving a layer
+  PROGRESS_LOG_INTERVAL = 60
+
+  def __init__(self, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3):
+
+    # CHECK: game config is valid
+    if not (Game.MIN_NUM_DICE <= numberOfDice <= Game.MAX_NUM_DICE):
+      raise ValueError(
+        "number of dice must be between {} and {}".format(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE))
+    if not (Game.MIN_DICE_FACES <= numberOfDiceFaces <= Game.MAX_DICE_FACES):
+      raise ValueError(
+        "number of dice faces must be between {} and {}".format(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES))
+    if not (Game.MIN_NUM_ROLLS <= numberOfRolls <= Game.MAX_NUM_ROLLS):
+      raise ValueError(
+        "number of dice rolls must be between {} and {}".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
+
+    self.numberOfDice      = numberOfDice
+    self.numberOfDiceFaces = numberOfDiceFaces
+    self.numberOfRolls     = numberOfRolls
+
+    # scores of every hand in every row
+    self.scoreTable   = ScoreTable.getTable(numberOfDice, numberOfDiceFaces)
+    self.rowNames     = self.scoreTable.rowNames
+    self.numberOfRows = len(self.rowNames)
+
+    # upper section totals are capped at the bonus threshold, as any more
+    # makes no difference to the rest of the game
+    self.upperBonusThreshold = sum(range(1, numberOfDiceFaces + 1)) * 3
+    self.numberOfUpperTotals = self.upperBonusThreshold + 1
+
+    # expected value of each state, indexed by [freeRowMask, upperTotal, yahtzeeScored]
+    self.values = None
+
+    # where rerolling dice can lead
+    self.rollTable = RollTable.getTable(numberOfDice, numberOfDiceFaces)
+
+    self._createHandInfo()
+
+
+  ###########################################################################
+  # setup
+  ###########################################################################
+
+  def _createHandInfo(self):
+    """ Scores of each hand, taking the joker rules into account """
+
+    table = self.scoreTable
+
+    self.yahtzeeRowIndex = table.getRowIndex(Scorecard.ROW_NAME.YAHTZEE.value)
+
+    # the hand of all-<face> dice, for each face
+    self.yahtzeeHands = np.array([table.rankHand([face] * self.numberOfDice)
+                                  for face in range(1, self.numberOfDiceFaces + 1)])
+    self.isYahtzeeHand = np.zeros(table.numberOfHands, dtype=bool)
+    self.isYahtzeeHand[self.yahtzeeHands] = True
+
+    # with the joker, a yahtzee scores max points in the joker-eligible rows
+    #  -see _getRowScores
+    self.jokerRowScores = {
+      table.getRowIndex(Scorecard.ROW_NAME.FULL_HOUSE.value):     Scorecard.POINTS.FULL_HOUSE.value,
+      table.getRowIndex(Scorecard.ROW_NAME.SMALL_STRAIGHT.value): Scorecard.POINTS.SMALL_STRAIGHT.value,
+      table.getRowIndex(Scorecard.ROW_NAME.LARGE_STRAIGHT.value): Scorecard.POINTS.LARGE_STRAIGHT.value,
+    }
+
+  def _getRowScores(self, iRow):
+    """
+    # Scores of each hand in row <iRow> when the joker rules don't (y=0) and
+    # do (y=1) apply, as a (numberOfHands x 2) array
+    #  -made a row at a time, as every row's would be too big to keep for
+    #    the biggest configurations
+    """
+    rowScores = np.repeat(self.scoreTable.scores[:, iRow, np.newaxis].astype(np.float64), 2, axis=1)
+    if iRow in self.jokerRowScores:
+      rowScores[self.yahtzeeHands, 1] = self.jokerRowScores[iRow]
+    return rowScores
+
+
+  ###########################################################################
+  # turn calculations
+  ###########################################################################
+
+  def _turnStartValues(self, finalHandValues):
+    """
+    # Expected value at the start of a turn, i.e., before the first roll
+    #
+    # finalHandValues: (array) numberOfHands x C values of each hand once
+    #                  it has to be scored
+    #
+    """
+    rollTable  = self.rollTable
+    handValues = finalHandValues
+    for _ in range(self.numberOfRolls - 1):
+      handValues = rollTable.bestKeepValues(rollTable.expectKeepValues(handValues))
+
+    # first roll is always all the dice
+    return rollTable.expectRollValues(handValues)
+
+
+  def _scoreHandValues(self, freeRowMasks, values, upperTotalSlice=slice(None)):
+    """
+    # Value of scoring each hand in the best row, for a batch of states
+    #  -returns an (M x numberOfHands x T x 2) array
+    #
+    # freeRowMasks:    (array) M free row masks, all with the same number of free rows
+    # values:          (array) state values, solved for every state with fewer free rows
+    # upperTotalSlice: (slice) the T upper totals to score for, default is all of them
+    #
+    """
+
+    numMasks  = len(freeRowMasks)
+    numHands  = self.scoreTable.numberOfHands
+    threshold = self.upperBonusThreshold
+    upperTotals = np.arange(self.numberOfUpperTotals)[upperTotalSlice]
+
+    bestValues   = np.full((numMasks, numHands, len(upperTotals), 2), -np.inf)
+    rowValues    = np.empty_like(bestValues)
+    forcedValues = []
+
+    for iRow in range(self.numberOfRows):
+
+      # states where this row is free, and the states they move to
+      #  -values are worked out for every state, but only used where the row is free
+      rowIsFree = (freeRowMasks >> iRow) & 1 == 1
+      if not rowIsFree.any():
+        continue
+
+      # states where the row isn't free look up any next state in the same
+      # layer, so the lookup works for layered values too
+      nextMasks = freeRowMasks ^ (1 << iRow)
+      nextMasks = np.where(rowIsFree, nextMasks, nextMasks[np.argmax(rowIsFree)])
+
+      # values loaded from a table may be stored at a lower precision
+      nextValues = values[nextMasks].astype(np.float64, copy=False)
+
+      # upper section: the upper total moves on, and may earn the bonus
+      if iRow < self.numberOfDiceFaces:
+        rowScore   = self._getRowScores(iRow)[:, 0]
+        newTotals  = np.minimum(upperTotals + rowScore[:, np.newaxis], threshold).astype(np.int64)
+        earnsBonus = (upperTotals < threshold) & (upperTotals + rowScore[:, np.newaxis] >= threshold)
+        immediate  = rowScore[:, np.newaxis] + earnsBonus * Scorecard.POINTS.UPPER_BONUS.value
+        np.take(nextValues, newTotals, axis=1, out=rowValues)
+        rowValues += immediate[np.newaxis, :, :, np.newaxis]
+
+        # a joker must be scored in its own upper row if that row is free
+        yahtzeeHand = self.yahtzeeHands[iRow]
+        forcedValues.append((rowIsFree, yahtzeeHand, rowValues[rowIsFree, yahtzeeHand, :, 1]))
+
+      # yahtzee: scoring 50 makes the joker rules apply from then on
+      elif iRow == self.yahtzeeRowIndex:
+        rowScore = self._getRowScores(iRow)[:, 0]
+        nextFlag = self.isYahtzeeHand.astype(np.int64)
+        np.add(rowScore[np.newaxis, :, np.newaxis, np.newaxis],
+               np.transpose(nextValues[:, upperTotalSlice][:, :, nextFlag], (0, 2, 1))[:, :, :, np.newaxis],
+               out=rowValues)
+
+      # rest of the lower section
+      else:
+        rowScore = self._getRowScores(iRow)
+        np.add(rowScore[np.newaxis, :, np.newaxis, :], nextValues[:, np.newaxis, upperTotalSlice, :], out=rowValues)
+
+      np.maximum(bestValues, rowValues, out=bestValues, where=rowIsFree[:, np.newaxis, np.newaxis, np.newaxis])
+
+    # apply the joker's forced upper section rows
+    for rowIsFree, yahtzeeHand, forcedRowValues in forcedValues:
+      bestValues[rowIsFree, yahtzeeHand, :, 1] = forcedRowValues
+
+    # every yahtzee after the first earns the yahtzee bonus
+    bestValues[:, self.yahtzeeHands, :, 1] += Scorecard.POINTS.YAHTZEE_BONUS.value
+
+    return bestValues
+
+
+  def _solveStates(self, freeRowMasks, values, upperTotalSlice=slice(None)):
+    """
+    # Solve a batch of states, all with the same number of free rows
+    #  -returns the (M x T x 2) state values, for the T upper totals in
+    #   <upperTotalSlice>
+    """
+
+    finalValues = self._scoreHandValues(freeRowMasks, values, upperTotalSlice)
+
+    # treat every (state, upper total, yahtzee) as a column
+    blockShape = (finalValues.shape[0], finalValues.shape[2], 2)
+    finalValues = np.moveaxis(finalValues, 1, 0).reshape(self.scoreTable.numberOfHands, -1)
+
+    return self._turnStartValues(finalValues).reshape(blockShape)
+
+
+  ###########################################################################
+  # solving
+  ###########################################################################
+
+  def getLayerMasks(self, numberOfFreeRows):
+    """ All the free row masks with <numberOfFreeRows> free rows, in increasing order """
+    return LayerStore.getLayerMasks(self.numberOfRows, numberOfFreeRows)
+
+  def getBatchSize(self):
+    """ Number of states to solve at once """
+    statesPerMask = self.scoreTable.numberOfHands * self.numberOfUpperTotals * 2
+    return max(1, StrategySolver.MAX_BATCH_ELEMENTS // statesPerMask)
+
+  @staticmethod
+  def getRollCacheDir(checkpointDir):
+    """ Where the roll tables are cached when solving out of core, if they aren't cached anywhere else """
+    return os.path.join(checkpointDir, "rolltables")
+
+  def getTableMemory(self):
+    """
+    # Bytes of the tables used to solve, as (private bytes, shared bytes)
+    #  -private tables are each worker's own: the hand scores, the working
+    #   arrays for applying the transitions, and the roll tables themselves
+    #   when they're in memory
+    #  -shared tables are the roll tables when they're memory-mapped from the
+    #   roll table cache, as every worker maps the same pages
+    """
+    rollTable = self.rollTable
+    privateBytes = self.scoreTable.hands.nbytes + self.scoreTable.scores.nbytes
+    privateBytes += 8 * (2 * self.scoreTable.numberOfHands + RollTable.MAX_WORKING_ELEMENTS)
+    if rollTable.getTransitionMatrix() is not None:
+      privateBytes += rollTable.getTransitionMatrix().nbytes
+
+    if rollTable.isMapped():
+      return privateBytes, rollTable.getArrayBytes()
+    return privateBytes + rollTable.getArrayBytes(), 0
+
+  def getBlockShape(self, memoryBudget=None, numberOfWorkers=1):
+    """
+    # Number of masks, and of upper totals, to solve at once
+    #  -a block of states is every (mask, upper total, yahtzeeScored) for its
+    #   masks and upper totals
+    #  -with a memory budget, blocks are made as big as will fit alongside the
+    #   tables; when one mask's states are too many, they're split up by upper
+    #   total
+    #  -each worker's private tables count against the budget once per worker,
+    #   and the shared roll tables once; if the shared tables don't fit, they're
+    #   left to be paged in from disk as they're needed
+    #
+    # memoryBudget:    (int) bytes the workers can use, or None for the default batch size
+    # numberOfWorkers: (int) number of workers sharing the budget
+    #
+    """
+    if memoryBudget is None:
+      return self.getBatchSize(), self.numberOfUpperTotals
+
+    # each state needs a few values per hand to score it, and one per keep
+    # to find its best keeps
+    bytesPerState = 8 * (4 * self.scoreTable.numberOfHands + 2 * self.rollTable.numberOfKeeps)
+    privateBytes, sharedBytes = self.getTableMemory()
+    minWorkerBytes = privateBytes + 2 * bytesPerState
+
+    # CHECK: there's room for each worker's tables and at least one upper total of one mask
+    if memoryBudget // numberOfWorkers < minWorkerBytes:
+      raise ValueError("memory budget is too small; each worker needs at least {} MB".format(
+        math.ceil(minWorkerBytes / 2**20)))
+
+    if memoryBudget - sharedBytes >= numberOfWorkers * minWorkerBytes:
+      memoryBudget -= sharedBytes
+    else:
+      logger.warning("getBlockShape: the {} MB of roll tables don't fit in the memory budget, so they'll be "
+                     "read from disk as they're needed".format(math.ceil(sharedBytes / 2**20)))
+    numStates = (memoryBudget // numberOfWorkers - privateBytes) // bytesPerState
+
+    statesPerMask = self.numberOfUpperTotals * 2
+    if numStates >= statesPerMask:
+      return int(numStates // statesPerMask), self.numberOfUpperTotals
+    return 1, int(numStates // 2)
+
+  def _solveLayer(self, numberOfFreeRows, values, executor=None, numberOfWorkers=1, blockShape=None):
+    """
+    # Solve every state with <numberOfFreeRows> free rows
+    #
+    # values:          (array) state values, solved for every state with fewer
+    #                  free rows, or a LayerStore
+    # executor:        (ProcessPoolExecutor) pool to solve blocks in, whose workers
+    #                  share <values>, or None to solve them in this process
+    # numberOfWorkers: (int) number of workers in the pool
+    # blockShape:      (tuple) max (masks, upper totals) to solve at once,
+    #                  default is from getBlockShape
+    #
+    """
+
+    layerMasks = self.getLayerMasks(numberOfFreeRows)
+
+    # give every worker something to do on the small layers
+    masksPerBlock, totalsPerBlock = self.getBlockShape() if blockShape is None else blockShape
+    masksPerBlock = min(masksPerBlock, math.ceil(len(layerMasks) / numberOfWorkers))
+    blocks = [(layerMasks[iStart:iStart + masksPerBlock], slice(uStart, uStart + totalsPerBlock))
+              for iStart in range(0, len(layerMasks), masksPerBlock)
+              for uStart in range(0, self.numberOfUpperTotals, totalsPerBlock)]
+
+    if executor is None:
+      completed = ((block, self._solveStates(block[0], values, block[1])) for block in blocks)
+    else:
+      completed = ((None, future.result())
+                   for future in as_completed([executor.submit(_solveWorkerBlock, *x) for x in blocks]))
+
+    startTime = lastLogTime = time.time()
+    numSolved = 0
+    for block, result in completed:
+
+      # workers write their values directly into the shared values
+      if block is None:
+        numSolved += result
+      else:
+        values[block[0], block[1]] = result
+        numSolved += result.size / (2 * self.numberOfUpperTotals)
+
+      if time.time() - lastLogTime >= StrategySolver.PROGRESS_LOG_INTERVAL:
+        lastLogTime = time.time()
+        elapsed = lastLogTime - startTime
+        logger.info("solve: layer {}/{}: {:.0f}/{} states, about {:.0f}s left".format(
+          numberOfFreeRows, self.numberOfRows, numSolved, len(layerMasks),
+          elapsed * (len(layerMasks) - numSolved) / max(numSolved, 1e-9)))
+
+    return len(layerMasks)
+
+  def _saveCheckpoint(self, checkpointDir, numberOfFreeRows, values):
+    """ Save the solved values of a layer, at full precision """
+    layerValues = values[self.getLayerMasks(numberOfFreeRows)]
+    EVTable.write(LayerStore.getLayerLoc(checkpointDir, numberOfFreeRows), layerValues,
+                  self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls, dtype=np.float64)
+
+  def _getCheckpointLocs(self, checkpointDir):
+    """ Files a layer could be checkpointed in, complete or not """
+    for numberOfFreeRows in range(1, self.numberOfRows + 1):
+      checkpointLoc = LayerStore.getLayerLoc(checkpointDir, numberOfFreeRows)
+      yield checkpointLoc
+      yield EVTable.getTempLoc(checkpointLoc)
+
+  def hasCheckpoints(self, checkpointDir):
+    """ Whether <checkpointDir> has any checkpointed layers, complete or not """
+    return any(os.path.exists(fileLoc) for fileLoc in self._getCheckpointLocs(checkpointDir))
+
+  def clearCheckpoints(self, checkpointDir):
+    """ Remove any checkpointed layers, complete or not, from <checkpointDir> """
+    for fileLoc in self._getCheckpointLocs(checkpointDir):
+      if os.path.exists(fileLoc):
+        os.remove(fileLoc)
+
+  def _loadCheckpoints(self, checkpointDir, values):
+    """
+    # Load the checkpointed layers from <checkpointDir> into <values>
+    #  -layers are loaded in order, up to the first one that isn't there
+    #  -raises ValueError if a checkpoint is for a different config or
+    #   scoring rules, or is corrupt
+    #  -returns the number of layers loaded
+    #
+    """
+    store = self._createLayerStore(checkpointDir)
+    numCompleteLayers = store.countCompleteLayers()
+    for numberOfFreeRows in range(1, numCompleteLayers + 1):
+      store.verifyLayer(numberOfFreeRows)
+      values[self.getLayerMasks(numberOfFreeRows)] = store.getLayer(numberOfFreeRows)
+    store.close()
+    return numCompleteLayers
+
+  def _createLayerStore(self, storeDir):
+    """ LayerStore for this solver's states in <storeDir> """
+    return LayerStore(storeDir, self.numberOfRows, self.numberOfUpperTotals,
+                      (self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls))
+
+  def solve(self, progressCallback=None, numberOfWorkers=1, checkpointDir=None, resume=False,
+            outOfCore=False, memoryBudget=None, restart=False):
+    """
+    # Find the value of every state
+    #  -with more than one worker, each layer of states is split across a pool
+    #   of processes, which share the state values through shared memory
+    #  -out of core, the values of each layer are kept in memory-mapped files
+    #   in <checkpointDir> rather than in memory, and so are the roll tables,
+    #   in the roll table cache or, without one, in <checkpointDir>; only the
+    #   block of states being solved needs to fit in memory
+    #
+    # progressCallback: (function) called as fn(numberOfFreeRows, numberOfRows)
+    #                   when each layer of states is complete
+    # numberOfWorkers:  (int) number of processes to solve with, or None for
+    #                   one per CPU
+    # checkpointDir:    (str) directory to save each layer to once it's solved
+    # resume:           (bool) start from the layers already in <checkpointDir>
+    # restart:          (bool) delete any layers already in <checkpointDir> and
+    #                   start again; without <resume> or <restart>, existing
+    #                   checkpoints are an error, so they're never lost by mistake
+    # outOfCore:        (bool) keep the values on disk, in <checkpointDir>
+    # memoryBudget:     (int) bytes to use for solving, shared by the workers
+    #
+    """
+    if numberOfWorkers is None:
+      numberOfWorkers = os.cpu_count() or 1
+    logger.info("solve: {} dice, {} faces, {} rolls, {} worker(s)".format(
+      self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls, numberOfWorkers))
+
+    # CHECK: there's somewhere to resume from, or keep the values
+    if (resume or outOfCore) and checkpointDir is None:
+      raise ValueError("need a checkpoint directory to resume from or solve out of core")
+    if resume and restart:
+      raise ValueError("can't both resume from and restart the checkpoints")
+    if checkpointDir is not None:
+      os.makedirs(checkpointDir, exist_ok=True)
+
+      # CHECK: existing checkpoints are only thrown away when asked to
+      if not resume and self.hasCheckpoints(checkpointDir):
+        if not restart:
+          raise FileExistsError("{} already has checkpointed layers; resume from them, or restart to delete them"
+                                .format(checkpointDir))
+
+        # starting over, so a later resume can't pick up layers from an older run
+        self.clearCheckpoints(checkpointDir)
+
+    # out of core, the roll tables are memory-mapped too, which also shares
+    # them between the workers
+    rollCacheDir = RollTable.cacheDir
+    if outOfCore and rollCacheDir is None:
+      rollCacheDir = StrategySolver.getRollCacheDir(checkpointDir)
+      self.rollTable = RollTable.getTable(self.numberOfDice, self.numberOfDiceFaces, rollCacheDir)
+
+    blockShape  = self.getBlockShape(memoryBudget, numberOfWorkers)
+    valuesShape = (2 ** self.numberOfRows, self.numberOfUpperTotals, 2)
+    gameConfig  = (self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls)
+    memory   = None
+    executor = None
+    try:
+
+      # full scorecards are worth nothing more
+      if outOfCore:
+        values = self._createLayerStore(checkpointDir)
+        if numberOfWorkers > 1:
+          executor = ProcessPoolExecutor(numberOfWorkers, initializer=_initWorker,
+                                         initargs=(gameConfig, None, valuesShape, checkpointDir, rollCacheDir))
+      elif numberOfWorkers > 1:
+        memory = shared_memory.SharedMemory(create=True, size=int(np.prod(valuesShape)) * 8)
+        values = np.ndarray(valuesShape, dtype=np.float64, buffer=memory.buf)
+        values[:] = 0.0
+        executor = ProcessPoolExecutor(numberOfWorkers, initializer=_initWorker,
+                                       initargs=(gameConfig, memory.name, valuesShape, None, rollCacheDir))
+      else:
+        values = np.zeros(valuesShape)
+
+      numCompleteLayers = 0
+      if resume and outOfCore:
+        numCompleteLayers = values.countCompleteLayers()
+        for numberOfFreeRows in range(1, numCompleteLayers + 1):
+          values.verifyLayer(numberOfFreeRows)
+      elif resume:
+        numCompleteLayers = self._loadCheckpoints(checkpointDir, values)
+      if resume:
+        logger.info("solve: resuming after layer {}/{}".format(numCompleteLayers, self.numberOfRows))
+
+      for numberOfFreeRows in range(numCompleteLayers + 1, self.numberOfRows + 1):
+        startTime = time.time()
+
+        # out of core, the layer's file is written as it's solved
+        if outOfCore:
+          layerWriter = values.createLayer(numberOfFreeRows)
+          numStates = self._solveLayer(numberOfFreeRows, values, executor, numberOfWorkers, blockShape)
+          layerWriter.commit()
+        else:
+          numStates = self._solveLayer(numberOfFreeRows, values, executor, numberOfWorkers, blockShape)
+          if checkpointDir is not None:
+            self._saveCheckpoint(checkpointDir, numberOfFreeRows, values)
+
+        logger.info("solve: layer {}/{} ({} states) took {:.1f}s".format(numberOfFreeRows, self.numberOfRows,
+                                                                         numStates, time.time() - startTime))
+        if progressCallback is not None:
+          progressCallback(numberOfFreeRows, self.numberOfRows)
+
+      # keep a copy of the values that outlives the shared memory
+      solvedValues = values if memory is None else values.copy()
+
+    finally:
+      if executor is not None:
+        executor.shutdown()
+      if memory is not None:
+        values = None
+        memory.unlink()
+        try:
+          memory.close()
+        except BufferError:
+          # values are still referenced, e.g., by a traceback; the mapping
+          # goes when they do
+          pass
+
+    self.values = solvedValues
+    return solvedValues
+
+
+  ###########################################################################
+  # lookups
+  ###########################################################################
+
+  def getStateKey(self, scorecard):
+    """
+    # State of a Scorecard (or ArrayScorecard), as (freeRowMask, upperTotal, yahtzeeScored)
+    """
+
+    freeRows = set(scorecard.getFreeRows())
+    freeRowMask = 0
+    upperTotal  = 0
+    for iRow, rowName in enumerate(self.rowNames):
+      if rowName in freeRows:
+        freeRowMask |= 1 << iRow
+      elif iRow < self.numberOfDiceFaces:
+        upperTotal += scorecard.getRowScore(rowName)
+
+    yahtzeeScored = scorecard.getRowScore(Scorecard.ROW_NAME.YAHTZEE.value) == Scorecard.POINTS.YAHTZEE.value
+
+    return freeRowMask, min(upperTotal, self.upperBonusThreshold), int(yahtzeeScored)
+
+  def getStateValue(self, freeRowMask, upperTotal, yahtzeeScored):
+    """ Expected score still to come, from the start of a turn in this state """
+
+    if self.values is None:
+      raise SystemError("solver has no values; solve or load a table first")
+
+    return float(self.values[freeRowMask, min(upperTotal, self.upperBonusThreshold), int(yahtzeeScored)])
+
+  def getExpectedScore(self, scorecard):
+    """ Expected final score of a scorecard, at the start of a turn """
+    return scorecard.getTotalScore() + self.getStateValue(*self.getStateKey(scorecard))
+
+
+  ###########################################################################
+  # saving/loading
+  ###########################################################################
+
+  def save(self, fileLoc, dtype=np.float64):
+    """
+    # Save the solved state values to <fileLoc>, as an EVTable
+    #
+    # dtype: (dtype) type to store the values as, see EVTable.write
+    #
+    """
+
+    if self.values is None:
+      raise SystemError("solver has no values; solve first")
+
+    if not isinstance(self.values, LayerStore):
+      EVTable.write(fileLoc, self.values, self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls, dtype)
+      return
+
+    # out of core, copy the table over a block of states at a time
+    valuesShape = (2 ** self.numberOfRows, self.numberOfUpperTotals, 2)
+    writer = EVTable.create(fileLoc, valuesShape, self.numberOfDice, self.numberOfDiceFaces, self.numberOfRolls, dtype)
+    masksPerBlock = self.getBatchSize()
+    for numberOfFreeRows in range(self.numberOfRows + 1):
+      layerMasks = self.getLayerMasks(numberOfFreeRows)
+      layer = self.values.getLayer(numberOfFreeRows)
+      for iStart in range(0, len(layerMasks), masksPerBlock):
+        writer.values[layerMasks[iStart:iStart + masksPerBlock]] = layer[iStart:iStart + masksPerBlock]
+    writer.commit()
+
+  def load(self, fileLoc, verify=False):
+    """
+    # Load state values, previously saved for the same game config, from <fileLoc>
+    #  -the table is memory-mapped, so values are read from disk as they're used
+    #
+    # verify: (bool) check the table data against its checksum
+    #
+    """
+    table = EVTable.open(fileLoc, numberOfDice=self.numberOfDice, numberOfDiceFaces=self.numberOfDiceFaces,
+                         numberOfRolls=self.numberOfRolls, verify=verify)
+
+    # CHECK: table has a value for every state
+    expectedShape = (2 ** self.numberOfRows, self.numberOfUpperTotals, 2)
+    if table.values.shape != expectedShape:
+      raise ValueError("table at {} has shape {}, expected {}".format(fileLoc, table.values.shape, expectedShape))
+
+    self.values = table.values
@@ -0,0 +1,291 @@
+import logging
+logger = logging.getLogger(__name__)
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+from collections import Counter, OrderedDict
+from concurrent import futures
+
+import numpy as np
+
+from headless import HeadlessRunner, OptimalPolicy
+from model import Game
+
+
+def _initWorker(logLevel, tableDir):
+  """ Log at the same level as the main process, whatever the worker's imports set up, and find the same tables """
+  logging.getLogger().setLevel(logLevel)
+  OptimalPolicy.TABLE_DIR = tableDir
+
+
+def _playChunk(playerPolicies, gameConfig, seedSequence, firstGame, numberOfGames):
+  """
+  # Play a chunk of tournament games, in a worker process
+  #  -every game gets its own seed from the chunk's <seedSequence>, so a
+  #   chunk plays the same games whichever worker plays it
+  #  -the seating is rotated each game, so nobody always goes first
+  #
+  # playerPolicies: (list) of (player name, policy name)
+  # gameConfig:     (tuple) (numberOfDice, numberOfDiceFaces, numberOfRolls)
+  # firstGame:      (int) tournament index of the chunk's first game
+  #
+  """
+  results = TournamentResults([playerName for playerName, _ in playerPolicies])
+
+  for iGame, gameSeed in enumerate(seedSequence.spawn(numberOfGames), firstGame):
+    diceSeed, policySeed = gameSeed.spawn(2)
+    policySeeds = policySeed.generate_state(len(playerPolicies), dtype=np.uint64).tolist()
+
+    seating = playerPolicies[iGame % len(playerPolicies):] + playerPolicies[:iGame % len(playerPolicies)]
+    policies = OrderedDict((playerName, HeadlessRunner.POLICIES[policyName](rng=random.Random(policySeed)))
+                           for (playerName, policyName), policySeed in zip(seating, policySeeds))
+    runner = HeadlessRunner(policies, *gameConfig)
+
+    results.addGame(runner.playGame(runner.newGame(seed=diceSeed)))
+
+  return results
+
+
+class TournamentResults:
+  """
+  # Merged results of tournament games
+  #  -wins:       games won by each player; a tie for first splits the win
+  #  -scores:     count of each final score, by player
+  #  -headToHead: games each player scored more than each other player in,
+  #               with ties counted separately
+  #
+  """
+
+  def __init__(self, playerNames):
+    self.playerNames   = list(playerNames)
+    self.numberOfGames = 0
+    self.wins          = {playerName: 0.0 for playerName in self.playerNames}
+    self.scores        = {playerName: Counter() for playerName in self.playerNames}
+    self.headToHead    = {pair: 0 for pair in itertools.permutations(self.playerNames, 2)}
+    self.ties          = {pair: 0 for pair in itertools.combinations(self.playerNames, 2)}
+
+  def addGame(self, totalScores):
+    """ Add the {player name: total score} of a game """
+    self.numberOfGames += 1
+
+    bestScore = max(totalScores.values())
+    winners = [playerName for playerName, score in totalScores.items() if score == bestScore]
+    for playerName in winners:
+      self.wins[playerName] += 1 / len(winners)
+
+    for playerName, score in totalScores.items():
+      self.scores[playerName][score] += 1
+
+    for playerName, otherName in itertools.combinations(self.playerNames, 2):
+      score, otherScore = totalScores[playerName], totalScores[otherName]
+      if score > otherScore:
+        self.headToHead[(playerName, otherName)] += 1
+      elif otherScore > score:
+        self.headToHead[(otherName, playerName)] += 1
+      else:
+        self.ties[(playerName, otherName)] += 1
+
+  def merge(self, other):
+    """ Add the games of <other> TournamentResults, for the same players """
+    self.numberOfGames += other.numberOfGames
+    for playerName in self.playerNames:
+      self.wins[playerName] += other.wins[playerName]
+      self.scores[playerName].update(other.scores[playerName])
+    for pair in self.headToHead:
+      self.headToHead[pair] += other.headToHead[pair]
+    for pair in self.ties:
+      self.ties[pair] += other.ties[pair]
+
+
+  def getWinRate(self, playerName):
+    return self.wins[playerName] / max(self.numberOfGames, 1)
+
+  def getScoreStats(self, playerName, percentiles=(5, 25, 50, 75, 95)):
+    """
+    # Summary of a player's score distribution
+    #  -returns an OrderedDict of mean, sd, min, max and each percentile
+    #
+    """
+    scoreCounts = self.scores[playerName]
+    scores = np.array(sorted(scoreCounts))
+    counts = np.array([scoreCounts[score] for score in scores])
+
+    stats = OrderedDict()
+    stats["mean"] = float(scores @ counts / counts.sum())
+    stats["sd"]   = float(np.sqrt(((scores - stats["mean"])**2) @ counts / counts.sum()))
+    stats["min"]  = int(scores[0])
+    stats["max"]  = int(scores[-1])
+
+    # the score the percentile of games are at or below
+    cumulative = np.cumsum(counts) / counts.sum()
+    for percentile in percentiles:
+      stats["p{}".format(percentile)] = int(scores[np.searchsorted(cumulative, percentile / 100)])
+    return stats
+
+  def getHeadToHead(self, playerName, otherName):
+    """ (wins, losses, ties) of <playerName> against <otherName> """
+    tiePair = (playerName, otherName) if (playerName, otherName) in self.ties else (otherName, playerName)
+    return self.headToHead[(playerName, otherName)], self.headToHead[(otherName, playerName)], self.ties[tiePair]
+
+  def formatTable(self):
+    """ Standings, score distributions and head-to-head records, as text """
+    lines = ["{} games".format(self.numberOfGames)]
+
+    nameWidth = max(len(playerName) for playerName in self.playerNames)
+    lines.append("{:<{}}  {:>7}  {:>7}  {:>6}  {:>5}  {:>5}  {:>5}  {:>5}"
+                 .format("player", nameWidth, "win %", "mean", "sd", "p5", "p50", "p95", "max"))
+    for playerName in sorted(self.playerNames, key=self.getWinRate, reverse=True):
+      stats = self.getScoreStats(playerName)
+      lines.append("{:<{}}  {:>7.2f}  {:>7.2f}  {:>6.2f}  {:>5}  {:>5}  {:>5}  {:>5}"
+                   .format(playerName, nameWidth, 100 * self.getWinRate(playerName), stats["mean"], stats["sd"],
+                           stats["p5"], stats["p50"], stats["p95"], stats["max"]))
+
+    if len(self.playerNames) > 1:
+      lines.append("head to head (wins-losses-ties)")
+      for playerName in self.playerNames:
+        records = ["{}-{}-{}".format(*self.getHeadToHead(playerName, otherName))
+                   for otherName in self.playerNames if otherName != playerName]
+        lines.append("{:<{}}  {}".format(playerName, nameWidth, "  ".join(records)))
+
+    return "\n".join(lines)
+
+
+class Tournament:
+  """
+  # Many multiplayer games between policies, spread over worker processes
+  #
+  # The games are split into chunks, and each chunk gets its own stream of
+  # seeds spawned from the tournament's SeedSequence, so the same seed plays
+  # the same games however many workers there are. Chunks are merged as
+  # they finish, so partial results can be reported along the way.
+  #
+  """
+
+  # games to play in each chunk
+  CHUNK_SIZE = 200
+
+  def __init__(self, policyNames, numberOfDice=5, numberOfDiceFaces=6, numberOfRolls=3, seed=None):
+    """
+    #
+    # policyNames: (list) registered policy of each player, see HeadlessRunner.POLICIES
+    # seed:        (int) seed of the tournament, or None for a random one
+    #
+    """
+
+    # CHECK: policies are registered
+    for policyName in policyNames:
+      if policyName not in HeadlessRunner.POLICIES:
+        raise ValueError("unknown policy {}; expected one of {}".format(policyName, list(HeadlessRunner.POLICIES)))
+
+    self.playerPolicies = [("{}-{}".format(iPlayer + 1, policyName), policyName)
+                           for iPlayer, policyName in enumerate(policyNames)]
+    self.gameConfig   = (numberOfDice, numberOfDiceFaces, numberOfRolls)
+    self.seedSequence = np.random.SeedSequence(seed)
+
+  def getPlayerNames(self):
+    return [playerName for playerName, _ in self.playerPolicies]
+
+  def _getChunks(self, numberOfGames):
+    """ (seed sequence, first game, number of games) of each chunk """
+    chunkStarts = range(0, numberOfGames, Tournament.CHUNK_SIZE)
+    return [(chunkSeed, firstGame, min(Tournament.CHUNK_SIZE, numberOfGames - firstGame))
+            for chunkSeed, firstGame in zip(self.seedSequence.spawn(len(chunkStarts)), chunkStarts)]
+
+  def run(self, numberOfGames, numberOfWorkers=1, progressCallback=None):
+    """
+    # Play <numberOfGames> games; returns the merged TournamentResults
+    #
+    # numberOfWorkers:  (int) number of processes to play in, None for one per CPU
+    # progressCallback: (function) called with the results so far, after
+    #                   each chunk is merged
+    #
+    """
+    results = TournamentResults(self.getPlayerNames())
+    chunks  = self._getChunks(numberOfGames)
+
+    if numberOfWorkers is None:
+      numberOfWorkers = os.cpu_count() or 1
+
+    def mergeChunk(chunkResults):
+      results.merge(chunkResults)
+      if progressCallback is not None:
+        progressCallback(results)
+
+    # play in this process
+    if numberOfWorkers <= 1:
+      for chunk in chunks:
+        mergeChunk(_playChunk(self.playerPolicies, self.gameConfig, *chunk))
+      return results
+
+    # or spread the chunks over worker processes, merging them as they finish
+    #  -chunks can finish in any order, but merging is order independent
+    #  -the results of a chunk are small, so sending them back is cheap
+    with futures.ProcessPoolExecutor(max_workers=numberOfWorkers,
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_initWorker,
+                                     initargs=(logging.getLogger().getEffectiveLevel(),
+                                               OptimalPolicy.TABLE_DIR)) as executor:
+      pending = [executor.submit(_playChunk, self.playerPolicies, self.gameConfig, *chunk) for chunk in chunks]
+      for future in futures.as_completed(pending):
+        mergeChunk(future.result())
+
+    return results
+
+
+def parseArgs(argv=None):
+  """ Read the command line options """
+
+  parser = argparse.ArgumentParser(description="Play policies against each other over many games")
+  parser.add_argument("--policy", nargs="+", required=True, choices=list(HeadlessRunner.POLICIES),
+                      help="policy of each player, one player per policy")
+  parser.add_argument("--games", type=int, default=10000,
+                      help="number of games to play")
+  parser.add_argument("--workers", type=int, default=0,
+                      help="number of processes to play in, 0 for one per CPU")
+  parser.add_argument("--seed", type=int, default=None,
+                      help="seed of the tournament, for repeatable runs")
+  parser.add_argument("--report-interval", type=float, default=10,
+                      help="seconds between partial results")
+  parser.add_argument("--dice",  type=int, default=5,
+                      help="number of dice ({}-{})".format(Game.MIN_NUM_DICE, Game.MAX_NUM_DICE))
+  parser.add_argument("--faces", type=int, default=6,
+                      help="number of dice faces ({}-{})".format(Game.MIN_DICE_FACES, Game.MAX_DICE_FACES))
+  parser.add_argument("--rolls", type=int, default=3,
+                      help="number of rolls per turn ({}-{})".format(Game.MIN_NUM_ROLLS, Game.MAX_NUM_ROLLS))
+  parser.add_argument("--table-dir", default=OptimalPolicy.TABLE_DIR,
+                      help="directory of the strategy tables made by precompute.py, for the optimal policy")
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
+
+  args = parseArgs(argv)
+  OptimalPolicy.TABLE_DIR = args.table_dir
+  seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+  logger.info("tournament seed: {}".format(seed))
+  tournament = Tournament(args.policy, numberOfDice=args.dice, numberOfDiceFaces=args.faces,
+                          numberOfRolls=args.rolls, seed=seed)
+
+  # report the results so far every so often
+  startTime  = time.time()
+  lastReport = [startTime]
+  def reportProgress(results):
+    if time.time() - lastReport[0] >= args.report_interval:
+      lastReport[0] = time.time()
+      logger.info("partial results, {:.0f} games/s:\n{}"
+                  .format(results.numberOfGames / (lastReport[0] - startTime), results.formatTable()))
+
+  results = tournament.run(args.games, numberOfWorkers=args.workers or None, progressCallback=reportProgress)
+  elapsed = time.time() - startTime
+  logger.info("final results, {:.1f}s ({:.0f} games/s):\n{}"
+              .format(elapsed, results.numberOfGames / elapsed, results.formatTable()))
+
+
+if __name__ == "__main__":
+  logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+  main()